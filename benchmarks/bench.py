@@ -0,0 +1,370 @@
+"""Benchmarks for planning, fetching, decoding and stitching, run against the local stub Static Maps
+server (see gmaploader/stub.py) so no API key or network is needed.
+
+Results are written as JSON, one record per benchmark keyed by name, with timing percentiles,
+throughput and peak memory. Compare two runs to catch regressions between releases.
+
+Usage
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --quick --output bench.json
+    python benchmarks/bench.py --only coordinates decode
+    python benchmarks/bench.py --compare baseline.json bench.json --tolerance 0.2
+
+End-to-end cases each run in a fresh process, so peak RSS is per case.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+import gmaploader
+from gmaploader import GMapLoader
+from gmaploader.cache import TileCache, MemoryCache
+from gmaploader.connection import ConnectionPool
+from gmaploader.coordinates import Coordinates
+from gmaploader.globalmaptiles import GlobalMercator
+from gmaploader.images import GMapImage
+from gmaploader.stub import StubServer, synthetic_tile
+from gmaploader.transport import HTTPTransport
+from gmaploader import vectorised
+from gmaploader.config import SYSTEM_CONFIG
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LAT, LON, ZOOM = 51.563839178, -0.164794922, 19
+
+SIZES = [640, 1280, 2000, 3000, 5000]
+WORKERS = [1, 8, 32]
+CACHE_STATES = ['cold', 'disk', 'memory']
+QUICK_SIZES = [640, 2000]
+QUICK_WORKERS = [1, 8]
+
+
+def percentiles(samples):
+    """Summary statistics of a list of durations in seconds
+
+    Args:
+        samples (list of float): Durations
+
+    Returns:
+        dict
+    """
+    if not samples:
+        return {'n': 0}
+    values = np.asarray(samples, dtype=float)
+    return {
+        'n': len(values),
+        'mean': float(values.mean()),
+        'min': float(values.min()),
+        'p50': float(np.percentile(values, 50)),
+        'p90': float(np.percentile(values, 90)),
+        'p99': float(np.percentile(values, 99)),
+        'max': float(values.max()),
+    }
+
+
+def peak_rss():
+    """Peak resident set size of this process in bytes, None where unavailable"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def traced_peak(fn):
+    """Peak bytes allocated by Python while fn runs once. Tracing slows every allocation down, so
+    it's measured in a pass of its own, never while timing
+
+    Args:
+        fn (callable): Function to measure, called with no arguments
+
+    Returns:
+        int: Peak traced bytes
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def micro(name, fn, number, repeat, items=1):
+    """Times fn, called number times per sample
+
+    Args:
+        name (str): Benchmark name
+        fn (callable): Function to time, called with no arguments
+        number (int): Calls per sample
+        repeat (int): Samples
+        items (int, optional): Items processed per call, for throughput
+
+    Returns:
+        dict: Record with per-call timings
+    """
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    peak = traced_peak(fn)
+
+    stats = percentiles(samples)
+    return {
+        'name': name,
+        'group': name.split('.')[0],
+        'seconds': stats,
+        'items_per_second': items / stats['p50'],
+        'peak_traced_bytes': peak,
+    }
+
+
+def bench_coordinates(quick=False):
+    """Coordinate maths: scalar GlobalMercator, Coordinates set up and the vectorised engine"""
+    gm = GlobalMercator()
+    rng = random.Random(0)
+    points = [(LAT + rng.uniform(-0.01, 0.01), LON + rng.uniform(-0.01, 0.01)) for _ in range(1000)]
+    lats, lons = np.array(points).T
+    number, repeat = (200, 5) if quick else (1000, 20)
+
+    def mercator():
+        lat, lon = points[rng.randrange(len(points))]
+        mx, my = gm.LatLonToMeters(lat, lon)
+        px, py = gm.MetersToPixels(mx, my, ZOOM)
+        gm.PixelsToTile(px, py)
+
+    def coordinates():
+        lat, lon = points[rng.randrange(len(points))]
+        coords = Coordinates(lat, lon, ZOOM, width=3000, height=3000)
+        coords.tile_center_latlon(4, 4)
+
+    def lattice():
+        lat, lon = points[rng.randrange(len(points))]
+        Coordinates(lat, lon, ZOOM, width=3000, height=3000).lattice_tiles()
+
+    return [
+        micro('coordinates.mercator', mercator, number, repeat),
+        micro('coordinates.init', coordinates, number // 10, repeat),
+        micro('coordinates.lattice_tiles', lattice, number // 10, repeat),
+        micro('coordinates.vectorised_tile_centers_1000',
+              lambda: vectorised.tile_centers(lats, lons, ZOOM, 5, 5), max(number // 100, 1), repeat, items=1000),
+        micro('coordinates.plan_3000', lambda: GMapLoader(LAT, LON, width=3000, height=3000, lazy=True, canvas=None),
+              max(number // 100, 1), repeat),
+    ]
+
+
+def bench_decode(quick=False):
+    """Per-tile decode of PNG and JPEG tiles, and pasting a tile into PIL and array canvases"""
+    tile = synthetic_tile(LAT, LON, ZOOM)
+    encoded = {}
+    for image_format in ('png', 'jpeg'):
+        buffer = io.BytesIO()
+        tile.save(buffer, format=image_format)
+        encoded[image_format] = buffer.getvalue()
+    number, repeat = (5, 5) if quick else (20, 20)
+
+    def decode(data):
+        img = Image.open(io.BytesIO(data))
+        img.load()
+        return img
+
+    records = []
+    for image_format, data in encoded.items():
+        record = micro(f'decode.{image_format}', lambda data=data: decode(data).close(), number, repeat)
+        record['bytes'] = len(data)
+        records.append(record)
+
+    for canvas in ('pil', 'array'):
+        image = GMapImage(LAT, LON, ZOOM, height=1236, width=1280, canvas=canvas)
+        records.append(micro(f'decode.add_image_{canvas}',
+                             lambda image=image: image._add_image(tile.copy(), 1, 1), number, repeat))
+        records.append(micro(f'decode.decode_add_image_{canvas}',
+                             lambda image=image: image._add_image(decode(encoded['png']), 1, 1), number, repeat))
+    return records
+
+
+def _run_case(url_template, size, workers, cache_state, repeat):
+    """Times full GMapLoader loads of one case, in a process of its own
+
+    Returns:
+        dict: Record
+    """
+    SYSTEM_CONFIG.set(url_template=url_template, dimension_threshold=max(size, 3000))
+
+    latencies = []
+
+    class TimedTransport(HTTPTransport):
+        def get(self, url):
+            start = time.perf_counter()
+            try:
+                return super().get(url)
+            finally:
+                latencies.append(time.perf_counter() - start)
+
+    transport = TimedTransport(ConnectionPool())
+    folder = tempfile.mkdtemp()
+    cache = TileCache(folder=folder) if cache_state == 'disk' else False
+    memory_cache = MemoryCache(max_bytes=2 * 1024**3) if cache_state == 'memory' else False
+
+    def load():
+        gml = GMapLoader(LAT, LON, zoom=ZOOM, width=size, height=size, max_workers=workers, in_memory=True,
+                         cache=cache, memory_cache=memory_cache, transport=transport, lazy=True)
+        gml.load()
+        return gml
+
+    try:
+        # Untimed run, fills the cache for warm cache states
+        with contextlib.redirect_stdout(sys.stderr):
+            tiles = len(load().tiles)
+        latencies.clear()
+
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sys.stderr):
+                gml = load()
+            samples.append(time.perf_counter() - start)
+            gml.img.close()
+            del gml
+        fetches = list(latencies)
+
+        def load_closed():
+            with contextlib.redirect_stdout(sys.stderr):
+                load().img.close()
+
+        peak = traced_peak(load_closed)
+    finally:
+        shutil.rmtree(folder)
+
+    stats = percentiles(samples)
+    return {
+        'name': f'end_to_end.{size}px.workers_{workers}.{cache_state}',
+        'group': 'end_to_end',
+        'size': size,
+        'tiles': tiles,
+        'workers': workers,
+        'cache': cache_state,
+        'seconds': stats,
+        'tile_fetch_seconds': percentiles(fetches),
+        'tiles_per_second': tiles / stats['p50'],
+        'megapixels_per_second': size * size / 1e6 / stats['p50'],
+        'peak_traced_bytes': peak,
+        'peak_rss_bytes': peak_rss(),
+    }
+
+
+def bench_end_to_end(quick=False, latency=0.02, jitter=0.01):
+    """Full GMapLoader runs against the stub server across image sizes, concurrency and cache states"""
+    sizes, workers = (QUICK_SIZES, QUICK_WORKERS) if quick else (SIZES, WORKERS)
+    repeat = 2 if quick else 3
+
+    records = []
+    with StubServer(latency=latency, jitter=jitter) as server:
+        for size in sizes:
+            for n_workers in workers:
+                for cache_state in CACHE_STATES:
+                    with ProcessPoolExecutor(max_workers=1) as executor:
+                        record = executor.submit(_run_case, server.url_template, size, n_workers,
+                                                 cache_state, repeat).result()
+                    record['stub_latency'] = latency
+                    record['stub_jitter'] = jitter
+                    records.append(record)
+                    print(f"{record['name']}: {record['seconds']['p50']:.3f}s", file=sys.stderr)
+    return records
+
+
+BENCHMARKS = {
+    'coordinates': bench_coordinates,
+    'decode': bench_decode,
+    'end_to_end': bench_end_to_end,
+}
+
+
+def compare(baseline_filepath, current_filepath, tolerance):
+    """Lists benchmarks whose median time grew by more than tolerance
+
+    Args:
+        baseline_filepath (str): Earlier results
+        current_filepath (str): Later results
+        tolerance (float): Allowed relative slow down, e.g. 0.2 for 20%
+
+    Returns:
+        list of (name, baseline p50, current p50)
+    """
+    with open(baseline_filepath) as f:
+        baseline = {record['name']: record for record in json.load(f)['results']}
+    with open(current_filepath) as f:
+        current = {record['name']: record for record in json.load(f)['results']}
+
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[name]['seconds']['p50'], current[name]['seconds']['p50']
+        if after > before * (1 + tolerance):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='JSON results filepath, stdout if not set')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='Benchmark groups to run')
+    parser.add_argument('--quick', action='store_true', help='Fewer cases and repeats')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub server latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.01, help='Stub server jitter in seconds')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help='Compare two results files')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slow down when comparing')
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(*args.compare, args.tolerance)
+        for name, before, after in regressions:
+            print(f'{name}: {before:.6f}s -> {after:.6f}s ({after / before - 1:+.0%})')
+        sys.exit(1 if regressions else 0)
+
+    # GMapLoader prints progress, keep stdout for the results
+    results = []
+    with contextlib.redirect_stdout(sys.stderr):
+        for group in args.only or BENCHMARKS:
+            if group == 'end_to_end':
+                results += bench_end_to_end(args.quick, args.latency, args.jitter)
+            else:
+                results += BENCHMARKS[group](args.quick)
+
+    output = {
+        'version': gmaploader.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'quick': args.quick,
+        'results': results,
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
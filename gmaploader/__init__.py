@@ -1,4 +1,15 @@
 __version__ = '0.1.1'
 
 from .gmaploader import GMapLoader
+from .asyncloader import AsyncGMapLoader
 
+from .cache import TileCache, MemoryCache
+from .stream import GMapStreamLoader
+from .plan import TilePlan
+from .transport import HTTPTransport, RecordTransport, ReplayTransport
+from .ratelimit import RateLimiter
+from .area import AreaLoader
+from .cover import PointCover
+from .resolution import ResolutionLoader
+from .pipeline import Pipeline
+from .processes import ProcessPool
@@ -0,0 +1,167 @@
+import math
+import numpy as np
+from PIL import Image, ImageDraw
+from .gmaploader import GMapLoader
+from .vectorised import global_pixels
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+def polygon_rings(geometry):
+    """Rings of a GeoJSON-like Polygon or MultiPolygon
+
+    Args:
+        geometry (dict or list): GeoJSON Feature, Polygon or MultiPolygon dict, or a list of
+            (lon, lat) pairs for a single ring
+
+    Returns:
+        list of list of rings, one list per polygon with its exterior ring first and holes after,
+        each ring a list of (lon, lat)
+    """
+    if isinstance(geometry, dict):
+        if geometry.get('type') == 'Feature':
+            return polygon_rings(geometry['geometry'])
+        if geometry.get('type') == 'Polygon':
+            return [geometry['coordinates']]
+        if geometry.get('type') == 'MultiPolygon':
+            return list(geometry['coordinates'])
+        raise ValueError(f"Geometry type {geometry.get('type')} not supported, use Polygon or MultiPolygon")
+    return [[geometry]]
+
+
+def polygon_bbox(geometry):
+    """Bounding box of a GeoJSON-like polygon
+
+    Args:
+        geometry (dict or list): See polygon_rings
+
+    Returns:
+        (west, south, east, north)
+    """
+    points = np.array([point[:2] for polygon in polygon_rings(geometry) for point in polygon[0]], dtype=float)
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+class AreaLoader(GMapLoader):
+    """Loads the area inside a bounding box or a polygon at a zoom level.
+
+    The image covers the geometry's bounding box exactly, in global pixels at the zoom level, and
+    is built from tiles of the global tile lattice (see Coordinates.lattice_tiles). With a polygon,
+    tiles that don't intersect it are never planned, so they aren't paid for, downloaded or stored,
+    and pixels outside the polygon are left black and masked out by mask. At scale 2 the image is
+    twice the width and height for the same area.
+
+    Attributes
+        bbox (tuple): (west, south, east, north) of area.
+        polygon (dict or list): Polygon of area, None for a bounding box.
+        mask (PIL.Image): 'L' mode mask, 255 inside the area and 0 outside, None for a bounding box.
+        skipped (int): Tiles of the bounding box skipped as they don't intersect the polygon.
+
+    Methods
+        rgba():
+            Image with mask as alpha channel
+
+    Example usage
+        from gmaploader import AreaLoader
+
+        parcel = {'type': 'Polygon', 'coordinates': [[(-0.1648, 51.5638), (-0.1620, 51.5638),
+                                                       (-0.1648, 51.5620), (-0.1648, 51.5638)]]}
+        gml = AreaLoader(polygon=parcel, zoom=19)
+        img = gml.rgba()
+    """
+    def __init__(self, bbox=None, polygon=None, zoom=19, **kwargs):
+        """Works out image size from the area and plans the tiles intersecting it
+
+        Args:
+            bbox (tuple, optional): (west, south, east, north) in degrees, GeoJSON order.
+            polygon (dict or list, optional): GeoJSON-like Feature, Polygon or MultiPolygon, or a
+                list of (lon, lat) pairs. Used for the bounding box if bbox isn't given.
+            zoom (int, optional): Zoom level (max 19).
+            **kwargs: GMapLoader arguments, e.g. map_type, cache, lazy, canvas.
+        """
+        if bbox is None and polygon is None:
+            raise ValueError('AreaLoader needs a bbox or a polygon')
+        self.bbox = tuple(bbox) if bbox is not None else polygon_bbox(polygon)
+        self.polygon = polygon
+        self.skipped = 0
+
+        scale = kwargs.get('scale') or SYSTEM_CONFIG.get('scale')
+        west, south, east, north = self.bbox
+        (x0, x1), (y0, y1) = global_pixels([north, south], [west, east], zoom)
+        self._origin = (int(math.floor(x0)), int(math.floor(y0)))
+        width = max(int(math.ceil(x1)) - self._origin[0], 1) * scale
+        height = max(int(math.ceil(y1)) - self._origin[1], 1) * scale
+
+        self.mask = self._polygon_mask(zoom, width, height, scale) if polygon is not None else None
+
+        kwargs['snap'] = True
+        super().__init__(lat=north, lon=west, zoom=zoom, width=width, height=height, **kwargs)
+
+    @property
+    def pixel_origin(self):
+        """Global pixel coordinates of top left of image, the north west corner of the area"""
+        return self._origin
+
+    def _polygon_mask(self, zoom, width, height, scale=1):
+        """Rasterises polygon into image pixels
+
+        Returns:
+            PIL.Image: 'L' mode mask, 255 inside polygon
+        """
+        mask = Image.new('L', (width, height), 0)
+        draw = ImageDraw.Draw(mask)
+        for polygon in polygon_rings(self.polygon):
+            for i, ring in enumerate(polygon):
+                ring = np.asarray([point[:2] for point in ring], dtype=float)
+                px, py = global_pixels(ring[:, 1], ring[:, 0], zoom)
+                xy = list(zip((px - self._origin[0]) * scale, (py - self._origin[1]) * scale))
+                # Exterior ring filled, holes cut out of it
+                draw.polygon(xy, fill=255 if i == 0 else 0)
+        return mask
+
+    def _plan(self):
+        """Plans lattice tiles covering the bounding box, leaving out those whose region of the
+        image doesn't intersect the polygon
+
+        Returns:
+            list of Tile
+        """
+        tiles = self.lattice_tiles()
+        if self.mask is None:
+            return tiles
+
+        mask = np.asarray(self.mask)
+        kept = []
+        for tile in tiles:
+            left, top, right, bottom = tile.box
+            x, y = tile.offset
+            if mask[y:y + bottom - top, x:x + right - left].any():
+                kept.append(tile)
+
+        if not kept:
+            raise ValueError('Polygon covers no pixels at this zoom level')
+        self.skipped = len(tiles) - len(kept)
+        logger.info(f'{self.skipped} of {len(tiles)} tiles outside polygon skipped')
+        return kept
+
+    def _finish(self):
+        """Blacks out pixels outside the polygon once tiles are stitched
+
+        Returns:
+            None
+        """
+        if self.mask is not None:
+            self._apply_mask(np.asarray(self.mask) > 0)
+
+    def rgba(self):
+        """Image with the area mask as alpha channel, fully opaque for a bounding box
+
+        Returns:
+            PIL.Image: RGBA image
+        """
+        img = self.img.convert('RGBA')
+        if self.mask is not None:
+            img.putalpha(self.mask)
+        return img
@@ -0,0 +1,135 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from .gmaploader import GMapLoader
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class AsyncGMapLoader(GMapLoader):
+    """asyncio version of GMapLoader. Uses the same coordinate calculations and stitching, but tiles
+    are downloaded without blocking the event loop.
+
+    Tiles are downloaded and decoded on a pool of `concurrency` threads of the loader's own, over
+    the shared pool of persistent keep-alive connections (see connection.py), so neither the event
+    loop's default executor nor JPEG decoding holds them up. The event loop only pastes decoded
+    tiles. Pass the same asyncio.Semaphore to many loaders to cap the total number of tiles in
+    flight across all of them.
+
+    Attributes
+        concurrency (int): Most tiles downloaded at once by this loader.
+        semaphore (asyncio.Semaphore): Semaphore limiting tiles in flight.
+
+    Methods
+        create(*args, **kwargs):
+            Initialises loader and awaits load()
+        load():
+            Downloads every tile and stitches them into the composite image
+
+    Example usage
+        import asyncio
+        from gmaploader import AsyncGMapLoader
+
+        async def main():
+            gml = await AsyncGMapLoader.create(lat=51.563839178, lon=-0.164794922, width=1200, height=1200)
+            return gml.img
+
+        img = asyncio.run(main())
+
+    """
+    def __init__(self, lat, lon, zoom=19, width=500, height=500, map_type='satellite', save=False,
+                 delete_temp=True, concurrency=None, semaphore=None, **kwargs):
+        """Sets up the composite image and tile grid without downloading anything. Await load(), or
+        use AsyncGMapLoader.create(), to load the image.
+
+        Args:
+            lat (float): Latitude coordinate of top left of image.
+            lon (float): Longitude coordinate of top left of image.
+            zoom (int, optional): Zoom level (max 19).
+            width (int, optional): Width of final image.
+            height (int, optional): Height of final image.
+            map_type (str, optional): Defines what map type to use
+                {'roadmap', 'satellite', 'terrain', 'hybrid'}.
+            save (bool, optional): Boolean flag to save file image once loaded.
+            delete_temp (bool, optional): Boolean flag to delete tiles once each loaded into
+                final composite image.
+            concurrency (int, optional): Most tiles downloaded at once, defaults to
+                async_concurrency in config.py.
+            semaphore (asyncio.Semaphore, optional): Semaphore shared between loaders, overrides
+                concurrency.
+        """
+        self.concurrency = concurrency or SYSTEM_CONFIG.get('async_concurrency')
+        self.semaphore = semaphore or asyncio.Semaphore(self.concurrency)
+        kwargs['lazy'] = True
+        super().__init__(lat=lat, lon=lon, zoom=zoom, width=width, height=height, map_type=map_type,
+                         save=False, delete_temp=delete_temp, **kwargs)
+        self.save_on_load = save
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """Initialises loader and loads the image
+
+        Returns:
+            AsyncGMapLoader: Loaded image
+        """
+        gml = cls(*args, **kwargs)
+        await gml.load()
+        return gml
+
+    def _ensure_loaded(self):
+        """img can't be loaded synchronously, load() must be awaited first"""
+        if not self.loaded and not self._loading:
+            raise RuntimeError('AsyncGMapLoader image not loaded, await load() first')
+
+    async def load(self):
+        """Downloads every tile of the grid and pastes each into the composite image as they complete.
+        Does nothing if already loaded.
+
+        Returns:
+            None
+        """
+        if self.loaded:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._loading = True
+        self._new_canvas()
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(self.tiles))))
+
+        async def load_tile(tile):
+            async with self.semaphore:
+                return await loop.run_in_executor(executor, self._decode_tile, tile)
+
+        tasks = [asyncio.ensure_future(load_tile(tile)) for tile in self.tiles]
+        try:
+            for task in asyncio.as_completed(tasks):
+                self._paste_tile(*await task)
+            self._finish()
+            self.loaded = True
+        finally:
+            self._loading = False
+            for task in tasks:
+                task.cancel()
+            # Threads still downloading finish on their own rather than blocking the event loop
+            executor.shutdown(wait=False)
+
+        logger.info(f'({self.lat}, {self.lon}), {self.width}x{self.height}, zoom:{self.zoom} loaded')
+        if self.save_on_load:
+            self.save()
+        self._complete_manifest()
+
+    def _decode_tile(self, tile):
+        """Downloads a tile and decodes it, run on the loader's threads as Image.open only reads
+        the header
+
+        Args:
+            tile (Tile): Planned tile
+
+        Returns:
+            (ImageLoader, Tile) with the tile decoded into ImageLoader.img
+        """
+        im_loader, tile = self._load_tile(tile)
+        if im_loader.img is not None:
+            im_loader.img.load()
+        return im_loader, tile
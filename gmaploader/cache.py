@@ -0,0 +1,481 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from .locks import striped_lock
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class TileCache:
+    """Persistent on-disk cache of downloaded tiles with a byte budget, LRU eviction and optional TTL.
+
+    Tiles are keyed by their request url with the API key removed (see ImageLoader.cache_key), so
+    every url parameter that affects the image, including map_type, is part of the key. Files are
+    written to a temporary file and renamed into place, so a reader never sees a half-written tile.
+
+    Recency is tracked in memory and persisted through each file's access time, which the cache sets
+    itself on every hit; the creation time used for the TTL is the file's modification time.
+
+    Processes can share a cache folder. Tiles stored by another process are picked up on lookup, and
+    lock(cache_key) gives a per-tile file lock so only one process downloads a missing tile.
+
+    Attributes
+        folder (str): Folder tiles are stored in.
+        max_bytes (int): Byte budget, least recently used tiles are evicted above it. None for
+            no limit.
+        ttl (float): Seconds a tile stays valid for. None for no expiry.
+        hits (int): Number of lookups served from cache.
+        misses (int): Number of lookups not in cache (or expired).
+        evictions (int): Number of tiles evicted to stay under max_bytes.
+        size (int): Total bytes of tiles in cache.
+
+    Methods
+        key(cache_key):
+            Hashes a cache key into a file name
+        get(cache_key):
+            Returns tile bytes, or None on a miss
+        put(cache_key, data):
+            Stores tile bytes
+        path(cache_key):
+            Filepath a tile is stored at
+        lock(cache_key):
+            File lock of a tile, shared between processes
+        stats():
+            Returns hit/miss/eviction counters and size
+        clear():
+            Removes every tile
+    """
+    extension = '.tile'
+
+    def __init__(self, folder=None, max_bytes=None, ttl=None):
+        """Scans folder for tiles left by earlier runs
+
+        Args:
+            folder (str, optional): Folder tiles are stored in, defaults to cache_folder in config.py.
+            max_bytes (int, optional): Byte budget, defaults to cache_max_bytes in config.py.
+            ttl (float, optional): Seconds a tile stays valid for, defaults to cache_ttl in config.py.
+        """
+        self.folder = folder or SYSTEM_CONFIG.get('cache_folder')
+        self.max_bytes = max_bytes if max_bytes is not None else SYSTEM_CONFIG.get('cache_max_bytes')
+        self.ttl = ttl if ttl is not None else SYSTEM_CONFIG.get('cache_ttl')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+
+        # key -> size, least recently used first
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+        self._scan()
+
+    def _scan(self):
+        """Rebuilds index from tiles already in folder, ordered by last access"""
+        entries = []
+        if os.path.isdir(self.folder):
+            for root, _, filenames in os.walk(self.folder):
+                for filename in filenames:
+                    if not filename.endswith(self.extension):
+                        continue
+                    stat = os.stat(os.path.join(root, filename))
+                    entries.append((stat.st_atime, filename[:-len(self.extension)], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.size += size
+        logger.debug(f'Tile cache {self.folder}: {len(self._index)} tiles, {self.size} bytes')
+
+    @staticmethod
+    def key(cache_key):
+        """Hashes a cache key into a file name
+
+        Args:
+            cache_key (str): Request url with API key removed
+
+        Returns:
+            str: Hex digest
+        """
+        return hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], key + self.extension)
+
+    def path(self, cache_key):
+        """Filepath a tile is stored at
+
+        Args:
+            cache_key (str): Request url with API key removed
+
+        Returns:
+            str: Filepath
+        """
+        return self._path(self.key(cache_key))
+
+    def lock(self, cache_key):
+        """File lock of a tile, held while downloading it so processes sharing the folder download
+        it once (see locks.py)
+
+        Args:
+            cache_key (str): Request url with API key removed
+
+        Returns:
+            FileLock
+        """
+        return striped_lock(self.folder, self.key(cache_key))
+
+    def _adopt(self, key):
+        """Adds a tile stored by another process sharing the folder to the index, lock must be held
+
+        Returns:
+            bool: Whether the tile is on disk
+        """
+        try:
+            size = os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            return False
+        self._index[key] = size
+        self.size += size
+        self._evict()
+        return key in self._index
+
+    def _remove(self, key):
+        """Removes tile from index and disk, lock must be held"""
+        self.size -= self._index.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _expired(self, path):
+        """Whether tile at path is older than ttl, False if it's not on disk"""
+        try:
+            return self.ttl is not None and time.time() - os.path.getmtime(path) > self.ttl
+        except FileNotFoundError:
+            return False
+
+    def get(self, cache_key):
+        """Returns tile bytes if cached and not expired
+
+        Args:
+            cache_key (str): Request url with API key removed
+
+        Returns:
+            bytes: Tile bytes, or None on a miss
+        """
+        key = self.key(cache_key)
+        path = self._path(key)
+        with self._lock:
+            if key not in self._index and not self._adopt(key):
+                self.misses += 1
+                return
+
+        # Disk is read outside the lock, which only guards the index, so lookups don't queue
+        # behind each other's reads
+        data = None
+        try:
+            mtime = os.path.getmtime(path)
+            expired = self.ttl is not None and time.time() - mtime > self.ttl
+            if not expired:
+                with open(path, 'rb') as f:
+                    data = f.read()
+                os.utime(path, (time.time(), mtime))
+        except FileNotFoundError:
+            # Evicted, or removed by another process sharing the folder
+            expired = False
+
+        with self._lock:
+            if expired:
+                # Another thread may have put a fresh tile since, so only removed if still expired
+                if self._expired(path):
+                    logger.debug(f'Tile cache expired: {key}')
+                    self._remove(key)
+                self.misses += 1
+                return
+            if data is None:
+                self.size -= self._index.pop(key, 0)
+                self.misses += 1
+                return
+
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, cache_key, data):
+        """Stores tile bytes, evicting least recently used tiles if over max_bytes
+
+        Args:
+            cache_key (str): Request url with API key removed
+            data (bytes): Tile bytes
+
+        Returns:
+            None
+        """
+        key = self.key(cache_key)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file in the same folder then rename, so the tile appears atomically
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self.size -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self.size += len(data)
+            self._evict()
+
+    def _evict(self):
+        """Evicts least recently used tiles until under max_bytes, lock must be held"""
+        if self.max_bytes is None:
+            return
+        while self.size > self.max_bytes and len(self._index) > 1:
+            key = next(iter(self._index))
+            self._remove(key)
+            self.evictions += 1
+            logger.debug(f'Tile cache evicted: {key}')
+
+    def __contains__(self, cache_key):
+        """Whether tile is cached and not expired, without counting as a hit or miss"""
+        key = self.key(cache_key)
+        if key not in self._index:
+            with self._lock:
+                if key not in self._index and not self._adopt(key):
+                    return False
+        if self.ttl is None:
+            return True
+        try:
+            return time.time() - os.path.getmtime(self._path(key)) <= self.ttl
+        except FileNotFoundError:
+            return False
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self):
+        """Returns cache counters
+
+        Returns:
+            dict: hits, misses, evictions, tiles and size in bytes
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'tiles': len(self._index),
+            'size': self.size,
+        }
+
+    def clear(self):
+        """Removes every tile from cache
+
+        Returns:
+            None
+        """
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+
+
+class MemoryCache:
+    """In-process LRU cache of decoded tiles, bounded by bytes and shared across GMapLoader instances.
+
+    Keyed by the same cache key as TileCache, so a hit skips both the download and the JPEG decode.
+    Images handed out are copies, callers are free to crop and close them.
+
+    Attributes
+        max_bytes (int): Byte budget of decoded pixels, least recently used tiles evicted above it.
+        hits (int): Number of lookups served from cache.
+        misses (int): Number of lookups not in cache.
+        evictions (int): Number of tiles evicted to stay under max_bytes.
+        size (int): Total bytes of decoded pixels in cache.
+
+    Methods
+        get(cache_key):
+            Returns a copy of the decoded tile, or None on a miss
+        put(cache_key, img):
+            Stores a decoded tile
+        stats():
+            Returns hit/miss/eviction counters and size
+        clear():
+            Removes every tile
+    """
+    def __init__(self, max_bytes=None):
+        """
+
+        Args:
+            max_bytes (int, optional): Byte budget, defaults to memory_cache_max_bytes in config.py.
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else SYSTEM_CONFIG.get('memory_cache_max_bytes')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._index = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def nbytes(img):
+        """Bytes of decoded pixels in image"""
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, cache_key):
+        """Returns a copy of the decoded tile
+
+        Args:
+            cache_key (str): Request url with API key removed
+
+        Returns:
+            PIL.Image: Copy of tile, or None on a miss
+        """
+        with self._lock:
+            img = self._index.get(cache_key)
+            if img is None:
+                self.misses += 1
+                return
+            self._index.move_to_end(cache_key)
+            self.hits += 1
+        return img.copy()
+
+    def put(self, cache_key, img):
+        """Stores a decoded tile, evicting least recently used tiles if over max_bytes. The cache
+        takes ownership of img, it mustn't be closed or modified afterwards.
+
+        Args:
+            cache_key (str): Request url with API key removed
+            img (PIL.Image): Decoded tile
+
+        Returns:
+            None
+        """
+        img.load()
+        nbytes = self.nbytes(img)
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._index.pop(cache_key, None)
+            if previous is not None:
+                self.size -= self.nbytes(previous)
+            self._index[cache_key] = img
+            self.size += nbytes
+
+            while self.max_bytes is not None and self.size > self.max_bytes:
+                _, evicted = self._index.popitem(last=False)
+                self.size -= self.nbytes(evicted)
+                self.evictions += 1
+
+    def __contains__(self, cache_key):
+        return cache_key in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def stats(self):
+        """Returns cache counters
+
+        Returns:
+            dict: hits, misses, evictions, tiles and size in bytes
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'tiles': len(self._index),
+            'size': self.size,
+        }
+
+    def clear(self):
+        """Removes every tile from cache
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._index.clear()
+            self.size = 0
+
+
+_default_cache = None
+_default_memory_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Returns the process-wide TileCache built from config.py, rebuilt if cache settings change
+
+    Returns:
+        TileCache
+    """
+    global _default_cache
+    settings = (
+        SYSTEM_CONFIG.get('cache_folder'),
+        SYSTEM_CONFIG.get('cache_max_bytes'),
+        SYSTEM_CONFIG.get('cache_ttl'),
+    )
+    with _default_cache_lock:
+        if _default_cache is None or (_default_cache.folder, _default_cache.max_bytes, _default_cache.ttl) != settings:
+            _default_cache = TileCache(*settings)
+        return _default_cache
+
+
+def resolve_cache(cache):
+    """Turns a cache argument into a TileCache or None
+
+    Args:
+        cache (bool or TileCache or None): True for the default cache, None to use cache in config.py
+
+    Returns:
+        TileCache or None
+    """
+    if cache is None:
+        cache = SYSTEM_CONFIG.get('cache')
+    if cache is True:
+        return default_cache()
+    if cache is False:
+        return None
+    return cache
+
+
+def default_memory_cache():
+    """Returns the process-wide MemoryCache, rebuilt if memory_cache_max_bytes in config.py changes
+
+    Returns:
+        MemoryCache
+    """
+    global _default_memory_cache
+    max_bytes = SYSTEM_CONFIG.get('memory_cache_max_bytes')
+    with _default_cache_lock:
+        if _default_memory_cache is None or _default_memory_cache.max_bytes != max_bytes:
+            _default_memory_cache = MemoryCache(max_bytes)
+        return _default_memory_cache
+
+
+def resolve_memory_cache(memory_cache):
+    """Turns a memory_cache argument into a MemoryCache or None
+
+    Args:
+        memory_cache (bool or MemoryCache or None): True for the process-wide cache, None to use
+            memory_cache in config.py
+
+    Returns:
+        MemoryCache or None
+    """
+    if memory_cache is None:
+        memory_cache = SYSTEM_CONFIG.get('memory_cache')
+    if memory_cache is True:
+        return default_memory_cache()
+    if memory_cache is False:
+        return None
+    return memory_cache
@@ -47,15 +47,51 @@ class Config:
 # create temp and output folders
 TEMP_FOLDER = os.path.join(os.getcwd(), 'tmp')
 OUTPUT_FOLDER = os.path.join(os.getcwd(), 'output')
+CACHE_FOLDER = os.path.join(os.getcwd(), 'cache')
+MANIFEST_FOLDER = os.path.join(os.getcwd(), 'jobs')
 
 # Initialise SYSTEM_CONFIG
 SYSTEM_CONFIG = Config()
 SYSTEM_CONFIG.set(
-    url_template='https://maps.googleapis.com/maps/api/staticmap?center={lat},{lon}&zoom={zoom}&size={height}x{width}&maptype={map_type}&key={api_key}',
+    url_template='https://maps.googleapis.com/maps/api/staticmap?center={lat},{lon}&zoom={zoom}&size={width}x{height}&scale={scale}&maptype={map_type}&key={api_key}',
     temp_folder=TEMP_FOLDER,
     output_folder=OUTPUT_FOLDER,
     latlon_round=8,  # Rounding threshold for lat-lons
     dimension_threshold=3000,  # largest width or height allowed in a single image
+    scale=1,  # Static Maps scale, 2 for 1280x1280 pixel tiles covering the same area as 640x640 ones
+    max_zoom=19,  # Highest zoom level used when the zoom level is chosen automatically
+    lazy_load=True,  # Only plan tiles on initialisation, download them on first use of the image
+    snap_to_grid=False,  # Use tiles from the global tile lattice so overlapping requests share tiles
+    planner='grid',  # Tile layout without snap, 'grid' for a fixed 640x618 pitch or 'balanced' for evenly sized requests
+    max_workers=8,  # Number of tiles downloaded concurrently per image
+    decode_workers=4,  # Threads decoding tiles in a Pipeline
+    encode_workers=1,  # Threads saving finished images in a Pipeline
+    pipeline_queue_size=32,  # Most items waiting between two Pipeline stages
+    processes=None,  # Worker processes in a ProcessPool, None for one per CPU
+    in_memory=False,  # Decode tiles from memory instead of writing them to temp_folder
+    cache=False,  # Keep downloaded tiles in the persistent tile cache
+    cache_folder=CACHE_FOLDER,  # Tile cache folder
+    cache_max_bytes=1024**3,  # Tile cache byte budget, least recently used tiles evicted above it
+    cache_ttl=None,  # Seconds a cached tile stays valid for, None never expires
+    coalesce_requests=True,  # Concurrent requests for the same tile in a process share one download
+    file_locks=True,  # Lock tiles while downloading so processes sharing temp_folder or the tile cache download each once
+    manifest=False,  # Journal downloaded tiles so an interrupted job resumes where it stopped
+    manifest_folder=MANIFEST_FOLDER,  # Job manifest folder
+    memory_cache=False,  # Keep decoded tiles in a process-wide in-memory cache
+    memory_cache_max_bytes=256*1024**2,  # Decoded tile memory cache byte budget
+    async_concurrency=16,  # Number of tiles downloaded concurrently per AsyncGMapLoader
+    pool_maxsize=16,  # Idle keep-alive connections kept per host
+    http_connect_timeout=10,  # Seconds to wait for a connection to the tile server
+    http_read_timeout=30,  # Seconds to wait for data on an open connection
+    http_retries=3,  # Retries of a tile request after a timeout, connection error, HTTP 429 or 5xx
+    retry_backoff=0.5,  # Seconds before first retry, doubling each retry, with full jitter
+    retry_backoff_max=10,  # Longest wait in seconds between retries
+    hedge_percentile=None,  # Duplicate tile requests slower than this latency percentile of recent requests (e.g. 95), None for no hedging
+    rate_limit=None,  # Most tile requests per second across the process, None for no limit
+    rate_burst=10,  # Tile requests allowed at once above rate_limit after an idle period
+    max_concurrency=64,  # Most tile requests in flight across the process
+    adaptive_concurrency=True,  # Halve concurrency on HTTP 429/5xx, ramp back up on success
+    transport=None,  # Transport tiles are fetched with (see transport.py), None for HTTP
     gmap_key=os.environ.get('GMAP_KEY'),  # GCP mapping services key
     logging_stdout_level=logging.DEBUG,  # Threshold for stdout
     logging_stdout=False,  # stdout on or off
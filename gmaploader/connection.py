@@ -0,0 +1,153 @@
+import http.client
+import queue
+import threading
+from urllib.parse import urlsplit
+from .exceptions import TileRequestFailed
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class ConnectionPool:
+    """Thread-safe pool of persistent HTTP/1.1 connections, one pool per scheme, host and port.
+
+    Connections are checked out for a single request and returned afterwards, so tiles downloaded
+    one after another (or from many threads) reuse the same TCP/TLS connections rather than
+    opening a fresh one per tile.
+
+    Attributes
+        maxsize (int): Most idle connections kept per host.
+        connect_timeout (float): Seconds to wait for a new connection.
+        read_timeout (float): Seconds to wait for data on an open connection.
+
+    Methods
+        get(url):
+            Sends a GET request and returns the response body
+        clear():
+            Closes all idle connections
+    """
+    def __init__(self, maxsize=None, connect_timeout=None, read_timeout=None):
+        """
+
+        Args:
+            maxsize (int, optional): Most idle connections kept per host, defaults to pool_maxsize
+                in config.py.
+            connect_timeout (float, optional): Seconds to wait for a new connection, defaults to
+                http_connect_timeout in config.py.
+            read_timeout (float, optional): Seconds to wait for data on an open connection,
+                defaults to http_read_timeout in config.py.
+        """
+        self._maxsize = maxsize
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize or SYSTEM_CONFIG.get('pool_maxsize')
+
+    @property
+    def connect_timeout(self):
+        return self._connect_timeout or SYSTEM_CONFIG.get('http_connect_timeout')
+
+    @property
+    def read_timeout(self):
+        return self._read_timeout or SYSTEM_CONFIG.get('http_read_timeout')
+
+    def _pool(self, key):
+        """Returns idle connection queue for (scheme, host, port), creating it if needed"""
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.maxsize)
+            return self._pools[key]
+
+    def _connect(self, scheme, host, port):
+        """Opens a new connection, within connect_timeout, then waits up to read_timeout for data"""
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        logger.debug(f'New connection: {scheme}://{host}:{port}')
+        connection = connection_class(host, port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        return connection
+
+    def _checkout(self, key):
+        """Returns (connection, reused) taking an idle connection if available"""
+        try:
+            return self._pool(key).get_nowait(), True
+        except queue.Empty:
+            return self._connect(*key), False
+
+    def _checkin(self, key, connection):
+        """Returns connection to the pool, closing it if the pool is full"""
+        try:
+            self._pool(key).put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def get(self, url):
+        """Sends a GET request over a pooled connection
+
+        A request on a reused connection that the server has since closed is retried once on a
+        fresh connection.
+
+        Args:
+            url (str): Full request url
+
+        Returns:
+            bytes: Response body
+
+        Raises:
+            TileRequestFailed: If the response status isn't 200.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+
+        while True:
+            connection, reused = self._checkout(key)
+            try:
+                connection.request('GET', path, headers={'Connection': 'keep-alive'})
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except Exception:
+                connection.close()
+                raise
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(key, connection)
+
+            if response.status != 200:
+                raise TileRequestFailed(status=response.status, reason=response.reason)
+            return body
+
+    def clear(self):
+        """Closes all idle connections
+
+        Returns:
+            None
+        """
+        with self._lock:
+            pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
+
+
+# Process-wide pool shared by every ImageLoader
+POOL = ConnectionPool()
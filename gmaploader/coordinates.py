@@ -1,11 +1,47 @@
 import math
 from .globalmaptiles import GlobalMercator
 from .request import Request
+from .tile import Tile
 from .config import SYSTEM_CONFIG
 from .config import logger
 
 logger = logger(name=__name__)
 
+GM = GlobalMercator()
+
+# Rows of Google logo at the bottom of every tile, at scale 1
+LOGO_HEIGHT = 22
+
+
+def balanced_spans(length, pitch, scale=1):
+    """Splits length image pixels into as few tiles as possible along one axis, all the same size.
+
+    n = ceil(length / (pitch * scale)) tiles are needed however they're placed. Rather than n - 1
+    full tiles and a thin strip at the end, each tile is just big enough for n of them to cover
+    length, rounded up to an even number of map pixels so tile centres land on whole map pixels.
+    The few pixels of overlap left over are spread evenly between neighbouring tiles.
+
+    Args:
+        length (int): Image pixels to cover
+        pitch (int): Most map pixels a tile can contribute, 640 across or 618 down
+        scale (int, optional): Image pixels per map pixel
+
+    Returns:
+        list of (offset, span, keep): image pixels from the start of the axis to the start of each
+        tile, the tile's size and how much of it is kept before the next tile starts
+    """
+    length_m = -(-length // scale)
+    n = -(-length_m // pitch)
+    span = -(-length_m // n)
+    span += span % 2
+
+    if n == 1:
+        offsets = [0]
+    else:
+        offsets = [round(k * (length_m - span) / (n - 1)) * scale for k in range(n)]
+    ends = offsets[1:] + [length]
+    return [(offset, span * scale, end - offset) for offset, end in zip(offsets, ends)]
+
 
 class Coordinates(Request):
     """Manages all coordinate calculations for tile coordinates and lat lon coordinates
@@ -21,10 +57,17 @@ class Coordinates(Request):
         gm (object): GlobalMercator class object
         nearest_tile_latlon (tuple): (Left, top, right, bottom) lat-lon coordinates of
             top-left corner tile (tile_x, tile_y) to input lat-lon coordinates
+        pixel_origin (tuple): Global pixel coordinates of top left of image
 
     Methods
         tile_center_latlon(row, col)
             Generate lat-lon coordinates of center of tile
+        pixel_latlon(px, py)
+            Convert global pixel coordinates to lat-lon coordinates
+        lattice_tiles()
+            Tiles of the global tile lattice covering the image
+        balanced_tiles()
+            Fewest evenly sized tiles covering the image
         latlon_pixel():
             Calculate degrees in lat and lon per pixel in image
         nearest_tile():
@@ -45,8 +88,8 @@ class Coordinates(Request):
         super().__init__(lat, lon, zoom, **kwargs)
         logger.debug(f'Original coords: ({lat},{lon})')
 
-        # Initialise GlobalMercator from globalmaptiles.py
-        self.gm = GlobalMercator()
+        # GlobalMercator from globalmaptiles.py holds no per-request state, so one is shared
+        self.gm = GM
 
         # Get tile X-Y coodinates of input lat-lon coordinates
         self.tile_x, self.tile_y = self._get_tile_xy()
@@ -70,6 +113,7 @@ class Coordinates(Request):
 
         # Formula generalised using the following:
         # Center coord = top left coord +/- (distance to center) +/- (num rows/cols down from topleft)
+        # A tile covers 640x618 map pixels at any scale, scale only adds image pixels per map pixel
         tile_lat_c = self.lat - ((640 / 2) * self.lat_pxl) - (row * 618 * self.lat_pxl)
         tile_lon_c = self.lon + ((640 / 2) * self.lon_pxl) + (col * 640 * self.lon_pxl)
 
@@ -79,6 +123,105 @@ class Coordinates(Request):
         logger.debug(f'col-row:({col}, {row}): center lat-lon:({tile_lat_c},{tile_lon_c})')
         return tile_lat_c, tile_lon_c
 
+    @property
+    def pixel_origin(self):
+        """Global pixel coordinates (origin top left of the world) of top left of image, which is
+        self.lat, self.lon as for the grid and balanced planners. Fractional, lattice_tiles rounds it
+        to image pixels as the tile server rounds tile centres"""
+        mx, my = self.gm.LatLonToMeters(self.lat, self.lon)
+        px, py = self.gm.MetersToPixels(mx, my, self.zoom)
+        return px, (256 << self.zoom) - py
+
+    def pixel_latlon(self, px, py):
+        """Converts global pixel coordinates, origin top left of the world, to lat-lon at self.zoom
+
+        Args:
+            px (float): Global pixel x coordinate
+            py (float): Global pixel y coordinate, increasing southwards
+
+        Returns:
+            Tuple of floats, latitude and longitude
+        """
+        # GlobalMercator pixels count upwards from bottom of the world
+        map_size = 256 << self.zoom
+        mx, my = self.gm.PixelsToMeters(px, map_size - py, self.zoom)
+        lat, lon = self.gm.MetersToLatLon(mx, my)
+        return self._round(lat, lon)
+
+    def lattice_tiles(self):
+        """Tiles of the global tile lattice covering the image
+
+        The lattice splits the world at each zoom level into fixed 640x618 cells, cell (i, j) keeping
+        global pixels [640i, 640i + 640) x [618j, 618j + 618) from a 640x640 tile centred at
+        (640i + 320, 618j + 320). Every request at the same zoom uses the same cells, so tiles of
+        overlapping or adjacent images are identical and can be served from cache. Each cell's
+        box is the part of it inside the image, which may be a partial cell at any edge. At scale 2
+        cells cover the same ground in twice the pixels, so boxes and offsets are doubled.
+
+        Returns:
+            list of Tile
+        """
+        # Lattice in image pixels, scale per map pixel
+        pitch_x, pitch_y = self.pitch
+        x0, y0 = (int(round(v * self.scale)) for v in self.pixel_origin)
+        x1, y1 = x0 + self.width, y0 + self.height
+
+        tiles = []
+        j_range = range(y0 // pitch_y, (y1 - 1) // pitch_y + 1)
+        i_range = range(x0 // pitch_x, (x1 - 1) // pitch_x + 1)
+        for row, j in enumerate(j_range):
+            for col, i in enumerate(i_range):
+                cell_x, cell_y = i * pitch_x, j * pitch_y
+                lat_c, lon_c = self.pixel_latlon(i * 640 + 320, j * 618 + 320)
+                left, top = max(x0, cell_x), max(y0, cell_y)
+                right, bottom = min(x1, cell_x + pitch_x), min(y1, cell_y + pitch_y)
+                tiles.append(Tile(
+                    row=row,
+                    col=col,
+                    lat=lat_c,
+                    lon=lon_c,
+                    box=(left - cell_x, top - cell_y, right - cell_x, bottom - cell_y),
+                    offset=(left - x0, top - y0)
+                ))
+                logger.debug(f'Lattice cell:({i},{j}): center lat-lon:({lat_c},{lon_c})')
+        return tiles
+
+    def balanced_tiles(self):
+        """Fewest tiles covering the image, sized to fit it rather than always 640x640
+
+        Rows and columns of tiles are laid out by balanced_spans, so the image takes as many
+        requests as the 640x618 grid, but no request fetches pixels that are cropped away other than
+        the logo strip at the bottom of each tile and a pixel or two of overlap. A 1300 pixel wide
+        image takes three 434 pixel wide requests instead of two 640 pixel wide ones and a third
+        cropped to 20 pixels. Smaller requests cost the same but are quicker to download and decode.
+
+        Returns:
+            list of Tile
+        """
+        # Global pixel coordinates of top left of image
+        x0, y0 = self.pixel_origin
+
+        tiles = []
+        for row, (top, span_y, keep_y) in enumerate(balanced_spans(self.height, 618, self.scale)):
+            # Logo strip is requested below the rows kept
+            height = span_y // self.scale + LOGO_HEIGHT
+            for col, (left, span_x, keep_x) in enumerate(balanced_spans(self.width, 640, self.scale)):
+                width = span_x // self.scale
+                lat_c, lon_c = self.pixel_latlon(x0 + left / self.scale + width / 2,
+                                                 y0 + top / self.scale + height / 2)
+                tiles.append(Tile(
+                    row=row,
+                    col=col,
+                    lat=lat_c,
+                    lon=lon_c,
+                    box=(0, 0, keep_x, keep_y),
+                    offset=(left, top),
+                    width=width,
+                    height=height
+                ))
+                logger.debug(f'Balanced tile:({col},{row}): {width}x{height} center lat-lon:({lat_c},{lon_c})')
+        return tiles
+
     def _get_tile_xy(self):
         """Generates an X,Y Google Map tile coordinate based on the latitude, longitude and zoom level
 
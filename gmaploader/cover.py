@@ -0,0 +1,254 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+import numpy as np
+from .images import ImageLoader
+from .tile import Tile
+from .vectorised import global_pixels, VM
+from .cache import resolve_cache, resolve_memory_cache
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+# Part of a 640x640 tile above the logo strip
+TILE_WIDTH, TILE_HEIGHT = 640, 618
+
+
+def _greedy_block(left, top, size):
+    """Greedy set cover of one block of chips, see greedy_cover
+
+    Returns:
+        (windows, assignment) with assignment indexing windows
+    """
+    slack_x, slack_y = TILE_WIDTH - size, TILE_HEIGHT - size
+
+    # Candidate windows with each chip at their corners, edge centres and centre
+    x = (left[:, None] - np.array([0, slack_x // 2, slack_x])[None, :])
+    y = (top[:, None] - np.array([0, slack_y // 2, slack_y])[None, :])
+    x, y = np.broadcast_arrays(x[:, :, None], y[:, None, :])
+    candidates = np.unique(np.stack([x.ravel(), y.ravel()], axis=1), axis=0)
+    cx, cy = candidates[:, :1], candidates[:, 1:]
+
+    # fits[i, j]: chip j fits inside candidate window i
+    fits = ((left[None, :] >= cx) & (left[None, :] <= cx + slack_x) &
+            (top[None, :] >= cy) & (top[None, :] <= cy + slack_y))
+    counts = fits.sum(axis=1)
+
+    windows = []
+    assignment = np.full(len(left), -1, dtype=np.int64)
+    uncovered = np.ones(len(left), dtype=bool)
+    while uncovered.any():
+        best = int(np.argmax(counts))
+        chips = fits[best] & uncovered
+        assignment[chips] = len(windows)
+        windows.append((int(cx[best, 0]), int(cy[best, 0])))
+        uncovered[chips] = False
+        counts -= fits[:, chips].sum(axis=1)
+    return windows, assignment
+
+
+def greedy_cover(left, top, size, max_block=2048):
+    """Greedy set cover of square chips by 640x618 windows on the global pixel grid.
+
+    Each chip can be served from any window it fits inside. Candidate windows are placed with
+    each chip at their corners, edge centres and centre, and the window covering the most
+    uncovered chips is chosen until every chip is covered.
+
+    Chips are first split into blocks of 4x4 windows, quartered until each holds at most max_block
+    chips, and each block is covered on its own with a dense chip-window matrix. Windows never
+    serve chips across a block edge, costing a few extra windows along the edges of dense blocks,
+    but memory and time stay linear in the number of points.
+
+    Args:
+        left (numpy.ndarray): Global pixel x of left edge of each chip
+        top (numpy.ndarray): Global pixel y of top edge of each chip
+        size (int): Width and height of chips
+        max_block (int, optional): Most chips covered together
+
+    Returns:
+        (windows, assignment): list of (left, top) of chosen windows, and index of the window
+        serving each chip
+    """
+    left, top = np.asarray(left, dtype=np.int64), np.asarray(top, dtype=np.int64)
+    windows = []
+    assignment = np.full(len(left), -1, dtype=np.int64)
+
+    def cover(indices, scale):
+        block_x, block_y = left[indices] // (TILE_WIDTH * scale), top[indices] // (TILE_HEIGHT * scale)
+        order = np.lexsort((block_y, block_x))
+        boundaries = np.flatnonzero(np.diff(block_x[order]) | np.diff(block_y[order])) + 1
+        for group in np.split(indices[order], boundaries):
+            if len(group) > max_block and scale > 1:
+                cover(group, scale // 2)
+                continue
+            block_windows, block_assignment = _greedy_block(left[group], top[group], size)
+            assignment[group] = block_assignment + len(windows)
+            windows.extend(block_windows)
+
+    if len(left):
+        cover(np.arange(len(left)), 4)
+    return windows, assignment
+
+
+class PointCover:
+    """Imagery chips around many points, served from a small shared set of Static Maps requests.
+
+    Every point needs a square chip of 2 * radius pixels centred on it. Chips are placed on the
+    global pixel grid at the zoom level and covered with as few 640x640 requests as greedy set
+    cover finds (see greedy_cover), keeping the top 640x618 of each clear of the logo. Each
+    point's chip is then cropped from the request covering it. Clustered points share requests,
+    so this takes far fewer API calls than loading every point on its own.
+
+    Attributes
+        lat (numpy.ndarray): Latitudes of points.
+        lon (numpy.ndarray): Longitudes of points.
+        radius (int): Pixels of context around each point.
+        zoom (int): Zoom level.
+        tiles (list): Tiles (see tile.py) to request, box being the part above the logo and offset
+            the global pixel coordinates of its top left.
+        assignment (numpy.ndarray): Index of the tile serving each point.
+        boxes (numpy.ndarray): (left, top, right, bottom) crop box of each point's chip in its tile.
+
+    Methods
+        chips():
+            Yields (point index, chip) as tiles load
+        load():
+            Returns every chip, in point order
+
+    Example usage
+        from gmaploader import PointCover
+
+        cover = PointCover(lats, lons, radius=100, zoom=19, cache=True)
+        print(len(cover.tiles), 'requests for', len(lats), 'points')
+        for i, chip in cover.chips():
+            chip.save(f'chips/{i}.png')
+    """
+    def __init__(self, lat, lon, radius, zoom=19, map_type='satellite', max_workers=None, in_memory=True,
+                 cache=None, memory_cache=None, transport=None):
+        """Plans requests covering every point's chip
+
+        Args:
+            lat (array-like): Latitudes of points.
+            lon (array-like): Longitudes of points.
+            radius (int): Pixels of context needed around each point, at most 309.
+            zoom (int, optional): Zoom level (max 19).
+            map_type (str, optional): Defines what map type to use
+                {'roadmap', 'satellite', 'terrain', 'hybrid'}.
+            max_workers (int, optional): Number of tiles downloaded concurrently, defaults to
+                max_workers in config.py.
+            in_memory (bool, optional): Decode tiles straight from memory.
+            cache (bool or TileCache, optional): Persistent tile cache, see GMapLoader.
+            memory_cache (bool or MemoryCache, optional): Decoded tile cache, see GMapLoader.
+            transport (Transport, optional): Transport tiles are fetched with.
+        """
+        size = 2 * int(radius)
+        if size > TILE_HEIGHT:
+            raise ValueError(f'radius {radius} too big, chips must fit in {TILE_WIDTH}x{TILE_HEIGHT}')
+
+        self.lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        self.lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        self.radius = int(radius)
+        self.zoom = zoom
+        self.map_type = map_type
+        self.max_workers = max_workers or SYSTEM_CONFIG.get('max_workers')
+        self.in_memory = in_memory
+        self.cache = resolve_cache(cache)
+        self.memory_cache = resolve_memory_cache(memory_cache)
+        self.transport = transport
+
+        # Nothing to cover, np.array([]) has no columns to index windows by
+        if not len(self.lat):
+            self.tiles = []
+            self.assignment = np.empty(0, dtype=np.int64)
+            self.boxes = np.empty((0, 4), dtype=np.int64)
+            return
+
+        px, py = global_pixels(self.lat, self.lon, zoom)
+        left = np.floor(px).astype(np.int64) - self.radius
+        top = np.floor(py).astype(np.int64) - self.radius
+        windows, self.assignment = greedy_cover(left, top, size)
+
+        self.tiles = []
+        map_size = 256 << zoom
+        for i, (x, y) in enumerate(windows):
+            mx, my = VM.PixelsToMeters(x + 320, map_size - (y + 320), zoom)
+            lat_c, lon_c = VM.MetersToLatLon(mx, my)
+            self.tiles.append(Tile(row=i, col=0, lat=round(float(lat_c), SYSTEM_CONFIG.get('latlon_round')),
+                                   lon=round(float(lon_c), SYSTEM_CONFIG.get('latlon_round')),
+                                   box=(0, 0, TILE_WIDTH, TILE_HEIGHT), offset=(x, y)))
+
+        origin = np.array(windows, dtype=np.int64)[self.assignment]
+        self.boxes = np.stack([left - origin[:, 0], top - origin[:, 1],
+                               left - origin[:, 0] + size, top - origin[:, 1] + size], axis=1)
+
+        picture_message = f'{len(self.tiles)} images required for {len(self.lat)} points'
+        print(picture_message)
+        logger.info(picture_message)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _image_loader(self, tile):
+        """ImageLoader for a tile, at scale 1 whatever scale is in config.py as windows and boxes are
+        in scale 1 pixels"""
+        return ImageLoader(
+            lat=tile.lat,
+            lon=tile.lon,
+            width=tile.width,
+            height=tile.height,
+            zoom=self.zoom,
+            scale=1,
+            map_type=self.map_type,
+            in_memory=self.in_memory,
+            cache=self.cache,
+            memory_cache=self.memory_cache,
+            transport=self.transport
+        )
+
+    def _load_tile(self, index):
+        im_loader = self._image_loader(self.tiles[index])
+        im_loader.open()
+        return index, im_loader
+
+    def chips(self):
+        """Downloads tiles on a pool of max_workers threads and crops every chip a tile serves as
+        soon as it loads. Tiles are submitted twice max_workers at a time, so only tiles in flight
+        are held in memory however slowly chips are consumed
+
+        Yields:
+            (point index, PIL.Image chip), in the order tiles load
+        """
+        points = np.argsort(self.assignment, kind='stable')
+        starts = np.searchsorted(self.assignment[points], np.arange(len(self.tiles) + 1))
+
+        workers = max(1, min(self.max_workers, len(self.tiles)))
+        indices = iter(range(len(self.tiles)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = {executor.submit(self._load_tile, index) for index in islice(indices, 2 * workers)}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index, im_loader = future.result()
+                        pending.update(executor.submit(self._load_tile, i) for i in islice(indices, 1))
+                        if im_loader.img is None:
+                            continue
+                        for point in points[starts[index]:starts[index + 1]]:
+                            yield int(point), im_loader.img.crop(tuple(int(v) for v in self.boxes[point]))
+                        im_loader.img.close()
+                        im_loader.delete()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def load(self):
+        """Downloads every chip
+
+        Returns:
+            list of PIL.Image, one chip per point in point order, None for points whose tile
+            couldn't be loaded
+        """
+        chips = [None] * len(self)
+        for point, chip in self.chips():
+            chips[point] = chip
+        return chips
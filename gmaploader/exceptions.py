@@ -1,4 +1,11 @@
 class DimensionTooBig(Exception):
     def __init__(self, dimension):
         self.message = f"{dimension} too big, change picture dimension threshold in config.py"
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class TileRequestFailed(Exception):
+    def __init__(self, status, reason=''):
+        self.status = status
+        self.message = f"Tile request failed with HTTP {status} {reason}".strip()
+        super().__init__(self.message)
@@ -1,6 +1,13 @@
 from .coordinates import Coordinates
 from .images import GMapImage, ImageLoader
+from .cache import resolve_cache, resolve_memory_cache
+from .tile import Tile
+from .plan import TilePlan
+from .manifest import resolve_manifest
 import math
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .config import SYSTEM_CONFIG
 from .config import logger
 
 logger = logger(name=__name__)
@@ -40,8 +47,32 @@ class GMapLoader(Coordinates, GMapImage):
         nearest_tile_latlon (tuple): (Left, top, right, bottom) lat-lon coordinates of
             top-left corner tile (tile_x, tile_y) to input lat-lon coordinates.
         img (PIL.Image): Image object.
+        array (numpy.ndarray): Image as uint8 array of shape (height, width, 3), with canvas='array'.
+        map_type (str): Map type tiles are downloaded with.
+        delete_temp (bool): Boolean flag to delete tiles once each loaded.
+        max_workers (int): Number of tiles downloaded concurrently.
+        in_memory (bool): Decode tiles straight from memory without writing them to temp_folder.
+        cache (TileCache): Persistent tile cache, None if not used.
+        memory_cache (MemoryCache): In-process decoded tile cache, None if not used.
+        transport (Transport): Transport tiles are fetched with, None for the default.
+        manifest (JobManifest): Job journal of downloaded tiles, None if not used.
+        snap (bool): Use tiles from the global tile lattice.
+        planner (str): Tile layout without snap, 'grid' or 'balanced'.
+        scale (int): Static Maps scale of tiles, image pixels per map pixel along each side.
+        tiles (list): Tiles (see tile.py) needed to build image.
+        rows (int): Number of rows of tiles in image.
+        columns (int): Number of columns of tiles in image.
+        save_on_load (bool): Boolean flag to save file image once loaded.
+        plan (TilePlan): Tiles needed to build image, their urls, cache status and cost.
+        loaded (bool): Whether tiles have been downloaded and stitched into img.
 
     Methods
+        load():
+            Downloads tiles and stitches them into the image, done on first use of img
+        batch(requests, max_workers=None, **kwargs):
+            Loads many images at once, downloading each distinct tile only once
+        job_spec(filepath=None):
+            Loader class and arguments as plain data, to be loaded and saved in another process
         save(filepath=None, folder=None):
             Saves image either to a folder (saves original filename) or to an entire filepath
         delete()
@@ -90,11 +121,20 @@ class GMapLoader(Coordinates, GMapImage):
 
     """
 
+    def __new__(cls, *args, **kwargs):
+        self = super().__new__(cls)
+        # Arguments the loader was made with, so job_spec can rebuild it in a worker process
+        self._arguments = (args, kwargs)
+        return self
+
     def __init__(self, lat, lon, zoom=19, width=500, height=500, map_type='satellite', save=False,
-                 delete_temp=True, **kwargs):
-        """Calculates number of rows and columns of 640x618 tiles needed to generate entire image.
-        For each 640x618 tile, calculates the latitude and longitude of the centre of the tile, loads
-        image, and then stitches this to final image
+                 delete_temp=True, max_workers=None, in_memory=None, cache=None, memory_cache=None,
+                 snap=None, lazy=None, canvas='pil', transport=None, manifest=None, scale=None, planner=None,
+                 **kwargs):
+        """Plans the 640x640 tiles needed to generate entire image into a TilePlan: the latitude and
+        longitude of the centre of each tile, its url, crop box, cache status and the number of
+        billable calls. Nothing is downloaded until load() is called or img is first used, unless
+        lazy is False or save is set.
 
         Args:
             lat (float): Latitude coordinate of top left of image.
@@ -107,49 +147,367 @@ class GMapLoader(Coordinates, GMapImage):
             save (bool, optional): Boolean flag to save file image once loaded.
             delete_temp (bool, optional): Boolean flag to delete tiles once each loaded into
                 final composite image.
+            max_workers (int, optional): Number of tiles downloaded concurrently, defaults to
+                max_workers in config.py. 1 downloads tiles one at a time.
+            in_memory (bool, optional): Decode tiles straight from memory without writing them to
+                temp_folder, defaults to in_memory in config.py.
+            cache (bool or TileCache, optional): Persistent tile cache to read tiles from and store
+                downloaded tiles in. True uses the default cache set up in config.py, defaults to
+                cache in config.py.
+            memory_cache (bool or MemoryCache, optional): In-process cache of decoded tiles, checked
+                before the tile cache or downloading. True uses the process-wide cache, defaults to
+                memory_cache in config.py.
+            snap (bool, optional): Use tiles from the global tile lattice (see
+                Coordinates.lattice_tiles) so overlapping requests share identical, cacheable tiles.
+                May need one more row or column of tiles than the default grid. Defaults to
+                snap_to_grid in config.py.
+            lazy (bool, optional): Only plan tiles, don't download anything until load() is called
+                or img is first used. Defaults to lazy_load in config.py, always False with save.
+            canvas (str, optional): 'pil' to stitch tiles into a PIL image, or 'array' to write them
+                straight into a uint8 NumPy array exposed as self.array, with self.img copied from it
+                on first use.
+            transport (Transport, optional): Transport tiles are fetched with (see transport.py),
+                defaults to transport in config.py, or HTTP.
+            manifest (bool or str, optional): Record downloaded tiles in a job manifest (see
+                manifest.py) so rerunning an interrupted job resumes where it stopped. True for a
+                manifest in manifest_folder in config.py, or a folder to keep it in. Defaults to
+                manifest in config.py.
+            scale (int, optional): Static Maps scale, 2 for 1280x1280 tiles covering the same ground
+                as 640x640 ones, so width x height pixels need a quarter of the tiles at twice the
+                resolution. Defaults to scale in config.py.
+            planner (str, optional): Tile layout without snap, 'grid' for 640x618 tiles from the top
+                left of the image, or 'balanced' for the same number of tiles sized to fit the image
+                (see Coordinates.balanced_tiles), fetching fewer wasted pixels. Defaults to planner
+                in config.py.
 
         """
-        super().__init__(lat=lat, lon=lon, zoom=zoom, width=width, height=height, **kwargs)
+        super().__init__(lat=lat, lon=lon, zoom=zoom, width=width, height=height, canvas=canvas,
+                         allocate=False, scale=scale, **kwargs)
+        self.map_type = map_type
+        self.delete_temp = delete_temp
+        self.max_workers = max_workers or SYSTEM_CONFIG.get('max_workers')
+        self.in_memory = SYSTEM_CONFIG.get('in_memory') if in_memory is None else in_memory
+        self.cache = resolve_cache(cache)
+        self.memory_cache = resolve_memory_cache(memory_cache)
+        self.transport = transport
+
+        self.snap = SYSTEM_CONFIG.get('snap_to_grid') if snap is None else snap
+        self.planner = planner or SYSTEM_CONFIG.get('planner')
+        if self.planner not in ('grid', 'balanced'):
+            raise ValueError(f"planner must be 'grid' or 'balanced', not {self.planner!r}")
+        self.save_on_load = save
+
+        self.loaded = False
+        self._loading = False
 
-        # Calculate number of rows and columns needed to build image from
-        # 640 x 618 tiles
-        rows = math.ceil(height / 618)
-        columns = math.ceil(width / 640)
+        # Plan 640 x 640 tiles needed to build image
+        self.manifest = None
+        self.tiles = self._plan()
+        self.plan = TilePlan(self.tiles, [self._image_loader(tile) for tile in self.tiles])
+
+        # Manifest is keyed by the plan, so it's attached once the plan exists
+        self.manifest = resolve_manifest(manifest, self.plan)
+        for im_loader in self.plan.loaders:
+            im_loader.manifest = self.manifest
+        self.rows = max(tile.row for tile in self.tiles) + 1
+        self.columns = max(tile.col for tile in self.tiles) + 1
 
         # Display number of pictures needed
-        total = rows*columns
-        picture_message = f"{total} image{'s' if total > 1 else ''} required"
+        total = len(self.tiles)
+        picture_message = f"{total} image{'s' if total > 1 else ''} required, {self.plan.billable()} to download"
+        print(picture_message)
+        logger.info(picture_message)
+
+        if lazy is None:
+            lazy = SYSTEM_CONFIG.get('lazy_load')
+        if not lazy or save:
+            self.load()
+
+    def load(self):
+        """Downloads tiles and stitches them into the composite image, saving it if save was set.
+        Does nothing if already loaded.
+
+        Returns:
+            None
+        """
+        if self.loaded:
+            return
+
+        self._loading = True
+        try:
+            self._new_canvas()
+            self._load()
+            self._finish()
+            self.loaded = True
+        finally:
+            self._loading = False
+
+        logger.info(f'({self.lat}, {self.lon}), {self.width}x{self.height}, zoom:{self.zoom}')
+        # Save GMapImage into output folder
+        if self.save_on_load:
+            self.save()
+        self._complete_manifest()
+
+    def _ensure_loaded(self):
+        """Loads image on first use of img or array"""
+        if not self.loaded and not self._loading and self.canvas is not None:
+            self.load()
+
+    @property
+    def img(self):
+        """Image object, loaded on first use"""
+        self._ensure_loaded()
+        return GMapImage.img.fget(self)
+
+    @img.setter
+    def img(self, img):
+        GMapImage.img.fset(self, img)
+
+    @property
+    def array(self):
+        """Image as uint8 array with canvas='array', loaded on first use"""
+        self._ensure_loaded()
+        return GMapImage.array.fget(self)
+
+    @array.setter
+    def array(self, array):
+        GMapImage.array.fset(self, array)
+
+    @classmethod
+    def batch(cls, requests, max_workers=None, **kwargs):
+        """Loads many images at once, downloading each distinct tile only once.
+
+        Plans the tiles of every request up front, collapses tiles with the same request url
+        across requests, downloads each distinct tile once on a shared pool of max_workers
+        threads and pastes it into every image that needs it. Overlapping requests only share
+        tiles if they line up, so dense point sets benefit most with snap=True.
+
+        Every image is allocated before the first tile arrives and held until the batch returns, so
+        the batch needs memory for all of them at once (width x height x 3 bytes each). Split large
+        batches into chunks, or use Pipeline, which only holds the images in flight.
+
+        Args:
+            requests (list of dict): GMapLoader arguments for each image, e.g. lat, lon, width.
+            max_workers (int, optional): Number of tiles downloaded concurrently, defaults to
+                max_workers in config.py.
+            **kwargs: GMapLoader arguments shared by every request, overridden by those in requests.
+
+        Returns:
+            list of GMapLoader: Loaded images, in the same order as requests
+
+        Example usage
+            points = [(51.5638, -0.1647), (51.5640, -0.1650)]
+            gmls = GMapLoader.batch([dict(lat=lat, lon=lon) for lat, lon in points], snap=True)
+        """
+        max_workers = max_workers or SYSTEM_CONFIG.get('max_workers')
+        options = [dict(kwargs, **request) for request in requests]
+        loaders = [cls(**dict(option, lazy=True, save=False)) for option in options]
+
+        # Group tiles by request url, first image needing a tile downloads it
+        shared = {}
+        for gml in loaders:
+            for tile, im_loader in gml.plan:
+                if im_loader.cache_key not in shared:
+                    shared[im_loader.cache_key] = (im_loader, gml.delete_temp, [])
+                shared[im_loader.cache_key][2].append((gml, tile))
+
+        total = sum(len(gml.tiles) for gml in loaders)
+        picture_message = f'{len(shared)} unique images required for {len(loaders)} requests ({total} without deduplication)'
         print(picture_message)
         logger.info(picture_message)
 
-        # Iterate over required rows and columns of 640 x 640 tiles for full image size
-        for row in range(rows):
-            for col in range(columns):
+        def load_shared(key):
+            im_loader = shared[key][0]
+            im_loader.open()
+            return key
+
+        for gml in loaders:
+            gml._loading = True
+            gml._new_canvas()
+
+        def paste_shared(key):
+            im_loader, delete_temp, users = shared.pop(key)
+            if im_loader.img is not None:
+                for gml, tile in users:
+                    gml._paste(im_loader.img, box=tile.box, offset=tile.offset, close=False)
+                im_loader.img.close()
+            if delete_temp:
+                im_loader.delete()
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(shared)))) as executor:
+            futures = [executor.submit(load_shared, key) for key in shared]
+            for future in as_completed(futures):
+                paste_shared(future.result())
+
+        for gml, option in zip(loaders, options):
+            gml._finish()
+            gml.loaded = True
+            gml._loading = False
+            logger.info(f'({gml.lat}, {gml.lon}), {gml.width}x{gml.height}, zoom:{gml.zoom}')
+            if option.get('save'):
+                gml.save()
+            gml._complete_manifest()
+        return loaders
 
+    def job_spec(self, filepath=None):
+        """Everything needed to rebuild this loader in another process and load and save its image
+        there, as plain picklable data: the loader class and the arguments it was made with (see
+        processes.py). Transports and the memory cache stay in this process, the tile cache and
+        manifest are passed by folder.
+
+        Args:
+            filepath (str, optional): Filepath to save image to, defaults to img_filepath
+
+        Returns:
+            dict
+        """
+        args, kwargs = self._arguments
+        kwargs = dict(kwargs, transport=None, memory_cache=None, cache=False, manifest=False,
+                      filepath=filepath or self.img_filepath)
+        cache = None if self.cache is None else (self.cache.folder, self.cache.max_bytes, self.cache.ttl)
+        manifest = None
+        if self.manifest is not None:
+            manifest = (self.manifest.job_id, os.path.dirname(self.manifest.folder))
+        return {
+            'loader': type(self),
+            'args': args,
+            'kwargs': kwargs,
+            'cache': cache,
+            'manifest': manifest,
+            'filepath': kwargs['filepath'],
+        }
+
+    def _finish(self):
+        """Post-processes the composite image once every tile is pasted in. Called by load, batch
+        and Pipeline, whichever stitched the image, subclasses e.g. mask or resample here.
+
+        Returns:
+            None
+        """
+
+    def _complete_manifest(self):
+        """Removes the job manifest once the image is stitched, post-processed and saved, so a job
+        that fails before then resumes from its downloaded tiles"""
+        if self.manifest is not None:
+            self.manifest.complete()
+
+    def _plan(self):
+        """Plans tiles needed to build image.
+
+        By default the image is split into a grid of 640x618 tiles (1280x1236 at scale 2) starting
+        at the top left of the image, with edge tiles cropped to fit. With snap, tiles come from the
+        global tile lattice instead, and with the balanced planner tiles are sized to fit the image.
+
+        Returns:
+            list of Tile
+        """
+        if self.snap:
+            return self.lattice_tiles()
+        if self.planner == 'balanced':
+            return self.balanced_tiles()
+
+        pitch_x, pitch_y = self.pitch
+        tiles = []
+        for row in range(math.ceil(self.height / pitch_y)):
+            for col in range(math.ceil(self.width / pitch_x)):
                 # Generate lat-lon coordinates of centre of tile
                 lat_c, lon_c = self.tile_center_latlon(row=row, col=col)
-
-                # Initialise ImageLoader with center coordinates, zoom
-                im_loader = ImageLoader(
+                crop_x, crop_y = self._crop_dims(row, col)
+                tiles.append(Tile(
+                    row=row,
+                    col=col,
                     lat=lat_c,
                     lon=lon_c,
-                    width=640,
-                    height=640,
-                    zoom=zoom,
-                    map_type=map_type
-                )
+                    box=(0, 0, crop_x, crop_y),
+                    offset=(pitch_x * col, pitch_y * row)
+                ))
+        return tiles
 
-                # Load 640x640 image from Google Maps
-                img_640 = im_loader.open()
+    def _load(self):
+        """Downloads every tile of the grid and pastes each into the composite image.
 
-                # Paste image into GMapImage object
-                self._add_image(img_640, row=row, col=col)
+        Tiles are downloaded on a pool of max_workers threads and pasted on the calling thread
+        as they complete. Each tile covers its own region of the composite image, so the result
+        doesn't depend on the order downloads finish in.
 
-                # Remove from temp_folder
-                if delete_temp:
-                    im_loader.delete()
+        Returns:
+            None
+        """
+        for im_loader, tile in self._load_tiles(self.tiles):
+            self._paste_tile(im_loader, tile)
 
-        logger.info(f'({self.lat}, {self.lon}), {self.width}x{self.height}, zoom:{self.zoom}')
-        # Save GMapImage into output folder
-        if save:
-            self.save()
+    def _load_tiles(self, tiles):
+        """Downloads tiles on a pool of max_workers threads
+
+        Args:
+            tiles (list of Tile): Planned tiles
+
+        Yields:
+            (ImageLoader, Tile) for each tile as it finishes loading
+        """
+        if self.max_workers <= 1 or len(tiles) <= 1:
+            for tile in tiles:
+                yield self._load_tile(tile)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tiles))) as executor:
+            futures = [executor.submit(self._load_tile, tile) for tile in tiles]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _image_loader(self, tile):
+        """ImageLoader for a tile
+
+        Args:
+            tile (Tile): Planned tile
+
+        Returns:
+            ImageLoader
+        """
+        return ImageLoader(
+            lat=tile.lat,
+            lon=tile.lon,
+            width=tile.width,
+            height=tile.height,
+            zoom=self.zoom,
+            scale=self.scale,
+            map_type=self.map_type,
+            in_memory=self.in_memory,
+            cache=self.cache,
+            memory_cache=self.memory_cache,
+            transport=self.transport,
+            manifest=self.manifest
+        )
+
+    def _load_tile(self, tile):
+        """Downloads and opens a planned tile
+
+        Args:
+            tile (Tile): Planned tile
+
+        Returns:
+            (ImageLoader, Tile) with the tile loaded into ImageLoader.img
+        """
+        im_loader = self._image_loader(tile)
+
+        # Load 640x640 image from Google Maps
+        im_loader.open()
+        return im_loader, tile
+
+    def _paste_tile(self, im_loader, tile):
+        """Pastes a loaded tile into the composite image and removes it from temp_folder if required
+
+        Args:
+            im_loader (ImageLoader): Loaded tile
+            tile (Tile): Planned tile
+
+        Returns:
+            None
+        """
+        # Paste image into GMapImage object
+        if im_loader.img is not None:
+            self._paste(im_loader.img, box=tile.box, offset=tile.offset)
+
+        # Remove from temp_folder
+        if self.delete_temp:
+            im_loader.delete()
@@ -1,8 +1,13 @@
 from PIL import Image
+import io
+import numpy as np
 import os
-import urllib.request
+import tempfile
 import matplotlib.pyplot as plt
 from .request import Request
+from .transport import resolve_transport
+from .locks import striped_lock
+from .singleflight import FLIGHTS
 from .exceptions import DimensionTooBig
 from .config import SYSTEM_CONFIG
 from .config import logger
@@ -33,7 +38,7 @@ class ImageSuper(Request):
             Creates folders needed for desired filepath
 
     """
-    def __init__(self, lat, lon, zoom, height, width, folder):
+    def __init__(self, lat, lon, zoom, height, width, folder, check_dimensions=True, scale=None):
         """Constructs all the necessary attributes for the image superclass. Checks input width
         and height against config dimension threshold.
 
@@ -44,17 +49,22 @@ class ImageSuper(Request):
             width (int): Width of final image.
             height (int): Height of final image.
             folder (str): folder type, either 'output_folder' or 'temp_folder'
+            check_dimensions (bool, optional): Check width and height against dimension threshold,
+                False for images never held in memory in full.
+            scale (int, optional): Static Maps scale, defaults to scale in config.py.
 
         Raises
             DimensionTooBig: If either width or height above config dimension threshold.
         """
-        super().__init__(lat, lon, zoom, height, width)
+        super().__init__(lat, lon, zoom, height, width, scale=scale)
 
         self.img_filename = f'{self.lat}_{self.lon}_{self.zoom}_{self.width}_{self.height}.jpg'
         self.img_filepath = os.path.join(SYSTEM_CONFIG.get(folder), self.img_filename)
         self.img = None
 
         # Check against max image size. Size can be changed in config.py
+        if not check_dimensions:
+            return
         if self.height:
             if self.height > SYSTEM_CONFIG.get('dimension_threshold'):
                 raise DimensionTooBig(self.height)
@@ -132,17 +142,23 @@ class GMapImage(ImageSuper):
         img_filename (str): Default filename for image, composed of lat, lon, zoom, width, height
         img_filepath (str): Default filepath for image
         img (PIL.Image): Image object
+        canvas (str): 'pil' for a PIL image canvas, 'array' for a NumPy array canvas, None for no
+            in-memory image
+        array (numpy.ndarray): uint8 array of shape (height, width, 3) with an array canvas, else None.
+            img is a copy of it, made again after array is next used
         nearest_tile_latlon (tuple): lat-lon coordinates of top-left corner of nearest
             tile to input lat-lon coordinates
 
     Methods
         add_image(img, row, col):
             Adds image tile to composite image based on row and column references
+        paste(img, box, offset):
+            Adds region of image tile to composite image at pixel offset
         crop_dims(row, col):
             Calculate how much, if at all, to crop image to fit into composite image
 
     """
-    def __init__(self, lat, lon, zoom, height, width, **kwargs):
+    def __init__(self, lat, lon, zoom, height, width, canvas='pil', allocate=True, scale=None, **kwargs):
         """
 
         Args:
@@ -151,22 +167,72 @@ class GMapImage(ImageSuper):
             zoom (int): Zoom level (max 19).
             width (int): Width of final image.
             height (int): Height of final image.
+            canvas (str, optional): 'pil' to stitch into a PIL image, 'array' to stitch straight
+                into a uint8 NumPy array of shape (height, width, 3) with img copied from it on
+                first use, or None for no in-memory image (the image is streamed elsewhere, so
+                dimension threshold doesn't apply).
+            allocate (bool, optional): Allocate canvas now, False to leave it to _new_canvas().
+            scale (int, optional): Static Maps scale of tiles, 2 to stitch 1280x1280 tiles at double
+                resolution. Defaults to scale in config.py.
             **kwargs:
         """
-        super().__init__(lat, lon, zoom, height, width, 'output_folder')
+        super().__init__(lat, lon, zoom, height, width, 'output_folder', check_dimensions=canvas is not None,
+                         scale=scale)
+        if canvas not in ('pil', 'array', None):
+            raise ValueError(f"canvas must be 'pil', 'array' or None, not {canvas!r}")
+        self.canvas = canvas
+        self.array = None
 
-        self.img = Image.new(mode='RGB', size=(width, height))
+        if allocate:
+            self._new_canvas()
 
         logger.debug(f'GMapImage:{width}x{height}')
 
         if kwargs.get('filepath'):
             self.img_filepath = kwargs.get('filepath')
 
+    def _new_canvas(self):
+        """Allocates blank composite image for tiles to be pasted into
+
+        Returns:
+
+        """
+        if self.canvas == 'pil':
+            self.img = Image.new(mode='RGB', size=(self.width, self.height))
+        elif self.canvas == 'array':
+            self.img = None
+            self.array = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+    @property
+    def img(self):
+        """Image object. With an array canvas, copied from array on first use. PIL can't share
+        the memory of an RGB array, so the copy is dropped whenever array is used, as it may be
+        written through, and made again on next use"""
+        if self._img is None and self._array is not None:
+            self._img = Image.fromarray(self._array)
+        return self._img
+
+    @img.setter
+    def img(self, img):
+        self._img = img
+
+    @property
+    def array(self):
+        """uint8 array with canvas='array', else None"""
+        if self._array is not None:
+            self._img = None
+        return self._array
+
+    @array.setter
+    def array(self, array):
+        self._array = array
+
     def _add_image(self, img, row, col):
         """Pastes input image 'img' into final composite image 'self.img'
 
         Pastes input image based on number of rows (618 pixels) and columns (640 pixels) that
-        goes into full image size. Crops boundary images to required size if necessary.
+        goes into full image size, doubled at scale 2. Crops boundary images to required size if
+        necessary.
 
         For example a 1000 x 1000 image will required 4 (2 along, 2 high) 640 x 618 tile images.
         Each tile image is added to the final image, and the edge images are cropped to fit 1000 x
@@ -183,25 +249,80 @@ class GMapImage(ImageSuper):
         # calculate image x and y crop distances (if required)
         crop_x, crop_y = self._crop_dims(row, col)
 
-        # apply crop
-        img_cropped = img.crop((0, 0, crop_x, crop_y))
-
         # Paste image to top_left coordinates in self.img
-        top_left_coords = (640 * col, 618 * row)
-        logger.debug(f'Top-left coords: {top_left_coords}')
-        self.img.paste(img_cropped, top_left_coords)
+        pitch_x, pitch_y = self.pitch
+        self._paste(img, box=(0, 0, crop_x, crop_y), offset=(pitch_x * col, pitch_y * row))
+
+    def _paste(self, img, box, offset, close=True):
+        """Crops input image 'img' to box and pastes it into final composite image 'self.img' at offset
+
+        Args:
+            img (PIL.Image): Image to be pasted into full image
+            box (tuple): (left, top, right, bottom) region of img to keep
+            offset (tuple): (x, y) top-left coordinates in full image to paste region at
+            close (bool, optional): Close img once pasted, False if it's pasted into other images too
+
+        Returns:
+
+        """
+        # apply crop
+        img_cropped = img.crop(box)
+
+        logger.debug(f'Top-left coords: {offset}')
+        if self.array is not None:
+            # Write region straight into array slice, only the cropped region is converted to an
+            # array, never the whole tile
+            if img_cropped.mode != 'RGB':
+                img_cropped = img_cropped.convert('RGB')
+            x, y = offset
+            self.array[y:y + img_cropped.height, x:x + img_cropped.width] = np.asarray(img_cropped)
+        else:
+            self.img.paste(img_cropped, offset)
 
         # close both images, allows for files to be deleted
-        img.close()
+        if close:
+            img.close()
         img_cropped.close()
 
+    def _apply_mask(self, mask):
+        """Blacks out pixels of composite image outside mask
+
+        Args:
+            mask (numpy.ndarray): bool array of shape (height, width), True for pixels kept
+
+        Returns:
+
+        """
+        if self.array is not None:
+            self.array[~mask] = 0
+        else:
+            self.img = Image.composite(self.img, Image.new('RGB', self.img.size), Image.fromarray(mask))
+
+    def _resize(self, size, resample):
+        """Resamples composite image to size, keeping the canvas type
+
+        Args:
+            size (tuple): (width, height) of resampled image
+            resample (int): PIL resampling filter
+
+        Returns:
+
+        """
+        if self.array is not None:
+            resized = Image.fromarray(self.array).resize(size, resample)
+            self.array = np.asarray(resized).copy()
+            self.img = None
+        else:
+            self.img = self.img.resize(size, resample)
+        self.width, self.height = size
+
     def _crop_dims(self, row, col):
         """Calculates image crop coordinates for boundary images so that final image fits the
         required width x height dimensions
 
         For example a 1000 x 1000 image will required 4 (2 along, 2 high) 640 x 618 tile images.
         The first (0,0) tile won't need cropping, however the rest are 'edge' images and will need
-        to be cropped to fit 1000 x 1000
+        to be cropped to fit 1000 x 1000. At scale 2 tiles are 1280 x 1236 after the logo crop.
 
         Args:
             row (int): Row coordinate of 618 pixel rows that makes up the full image
@@ -212,19 +333,21 @@ class GMapImage(ImageSuper):
 
         """
 
+        pitch_x, pitch_y = self.pitch
+
         # image coordinates for top left of image
-        origin_x = col * 640
-        origin_y = row * 618
+        origin_x = col * pitch_x
+        origin_y = row * pitch_y
 
         # image coordinates for bottom right of image
-        boundary_x = origin_x + 640
-        boundary_y = origin_y + 618
+        boundary_x = origin_x + pitch_x
+        boundary_y = origin_y + pitch_y
 
         logger.debug(f'patch:({origin_x},{origin_y},{boundary_x},{boundary_y})')
 
         # initialise default values
-        crop_x = 640
-        crop_y = 618
+        crop_x = pitch_x
+        crop_y = pitch_y
 
         # check against width/heights of desired output
         if boundary_x > self.width:
@@ -246,22 +369,42 @@ class ImageLoader(ImageSuper):
         width (int): Width of final image.
         height (int): Height of final image.
         folder (str): folder type, either 'output_folder' or 'temp_folder'
-        img_filename (str): Default filename for image, composed of lat, lon, zoom, width, height
+        img_filename (str): Default filename for image, composed of lat, lon, zoom, width, height,
+            map_type
         img_filepath (str): Default filepath for image
         img (PIL.Image): Image object
         map_type (str, optional): Defines what map type to use {'roadmap', 'satellite', 'terrain', 'hybrid'}.
+        in_memory (bool): Decode tile straight from memory, never writing it to temp_folder
+        cache (TileCache): Tile cache checked before downloading
+        memory_cache (MemoryCache): Decoded tile cache checked before anything else
+        transport (Transport): Transport tiles are fetched with, None for the default
+        manifest (JobManifest): Job journal downloaded tiles are recorded in, None if not used
+        url (str): Google Static Maps API url for this tile
+        cache_key (str): Request url without the API key
+        cache_status (str): Where open() would load the tile from, None if it needs downloading
 
     Methods
+        fetch():
+            Downloads image tile bytes
         download():
-            Downloads image tile
+            Downloads image tile into temp_folder
         open()
             Loads image tile
     """
-    def __init__(self, map_type='satellite', **kwargs):
+    def __init__(self, map_type='satellite', in_memory=False, cache=None, memory_cache=None, transport=None,
+                 manifest=None, **kwargs):
         """
 
         Args:
             map_type (str, optional): Defines what map type to use {'roadmap', 'satellite', 'terrain', 'hybrid'}.
+            in_memory (bool, optional): Decode downloaded tile straight from memory, never
+                writing it to temp_folder.
+            cache (TileCache, optional): Tile cache checked before downloading, and filled after.
+            memory_cache (MemoryCache, optional): Decoded tile cache checked before anything else.
+            transport (Transport, optional): Transport tiles are fetched with, defaults to transport
+                in config.py or HTTPTransport.
+            manifest (JobManifest, optional): Job journal downloaded tiles are recorded in and
+                resumed from.
             lat (float): Latitude coordinate of top left of image.
             lon (float): Longitude coordinate of top left of image.
             zoom (int, optional): Zoom level (max 19).
@@ -271,51 +414,210 @@ class ImageLoader(ImageSuper):
         """
         super().__init__(folder='temp_folder', **kwargs)
         self.map_type = map_type
-
-    def download(self):
-        """Downloads image from Google Maps API
-
-        Returns:
-
-        """
-
-        if os.environ.get('GMAP_KEY') is None:
-            print("No API key provided. Use os.environ['GMAP_KEY'] = 'KEYHERE'")
-            return
-
-        # build url
+        self.in_memory = in_memory
+        self.cache = cache
+        self.memory_cache = memory_cache
+        self.transport = transport
+        self.manifest = manifest
+
+        # map_type and scale change the image, so they're part of the temp filename
+        scale = f'_{self.scale}x' if self.scale != 1 else ''
+        self.img_filename = f'{self.lat}_{self.lon}_{self.zoom}_{self.width}_{self.height}_{self.map_type}{scale}.jpg'
+        self.img_filepath = os.path.join(SYSTEM_CONFIG.get('temp_folder'), self.img_filename)
+
+    def _format_url(self, api_key):
+        """Fills url_template in config.py with tile parameters"""
         url = SYSTEM_CONFIG.get('url_template')
-        url = url.format(
+        if self.scale != 1 and '{scale}' not in url:
+            raise ValueError('url_template in config.py has no {scale} parameter, needed for scale != 1')
+        return url.format(
             lat=self.lat,
             lon=self.lon,
             zoom=self.zoom,
             width=self.width,
             height=self.height,
             map_type=self.map_type,
-            api_key=os.environ.get('GMAP_KEY')
+            scale=self.scale,
+            api_key=api_key
         )
 
-        # Download image
+    @property
+    def url(self):
+        """Google Static Maps API url for this tile, built from url_template in config.py"""
+        return self._format_url(os.environ.get('GMAP_KEY'))
+
+    @property
+    def cache_key(self):
+        """Request url without the API key, covers every url parameter that affects the image"""
+        return self._format_url('')
+
+    @property
+    def cache_status(self):
+        """Where open() would load the tile from right now: 'memory' (memory cache), 'manifest' (job
+        manifest of an interrupted run), 'cache' (tile cache), 'temp' (file left in temp_folder) or
+        None if it needs downloading"""
+        if self.memory_cache is not None and self.cache_key in self.memory_cache:
+            return 'memory'
+        if self.manifest is not None and self.cache_key in self.manifest:
+            return 'manifest'
+        if self.cache is not None:
+            return 'cache' if self.cache_key in self.cache else None
+        if not self.in_memory and os.path.exists(self.img_filepath):
+            return 'temp'
+        return None
+
+    def fetch(self):
+        """Downloads image bytes from Google Maps API with the tile transport, by default over the
+        shared keep-alive connection pool. With a job manifest, tiles downloaded by an earlier run
+        of the job are read from it instead, and new downloads are recorded in it.
+
+        Concurrent fetches of the same tile in the process share one request (see singleflight.py),
+        unless coalesce_requests in config.py is False.
+
+        Returns:
+            bytes: Encoded image, or None if no API key is set
+        """
+        if self.manifest is not None:
+            data = self.manifest.get(self.cache_key)
+            if data is not None:
+                logger.debug(f'Image loaded from job manifest:{self.img_filename}')
+                return data
+
+        transport = resolve_transport(self.transport)
+        needs_key = transport.requires_key and '{api_key}' in SYSTEM_CONFIG.get('url_template')
+        if needs_key and os.environ.get('GMAP_KEY') is None:
+            print("No API key provided. Use os.environ['GMAP_KEY'] = 'KEYHERE'")
+            return
+
+        if SYSTEM_CONFIG.get('coalesce_requests'):
+            data = FLIGHTS.do(self.cache_key, lambda: transport.get(self.url))
+        else:
+            data = transport.get(self.url)
+
+        # Requests coalesced from other jobs still go in this job's manifest
+        if self.manifest is not None and self.cache_key not in self.manifest:
+            self.manifest.put(self.cache_key, data)
+        return data
+
+    def download(self):
+        """Downloads image from Google Maps API into temp folder. Written to a temporary file and
+        renamed into place, so other processes sharing temp_folder never open a half-written tile.
+
+        Returns:
+
+        """
+        data = self.fetch()
+        if data is None:
+            return
+
         self.create_folders(self.img_filepath)
-        urllib.request.urlretrieve(url=url, filename=self.img_filepath)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.img_filepath), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.img_filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
         logger.debug(f'Image downloaded: {self.img_filepath}')
 
+    def lock(self):
+        """File lock of the tile in temp_folder, shared between processes (see locks.py)
+
+        Returns:
+            FileLock
+        """
+        return striped_lock(os.path.dirname(self.img_filepath), self.img_filename)
+
+    def _open_bytes(self, data):
+        """Decodes tile from bytes into self.img"""
+        self.img = Image.open(io.BytesIO(data))
+        logger.debug(f'Image loaded from memory:{self.img_filename}')
+        return self.img
+
     def open(self):
+        """Opens image tile, from the decoded tile memory cache if there is one and it holds the tile.
+        Otherwise loads the tile and, with a memory cache, stores the decoded tile in it.
+
+        Returns:
+            PIL.Image: Image tile
+        """
+        if self.memory_cache is None:
+            return self._open()
+
+        img = self.memory_cache.get(self.cache_key)
+        if img is not None:
+            self.img = img
+            logger.debug(f'Image loaded from memory cache:{self.img_filename}')
+            return self.img
+
+        img = self._open()
+        if img is None:
+            return
+        img.load()
+        self.memory_cache.put(self.cache_key, img)
+        self.img = img.copy()
+        return self.img
+
+    def _open(self):
         """Opens downloaded image tile.
 
-        Checks if file exist in temp folder, if it doesn't then downloads image into temp folder
-        before loading it
+        With a tile cache the tile is read from cache, or downloaded and stored in cache on a miss.
+        In memory mode the tile is downloaded and decoded without touching disk. Otherwise checks
+        if file exist in temp folder, if it doesn't then downloads image into temp folder before
+        loading it.
+
+        Downloads into the tile cache or temp folder hold the tile's file lock (see locks.py), so
+        when processes share the folder one downloads each tile and the rest wait and read it. Tiles
+        in temp folder are decoded under the lock too, as delete() takes it before removing them.
 
         Returns:
             PIL.Image: Image from self.img_filepath
         """
-        if not os.path.exists(self.img_filepath):
-            self.download()
+        if self.cache is not None:
+            data = self.cache.get(self.cache_key)
+            if data is None:
+                with self.cache.lock(self.cache_key):
+                    # Another process may have downloaded it while we waited for the lock
+                    if self.cache_key in self.cache:
+                        data = self.cache.get(self.cache_key)
+                    if data is None:
+                        data = self.fetch()
+                        if data is None:
+                            return
+                        self.cache.put(self.cache_key, data)
+            return self._open_bytes(data)
+
+        if self.in_memory:
+            data = self.fetch()
+            if data is None:
+                return
+            return self._open_bytes(data)
+
+        # Decoded while the lock is held, so a process deleting the tile once it's done with it
+        # can't remove it between the check and the read
+        with self.lock():
+            if not os.path.exists(self.img_filepath):
+                self.download()
+            if os.path.exists(self.img_filepath):
+                self.img = Image.open(self.img_filepath)
+                self.img.load()
+                logger.debug(f'Image loaded:{self.img_filepath}')
+                return self.img
+        logger.warning(f'File {self.img_filepath} doesnt exist')
+        return
 
-        if os.path.exists(self.img_filepath):
-            self.img = Image.open(self.img_filepath)
-            logger.debug(f'Image loaded:{self.img_filepath}')
-            return self.img
-        else:
-            print(f'{self.img_filepath} doesnt exist')
+    def delete(self):
+        """Deletes image file from self.img_filepath. Nothing to delete in memory or cache mode, or
+        if the tile came from the memory cache
+
+        Returns:
+
+        """
+        if self.in_memory or self.cache is not None:
             return
+        # Under the tile's lock, so no other process is between finding the tile and reading it
+        with self.lock():
+            if os.path.exists(self.img_filepath):
+                super().delete()
@@ -0,0 +1,77 @@
+import hashlib
+import os
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+try:
+    import fcntl
+except ImportError:  # No advisory file locks on Windows, tiles aren't locked across processes
+    fcntl = None
+
+logger = logger(name=__name__)
+
+# Tiles share lock files by hash, 16**LOCK_STRIPE_DIGITS of them per folder at most. Lock files are
+# never deleted, as a process waiting on a deleted one and a newcomer locking a fresh file of the
+# same name would both download the tile
+LOCK_STRIPE_DIGITS = 3
+
+
+class FileLock:
+    """Exclusive advisory lock (flock) on a lock file, held by one process or thread at a time.
+
+    Used for single-flight tile downloads: processes sharing temp_folder or a tile cache take the
+    lock of a tile before downloading it, so one downloads while the others wait and then read the
+    finished tile. The lock is released if the holder dies. Does nothing where fcntl isn't
+    available or file_locks in config.py is False.
+
+    Attributes
+        path (str): Lock filepath.
+
+    Example usage
+        with striped_lock(temp_folder, img_filename):
+            if not os.path.exists(img_filepath):
+                download()
+    """
+    def __init__(self, path):
+        """
+
+        Args:
+            path (str): Lock filepath, created if missing
+        """
+        self.path = path
+        self._fd = None
+
+    @staticmethod
+    def enabled():
+        """Whether file locks are taken"""
+        return fcntl is not None and SYSTEM_CONFIG.get('file_locks')
+
+    def __enter__(self):
+        if not self.enabled():
+            return self
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        logger.debug(f'Locked {self.path}')
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def striped_lock(folder, name):
+    """FileLock guarding name in folder, one of a fixed set of lock files in folder/.locks shared
+    between names by hash, so the folder never fills up with lock files
+
+    Args:
+        folder (str): Folder holding the locked files
+        name (str): Name of the locked file or key
+
+    Returns:
+        FileLock
+    """
+    stripe = hashlib.sha256(name.encode('utf-8')).hexdigest()[:LOCK_STRIPE_DIGITS]
+    return FileLock(os.path.join(folder, '.locks', stripe + '.lock'))
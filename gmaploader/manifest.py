@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class JobManifest:
+    """On-disk journal of the tiles a job has downloaded, so a job that dies partway through
+    resumes where it stopped instead of paying for every tile again.
+
+    A job is identified by its tile plan (see TilePlan.key), so rerunning the same request finds
+    the same manifest. Each downloaded tile's bytes are written to the job folder, then a line
+    recording the tile and where its bytes live is appended to the journal and synced to disk.
+    A tile is only ever in the journal once its bytes are safely on disk, and a line half written
+    by a crash is ignored. The job folder is removed once the job completes.
+
+    Attributes
+        job_id (str): Plan key of the job.
+        folder (str): Job folder, holding the journal and tile bytes.
+        journal_filepath (str): Journal filepath.
+        completed (dict): Tile cache key to bytes filepath of each tile downloaded so far.
+
+    Methods
+        get(cache_key):
+            Returns tile bytes, or None if not downloaded yet
+        put(cache_key, data):
+            Stores tile bytes and records the tile in the journal
+        complete():
+            Removes the job folder once the job is done
+    """
+    journal_filename = 'manifest.jsonl'
+
+    def __init__(self, job_id, folder=None):
+        """Reads the journal left by an earlier run of the job, if any
+
+        Args:
+            job_id (str): Plan key of the job
+            folder (str, optional): Folder job folders are kept in, defaults to manifest_folder in
+                config.py
+        """
+        self.job_id = job_id
+        self.folder = os.path.join(folder or SYSTEM_CONFIG.get('manifest_folder'), job_id)
+        self.journal_filepath = os.path.join(self.folder, self.journal_filename)
+        self.completed = {}
+        self._lock = threading.Lock()
+        self._read_journal()
+
+    def _read_journal(self):
+        """Loads completed tiles from the journal, skipping any whose bytes are missing or truncated"""
+        if not os.path.exists(self.journal_filepath):
+            return
+
+        with open(self.journal_filepath) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Line cut short by a crash
+                    continue
+                path = os.path.join(self.folder, entry['path'])
+                if os.path.exists(path) and os.path.getsize(path) == entry['bytes']:
+                    self.completed[entry['key']] = path
+        logger.info(f'Job {self.job_id}: resuming with {len(self.completed)} tiles done')
+
+    def __len__(self):
+        return len(self.completed)
+
+    def __contains__(self, cache_key):
+        return cache_key in self.completed
+
+    def get(self, cache_key):
+        """Returns bytes of a downloaded tile
+
+        Args:
+            cache_key (str): Tile cache key (request url without API key)
+
+        Returns:
+            bytes: Tile, or None if not downloaded yet
+        """
+        path = self.completed.get(cache_key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, cache_key, data):
+        """Writes tile bytes into the job folder, then records the tile in the journal
+
+        Args:
+            cache_key (str): Tile cache key (request url without API key)
+            data (bytes): Tile
+
+        Returns:
+            None
+        """
+        filename = hashlib.sha256(cache_key.encode('utf-8')).hexdigest() + '.tile'
+        path = os.path.join(self.folder, filename)
+        os.makedirs(self.folder, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        entry = json.dumps({'key': cache_key, 'path': filename, 'bytes': len(data)})
+        with self._lock:
+            with open(self.journal_filepath, 'a') as f:
+                f.write(entry + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.completed[cache_key] = path
+
+    def complete(self):
+        """Removes the job folder once every tile is stitched into the output
+
+        Returns:
+            None
+        """
+        with self._lock:
+            shutil.rmtree(self.folder, ignore_errors=True)
+            self.completed = {}
+        logger.info(f'Job {self.job_id} complete')
+
+    def __repr__(self):
+        return f'JobManifest({self.job_id}, {len(self)} tiles done)'
+
+
+def resolve_manifest(manifest, plan):
+    """Turns a manifest argument into the JobManifest of a plan, or None
+
+    Args:
+        manifest (bool or str or JobManifest or None): True for a manifest in manifest_folder in
+            config.py, a folder to keep it in, or None to use manifest in config.py
+        plan (TilePlan): Plan of the job
+
+    Returns:
+        JobManifest or None
+    """
+    if manifest is None:
+        manifest = SYSTEM_CONFIG.get('manifest')
+    if manifest is True:
+        return JobManifest(plan.key())
+    if manifest is False:
+        return None
+    if isinstance(manifest, str):
+        return JobManifest(plan.key(), folder=manifest)
+    return manifest
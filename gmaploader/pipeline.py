@@ -0,0 +1,233 @@
+import queue
+import threading
+from .gmaploader import GMapLoader
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class _Job:
+    """A GMapLoader in flight through the pipeline, counting tiles stitched into it"""
+    __slots__ = ('gml', 'save', 'remaining')
+
+    def __init__(self, gml, save):
+        self.gml = gml
+        self.save = save
+        self.remaining = len(gml.tiles)
+
+
+class Pipeline:
+    """Loads many images as a pipeline of stages joined by bounded queues, so downloading,
+    decoding, stitching and encoding all run at once.
+
+    Tiles move through four stages: download threads fetch each tile, decode threads decode it,
+    one stitcher pastes it into its image, and encoder threads save each image once its last tile
+    is in. A later image's downloads overlap an earlier image's encode, so the network stays busy
+    in long batch jobs. Each queue holds at most queue_size items and a stage waits when the next
+    one is full, so memory is bounded by the queues rather than the size of the job: images are
+    only allocated once their first tile reaches the stitcher, and finished images wait in a
+    bounded output queue until they are consumed.
+
+    Tiles aren't shared between images as in GMapLoader.batch, use snap with a tile or memory cache
+    for overlapping images.
+
+    Attributes
+        download_workers (int): Threads downloading tiles.
+        decode_workers (int): Threads decoding tiles.
+        encode_workers (int): Threads saving finished images.
+        queue_size (int): Most items waiting between two stages.
+        loader (type): GMapLoader class images are planned with.
+
+    Methods
+        run(requests, **kwargs):
+            Yields each image once stitched, and saved if save was set
+
+    Example usage
+        from gmaploader.pipeline import Pipeline
+
+        pipeline = Pipeline(download_workers=16, decode_workers=4)
+        requests = [dict(lat=lat, lon=lon, save=True) for lat, lon in points]
+        for gml in pipeline.run(requests, width=1200, height=1200, snap=True, cache=True):
+            print(gml.img_filepath)
+    """
+    def __init__(self, download_workers=None, decode_workers=None, encode_workers=None, queue_size=None,
+                 loader=GMapLoader):
+        """
+
+        Args:
+            download_workers (int, optional): Threads downloading tiles, defaults to max_workers in
+                config.py.
+            decode_workers (int, optional): Threads decoding tiles, defaults to decode_workers in
+                config.py.
+            encode_workers (int, optional): Threads saving finished images, defaults to
+                encode_workers in config.py.
+            queue_size (int, optional): Most items waiting between two stages, defaults to
+                pipeline_queue_size in config.py.
+            loader (type, optional): GMapLoader class images are planned with.
+        """
+        self.download_workers = download_workers or SYSTEM_CONFIG.get('max_workers')
+        self.decode_workers = decode_workers or SYSTEM_CONFIG.get('decode_workers')
+        self.encode_workers = encode_workers or SYSTEM_CONFIG.get('encode_workers')
+        self.queue_size = queue_size or SYSTEM_CONFIG.get('pipeline_queue_size')
+        self.loader = loader
+
+    def run(self, requests, **kwargs):
+        """Loads images through the pipeline
+
+        Args:
+            requests (iterable of dict): GMapLoader arguments for each image, e.g. lat, lon, width.
+                Consumed as the pipeline has room, so it can be a generator.
+            **kwargs: GMapLoader arguments shared by every request, overridden by those in requests.
+
+        Yields:
+            GMapLoader: Each image once loaded, and saved if save was set, in the order they finish
+        """
+        self._stop = threading.Event()
+        self._error = None
+        downloads = queue.Queue(self.queue_size)
+        decodes = queue.Queue(self.queue_size)
+        stitches = queue.Queue(self.queue_size)
+        encodes = queue.Queue(self.queue_size)
+        self._output = queue.Queue(self.queue_size)
+
+        stages = [
+            (self._plan, (iter(requests), kwargs, downloads), 1, downloads, self.download_workers),
+            (self._download, (downloads, decodes), self.download_workers, decodes, self.decode_workers),
+            (self._decode, (decodes, stitches), self.decode_workers, stitches, 1),
+            (self._stitch, (stitches, encodes), 1, encodes, self.encode_workers),
+            (self._encode, (encodes, self._output), self.encode_workers, self._output, 1),
+        ]
+        threads = []
+        for target, args, workers, out, consumers in stages:
+            stage = [threading.Thread(target=self._worker, args=(target, args), daemon=True)
+                     for _ in range(workers)]
+            # Once every worker of a stage is done, each worker of the next stage gets an end marker
+            closer = threading.Thread(target=self._close, args=(stage, out, consumers), daemon=True)
+            threads.extend(stage + [closer])
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(self._output)
+                if item is _DONE:
+                    break
+                yield item
+            if self._error is not None:
+                raise self._error
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+    def _put(self, q, item):
+        """Puts an item on a bounded queue, giving up if the pipeline is stopping
+
+        Returns:
+            bool: Whether the item was queued
+        """
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """Gets an item from a queue, _DONE if the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _worker(self, target, args):
+        """Runs a stage, stopping the whole pipeline on error"""
+        try:
+            target(*args)
+        except Exception as e:
+            logger.error(f'Pipeline stage {target.__name__} failed: {e}')
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _close(self, stage, out, consumers):
+        """Waits for a stage's workers, then tells each worker of the next stage its input is done"""
+        for thread in stage:
+            thread.join()
+        for _ in range(consumers):
+            if not self._put(out, _DONE):
+                return
+
+    def _plan(self, requests, kwargs, downloads):
+        """Plans each request, queueing its tiles for download"""
+        for request in requests:
+            options = dict(kwargs, **request)
+            job = _Job(self.loader(**dict(options, lazy=True, save=False)), options.get('save', False))
+            job.gml._loading = True
+            for tile in job.gml.tiles:
+                if not self._put(downloads, (job, tile)):
+                    return
+
+    def _download(self, downloads, decodes):
+        """Downloads tiles"""
+        while True:
+            item = self._get(downloads)
+            if item is _DONE:
+                return
+            job, tile = item
+            im_loader, tile = job.gml._load_tile(tile)
+            if not self._put(decodes, (job, tile, im_loader)):
+                return
+
+    def _decode(self, decodes, stitches):
+        """Decodes downloaded tiles, Image.open only reads the header"""
+        while True:
+            item = self._get(decodes)
+            if item is _DONE:
+                return
+            im_loader = item[2]
+            if im_loader.img is not None:
+                im_loader.img.load()
+            if not self._put(stitches, item):
+                return
+
+    def _stitch(self, stitches, encodes):
+        """Pastes decoded tiles into their image, allocating it on its first tile"""
+        while True:
+            item = self._get(stitches)
+            if item is _DONE:
+                return
+            job, tile, im_loader = item
+            gml = job.gml
+            if job.remaining == len(gml.tiles):
+                gml._new_canvas()
+            gml._paste_tile(im_loader, tile)
+            job.remaining -= 1
+            if job.remaining:
+                continue
+
+            gml._finish()
+            gml.loaded = True
+            gml._loading = False
+            logger.info(f'({gml.lat}, {gml.lon}), {gml.width}x{gml.height}, zoom:{gml.zoom}')
+            if not self._put(encodes, job):
+                return
+
+    def _encode(self, encodes, output):
+        """Saves finished images and completes their manifests, then hands them on to run()"""
+        while True:
+            job = self._get(encodes)
+            if job is _DONE:
+                return
+            if job.save:
+                job.gml.save()
+            job.gml._complete_manifest()
+            if not self._put(output, job.gml):
+                return
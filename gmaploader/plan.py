@@ -0,0 +1,116 @@
+import hashlib
+import json
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class TilePlan:
+    """Tiles needed to build an image, and what loading them will cost, worked out without
+    downloading anything.
+
+    Attributes
+        tiles (list): Planned tiles (see tile.py), with centres, crop boxes and paste offsets.
+        loaders (list): ImageLoader for each tile, not yet opened.
+
+    Methods
+        urls():
+            Request url of each tile, including API key
+        cache_keys():
+            Request url of each tile without API key
+        cache_status():
+            Where each tile would be loaded from
+        billable():
+            Number of API calls loading the plan would make
+        records():
+            Plan as a list of dicts
+        key():
+            Hash identifying the plan
+    """
+    def __init__(self, tiles, loaders):
+        """
+
+        Args:
+            tiles (list of Tile): Planned tiles
+            loaders (list of ImageLoader): ImageLoader for each tile
+        """
+        self.tiles = tiles
+        self.loaders = loaders
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def __iter__(self):
+        return iter(zip(self.tiles, self.loaders))
+
+    def urls(self):
+        """Request url of each tile, including API key
+
+        Returns:
+            list of str
+        """
+        return [im_loader.url for im_loader in self.loaders]
+
+    def cache_keys(self):
+        """Request url of each tile without API key, identical for tiles that are the same request
+
+        Returns:
+            list of str
+        """
+        return [im_loader.cache_key for im_loader in self.loaders]
+
+    def cache_status(self):
+        """Where each tile would be loaded from right now, see ImageLoader.cache_status
+
+        Returns:
+            list of str or None, None for tiles that need downloading
+        """
+        return [im_loader.cache_status for im_loader in self.loaders]
+
+    def billable(self):
+        """Number of API calls loading the plan would make right now: distinct requests that
+        aren't already cached
+
+        Returns:
+            int
+        """
+        return len({
+            im_loader.cache_key
+            for im_loader, status in zip(self.loaders, self.cache_status())
+            if status is None
+        })
+
+    def records(self):
+        """Plan as a list of dicts, one per tile, without the API key
+
+        Returns:
+            list of dict
+        """
+        return [
+            {
+                'row': tile.row,
+                'col': tile.col,
+                'lat': tile.lat,
+                'lon': tile.lon,
+                'width': tile.width,
+                'height': tile.height,
+                'box': tile.box,
+                'offset': tile.offset,
+                'cache_key': im_loader.cache_key,
+                'cache_status': im_loader.cache_status,
+            }
+            for tile, im_loader in self
+        ]
+
+    def key(self):
+        """Hash identifying the plan: the same for any two plans making the same requests and
+        stitching them the same way
+
+        Returns:
+            str
+        """
+        plan = [[im_loader.cache_key, list(tile.box), list(tile.offset)] for tile, im_loader in self]
+        return hashlib.sha256(json.dumps(plan).encode('utf-8')).hexdigest()[:32]
+
+    def __repr__(self):
+        return f'TilePlan({len(self.tiles)} tiles, {self.billable()} billable)'
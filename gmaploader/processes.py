@@ -0,0 +1,148 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .gmaploader import GMapLoader
+from .cache import TileCache
+from .manifest import JobManifest
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+# Tile caches of a worker process, by (folder, max_bytes, ttl), so each is only scanned once
+_caches = {}
+
+
+def _init_worker(params, processes):
+    """Sets up a worker process with the parent's config, sharing rate_limit out between workers"""
+    SYSTEM_CONFIG.set(**params)
+    if SYSTEM_CONFIG.get('rate_limit') is not None:
+        SYSTEM_CONFIG.set(rate_limit=SYSTEM_CONFIG.get('rate_limit') / processes)
+
+
+def _picklable_config():
+    """Parameters of config.py that can be sent to a worker process, leaving out e.g. transports"""
+    params = {}
+    for key, value in SYSTEM_CONFIG.params.items():
+        try:
+            pickle.dumps(value)
+        except Exception:
+            logger.debug(f'{key} in config.py not sent to worker processes')
+            continue
+        params[key] = value
+    return params
+
+
+def render_job(spec):
+    """Rebuilds the loader of a job spec (see GMapLoader.job_spec) and loads, post-processes and
+    saves its image, run in a worker process. Tiles are downloaded and decoded on the loader's own
+    pool of max_workers threads, as in GMapLoader.load.
+
+    Args:
+        spec (dict): Job spec
+
+    Returns:
+        str: Filepath image was saved to
+    """
+    cache = spec['cache']
+    if cache is not None:
+        if cache not in _caches:
+            _caches[cache] = TileCache(*cache)
+        cache = _caches[cache]
+    manifest = JobManifest(*spec['manifest']) if spec['manifest'] is not None else None
+
+    kwargs = dict(spec['kwargs'], cache=cache or False, manifest=manifest or False, lazy=True, save=True)
+    gml = spec['loader'](*spec['args'], **kwargs)
+    gml.img.close()
+    return spec['filepath']
+
+
+class ProcessPool:
+    """Loads and saves many images on a pool of worker processes, for batch jobs bound by JPEG
+    decoding, stitching and encoding rather than the network.
+
+    The parent process only plans: each request is planned (see GMapLoader.job_spec) and its loader
+    class and arguments sent to a worker as plain data, never as PIL images. Each worker rebuilds the
+    loader, downloads, decodes, stitches and post-processes whole images on its own threads and saves
+    them straight to disk, so the work is spread over every core instead of contending for one
+    interpreter lock. At most max_pending images are planned ahead of the workers.
+
+    Workers start with the parent's config.py settings (anything that can be pickled), rate_limit
+    shared out evenly between them. Transports and the memory cache aren't shared, each worker
+    fetches with the default transport and keeps its own memory cache. Workers share the tile
+    cache and job manifests on disk.
+
+    Attributes
+        processes (int): Worker processes.
+        max_pending (int): Most images planned and not yet saved.
+
+    Methods
+        run(requests, loader=GMapLoader, **kwargs):
+            Yields (request index, filepath) as each image is saved
+
+    Example usage
+        from gmaploader.processes import ProcessPool
+
+        requests = [dict(lat=lat, lon=lon) for lat, lon in points]
+        for i, filepath in ProcessPool(processes=32).run(requests, width=2000, height=2000):
+            print(i, filepath)
+    """
+    def __init__(self, processes=None, max_pending=None, mp_context=None):
+        """
+
+        Args:
+            processes (int, optional): Worker processes, defaults to processes in config.py, or one
+                per CPU.
+            max_pending (int, optional): Most images planned and not yet saved, defaults to twice
+                processes.
+            mp_context (multiprocessing.context.BaseContext, optional): Start method of workers,
+                see concurrent.futures.ProcessPoolExecutor.
+        """
+        self.processes = processes or SYSTEM_CONFIG.get('processes') or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.processes
+        self.mp_context = mp_context
+
+    def run(self, requests, loader=GMapLoader, **kwargs):
+        """Plans each request and saves its image in a worker process
+
+        Args:
+            requests (iterable of dict): Arguments of loader for each image, e.g. lat, lon, width,
+                and filepath to save it to (defaults to img_filepath in output_folder).
+            loader (type, optional): GMapLoader class images are planned with, e.g. AreaLoader.
+            **kwargs: Arguments shared by every request, overridden by those in requests.
+
+        Yields:
+            (int, str): Index of request and filepath its image was saved to, in the order they finish
+        """
+        executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=self.mp_context,
+                                       initializer=_init_worker, initargs=(_picklable_config(), self.processes))
+        pending = {}
+        try:
+            for index, request in enumerate(requests):
+                options = dict(kwargs, **request)
+                filepath = options.pop('filepath', None)
+                gml = loader(**dict(options, lazy=True, save=False))
+                pending[executor.submit(render_job, gml.job_spec(filepath))] = index
+
+                while len(pending) >= self.max_pending:
+                    yield from self._finished(pending, FIRST_COMPLETED)
+            while pending:
+                yield from self._finished(pending, FIRST_COMPLETED)
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def _finished(pending, return_when):
+        """Waits for jobs to finish, removing them from pending
+
+        Yields:
+            (int, str): Index of request and filepath its image was saved to
+        """
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            index = pending.pop(future)
+            filepath = future.result()
+            logger.info(f'Request {index} saved to {filepath}')
+            yield index, filepath
@@ -0,0 +1,189 @@
+import threading
+import time
+from .exceptions import TileRequestFailed
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+# Responses meaning the endpoint is overloaded or throttling us
+THROTTLE_STATUSES = {429}
+
+
+def is_throttle(status):
+    """Whether an HTTP status should make requests back off: 429 and any 5xx"""
+    return status in THROTTLE_STATUSES or status >= 500
+
+
+class RateLimiter:
+    """Thread-safe limit on the rate and concurrency of tile requests, shared by every loader in
+    the process so parallel downloads stay under the Static Maps quota.
+
+    Rate is capped with a token bucket: tokens refill at rate per second up to burst, and each
+    request takes one, waiting for it if the bucket is empty. Concurrency is adapted AIMD style:
+    the limit on requests in flight grows by one for every limit successful requests, and halves
+    (at most once per cooldown) when a request is throttled with HTTP 429 or fails with a 5xx or a
+    connection error. Sustained throughput just under the quota then beats bursts followed by
+    throttling.
+
+    Attributes
+        rate (float): Requests per second, None for no limit.
+        burst (int): Most requests sent at once after an idle period.
+        max_concurrency (int): Upper bound on requests in flight.
+        adaptive (bool): Adapt concurrency to throttling, if False it stays at max_concurrency.
+        limit (float): Current limit on requests in flight.
+        in_flight (int): Requests currently in flight.
+
+    Methods
+        acquire():
+            Waits for a free slot and a token
+        release(status):
+            Frees a slot and adapts the concurrency limit to the response status
+        call(fn, *args):
+            Calls fn within the limits
+        stats():
+            Current state
+    """
+    def __init__(self, rate=None, burst=None, max_concurrency=None, adaptive=None, cooldown=1.0):
+        """
+
+        Args:
+            rate (float, optional): Requests per second, defaults to rate_limit in config.py.
+            burst (int, optional): Bucket size, defaults to rate_burst in config.py.
+            max_concurrency (int, optional): Upper bound on requests in flight, defaults to
+                max_concurrency in config.py.
+            adaptive (bool, optional): Adapt concurrency to throttling, defaults to
+                adaptive_concurrency in config.py.
+            cooldown (float, optional): Seconds after a decrease before the limit can decrease
+                again, so one burst of failures only halves it once.
+        """
+        self._rate = rate
+        self._burst = burst
+        self._max_concurrency = max_concurrency
+        self._adaptive = adaptive
+        self.cooldown = cooldown
+
+        self._condition = threading.Condition()
+        self._tokens = None
+        self._updated = time.monotonic()
+        self._last_decrease = float('-inf')
+        self._limit = None
+        self.in_flight = 0
+        self.throttled = 0
+
+    @property
+    def rate(self):
+        return self._rate if self._rate is not None else SYSTEM_CONFIG.get('rate_limit')
+
+    @property
+    def burst(self):
+        return self._burst if self._burst is not None else SYSTEM_CONFIG.get('rate_burst')
+
+    @property
+    def max_concurrency(self):
+        return self._max_concurrency or SYSTEM_CONFIG.get('max_concurrency')
+
+    @property
+    def adaptive(self):
+        return self._adaptive if self._adaptive is not None else SYSTEM_CONFIG.get('adaptive_concurrency')
+
+    @property
+    def limit(self):
+        if self._limit is None or not self.adaptive:
+            return float(self.max_concurrency)
+        return min(self._limit, self.max_concurrency)
+
+    def _take_token(self):
+        """Takes a token, returning how long to wait for it. Tokens are reserved in order, so the
+        bucket can go negative while callers wait for theirs. Called with the lock held."""
+        rate = self.rate
+        if not rate:
+            return 0.0
+
+        now = time.monotonic()
+        if self._tokens is None:
+            self._tokens = float(self.burst)
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * rate)
+        self._updated = now
+        self._tokens -= 1
+        return -self._tokens / rate if self._tokens < 0 else 0.0
+
+    def acquire(self):
+        """Waits until a request is allowed: fewer than limit requests in flight and a token in
+        the bucket
+
+        Returns:
+            None
+        """
+        with self._condition:
+            while self.in_flight >= max(int(self.limit), 1):
+                self._condition.wait()
+            self.in_flight += 1
+            wait = self._take_token()
+        if wait:
+            time.sleep(wait)
+
+    def release(self, status=200):
+        """Frees a slot, raising the concurrency limit on success and halving it when throttled.
+        Other client errors leave it as is.
+
+        Args:
+            status (int, optional): HTTP status of the response, None for a connection error
+
+        Returns:
+            None
+        """
+        with self._condition:
+            self.in_flight -= 1
+            limit = self.limit
+            if status is None or is_throttle(status):
+                self.throttled += 1
+                now = time.monotonic()
+                if self.adaptive and now - self._last_decrease >= self.cooldown:
+                    self._limit = max(limit / 2, 1.0)
+                    self._last_decrease = now
+                    logger.debug(f'HTTP {status}, concurrency limit {limit:.1f} -> {self._limit:.1f}')
+            elif self.adaptive and status < 400:
+                self._limit = min(limit + 1 / limit, self.max_concurrency)
+            self._condition.notify_all()
+
+    def call(self, fn, *args, **kwargs):
+        """Calls fn, a tile request, within the rate and concurrency limits
+
+        Args:
+            fn (callable): Function sending the request
+            *args: fn arguments
+            **kwargs: fn keyword arguments
+
+        Returns:
+            fn return value
+        """
+        self.acquire()
+        status = None
+        try:
+            result = fn(*args, **kwargs)
+            status = 200
+            return result
+        except TileRequestFailed as e:
+            status = e.status
+            raise
+        finally:
+            self.release(status)
+
+    def stats(self):
+        """Current state
+
+        Returns:
+            dict: rate, limit, in_flight and throttled (requests throttled so far)
+        """
+        with self._condition:
+            return {
+                'rate': self.rate,
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'throttled': self.throttled,
+            }
+
+
+# Process-wide limiter shared by every HTTPTransport
+LIMITER = RateLimiter()
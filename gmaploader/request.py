@@ -13,6 +13,9 @@ class Request:
         zoom (int, optional): Zoom level (max 19).
         width (int, optional): Width of final image.
         height (int, optional): Height of final image.
+        scale (int): Static Maps scale, pixels per map pixel along each side.
+        pitch (tuple): (x, y) pixels each tile adds to the image: its width, and its height less
+            the logo strip.
         filepath (str): Image filepath
 
     Methods
@@ -21,7 +24,7 @@ class Request:
 
 
     """
-    def __init__(self, lat, lon, zoom=19, height=618, width=640, **kwargs):
+    def __init__(self, lat, lon, zoom=19, height=618, width=640, scale=None, **kwargs):
         """Rounds lat and lon
 
         Args:
@@ -30,12 +33,15 @@ class Request:
             zoom (int, optional): Zoom level (max 19).
             width (int, optional): Width of final image.
             height (int, optional): Height of final image.
+            scale (int, optional): Static Maps scale, 2 for 1280x1280 pixel tiles of the same area as
+                640x640 ones. Defaults to scale in config.py.
             **kwargs:
         """
         self.lat, self.lon = self._round(lat, lon)
         self.zoom = zoom
         self.height = height
         self.width = width
+        self.scale = scale or SYSTEM_CONFIG.get('scale')
         self.filepath = kwargs.get('filepath')
 
         # if self.height:
@@ -45,6 +51,11 @@ class Request:
         #     if self.width > SYSTEM_CONFIG.get('dimension_threshold'):
         #         raise DimensionTooBig(self.width)
 
+    @property
+    def pitch(self):
+        """(x, y) pixels each tile adds to the image, 640x618 at scale 1"""
+        return 640 * self.scale, 618 * self.scale
+
     @staticmethod
     def _round(lat, lon):
         """Round coordinates to rounding parameter set in config
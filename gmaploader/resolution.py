@@ -0,0 +1,106 @@
+import math
+from PIL import Image
+from .gmaploader import GMapLoader
+from .coordinates import GM
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+def ground_resolution(lat, zoom):
+    """Metres on the ground per pixel at a latitude and zoom level. Mercator pixels shrink with
+    the cosine of latitude, GlobalMercator.Resolution is only right at the equator.
+
+    Args:
+        lat (float): Latitude
+        zoom (int): Zoom level
+
+    Returns:
+        float: Metres per pixel
+    """
+    return GM.Resolution(zoom) * math.cos(math.radians(lat))
+
+
+def zoom_for_resolution(lat, metres_per_pixel, max_zoom=None):
+    """Coarsest zoom level with pixels no bigger than metres_per_pixel on the ground at a latitude.
+    Every zoom level finer than that multiplies the number of tiles by 4.
+
+    Args:
+        lat (float): Latitude
+        metres_per_pixel (float): Target ground resolution
+        max_zoom (int, optional): Highest zoom level allowed, defaults to max_zoom in config.py
+
+    Returns:
+        int: Zoom level
+    """
+    max_zoom = SYSTEM_CONFIG.get('max_zoom') if max_zoom is None else max_zoom
+
+    # Equivalent resolution at the equator, where GlobalMercator resolutions are measured
+    pixel_size = metres_per_pixel / math.cos(math.radians(lat))
+    zoom = GM.ZoomForPixelSize(pixel_size)
+    if GM.Resolution(zoom) > pixel_size:
+        zoom += 1
+
+    if zoom > max_zoom:
+        logger.warning(f'{metres_per_pixel} m/px needs zoom {zoom}, using zoom {max_zoom} and upsampling')
+        zoom = max_zoom
+    return zoom
+
+
+class ResolutionLoader(GMapLoader):
+    """Loads an image at a target ground resolution, choosing the zoom level for you.
+
+    Fetches at the coarsest zoom level meeting metres_per_pixel at the image's latitude, covering
+    the same ground as width x height pixels at metres_per_pixel, then resamples to width x height.
+    Thumbnails and previews of wide areas need far fewer tiles than at a fixed high zoom level.
+    At scale 2 each fetched pixel is half a map pixel, so the zoom level chosen is one coarser.
+
+    Attributes
+        metres_per_pixel (float): Target ground resolution.
+        fetch_size (tuple): (width, height) fetched at zoom, before resampling.
+        resample (int): PIL resampling filter.
+
+    Example usage
+        from gmaploader import ResolutionLoader
+
+        gml = ResolutionLoader(lat=51.563839178, lon=-0.164794922, metres_per_pixel=2.0,
+                               width=800, height=800)
+        print(gml.zoom)
+        img = gml.img
+    """
+    def __init__(self, lat, lon, metres_per_pixel, width=500, height=500, resample=Image.LANCZOS,
+                 max_zoom=None, **kwargs):
+        """Chooses zoom level and plans tiles
+
+        Args:
+            lat (float): Latitude coordinate of top left of image.
+            lon (float): Longitude coordinate of top left of image.
+            metres_per_pixel (float): Target ground resolution of output image.
+            width (int, optional): Width of output image.
+            height (int, optional): Height of output image.
+            resample (int, optional): PIL resampling filter.
+            max_zoom (int, optional): Highest zoom level allowed, defaults to max_zoom in config.py.
+            **kwargs: GMapLoader arguments, e.g. map_type, cache, lazy, canvas.
+        """
+        self.metres_per_pixel = metres_per_pixel
+        self.resample = resample
+        self.output_size = (width, height)
+
+        scale = kwargs.get('scale') or SYSTEM_CONFIG.get('scale')
+        zoom = zoom_for_resolution(lat, metres_per_pixel * scale, max_zoom)
+        factor = metres_per_pixel * scale / ground_resolution(lat, zoom)
+        self.fetch_size = (max(int(math.ceil(width * factor)), 1), max(int(math.ceil(height * factor)), 1))
+        logger.info(f'{metres_per_pixel} m/px: zoom {zoom}, fetching {self.fetch_size[0]}x{self.fetch_size[1]}')
+
+        super().__init__(lat=lat, lon=lon, zoom=zoom, width=self.fetch_size[0], height=self.fetch_size[1],
+                         **kwargs)
+
+    def _finish(self):
+        """Resamples tiles stitched at fetch_size to the output size
+
+        Returns:
+            None
+        """
+        if self.fetch_size != self.output_size:
+            self._resize(self.output_size, self.resample)
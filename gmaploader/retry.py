@@ -0,0 +1,94 @@
+import collections
+import http.client
+import random
+import threading
+import numpy as np
+from .exceptions import TileRequestFailed
+from .ratelimit import is_throttle
+
+
+def is_retryable(error):
+    """Whether a failed tile request is worth retrying: timeouts, connection errors, HTTP 429 and
+    5xx. Other HTTP errors, e.g. 403 for a bad API key, fail the same way every time.
+
+    Args:
+        error (Exception): Error raised by the request
+
+    Returns:
+        bool
+    """
+    if isinstance(error, TileRequestFailed):
+        return is_throttle(error.status)
+    return isinstance(error, (OSError, http.client.HTTPException))
+
+
+def backoff(attempt, base, cap, rng=random):
+    """Delay before a retry: exponential backoff with full jitter, uniformly random between 0 and
+    base * 2**attempt, capped at cap, so clients retrying together spread out
+
+    Args:
+        attempt (int): Retries so far, 0 for the first retry
+        base (float): Delay in seconds before jitter on the first retry
+        cap (float): Longest delay in seconds
+        rng (random.Random, optional): Random number generator
+
+    Returns:
+        float: Seconds
+    """
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Thread-safe rolling window of recent request latencies
+
+    Attributes
+        window (int): Number of latencies kept.
+        min_samples (int): Latencies needed before percentile() returns anything.
+
+    Methods
+        add(seconds):
+            Records a latency
+        percentile(q):
+            Latency percentile of the window
+    """
+    def __init__(self, window=200, min_samples=20):
+        """
+
+        Args:
+            window (int, optional): Number of latencies kept
+            min_samples (int, optional): Latencies needed before percentile() returns anything
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._latencies)
+
+    def add(self, seconds):
+        """Records a latency
+
+        Args:
+            seconds (float): Latency
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, q):
+        """Latency percentile of the window
+
+        Args:
+            q (float): Percentile, 0 to 100
+
+        Returns:
+            float: Seconds, None if fewer than min_samples latencies are recorded
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            latencies = list(self._latencies)
+        return float(np.percentile(latencies, q))
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import Future
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one: the first caller runs the call and
+    everyone asking for the key while it's in flight waits on its Future and gets the same result,
+    or the same exception. Nothing is kept once the call finishes, so a later call runs again.
+
+    Used for tile downloads, so overlapping GMapLoaders in a threaded or async server make one
+    request per tile however many ask for it at once.
+
+    Attributes
+        calls (int): Calls run.
+        coalesced (int): Calls served from another call in flight.
+
+    Methods
+        do(key, fn):
+            Runs fn, or waits for the call in flight for key
+        stats():
+            Returns call counters
+    """
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def do(self, key, fn):
+        """Runs fn, or waits for the call for key already in flight
+
+        Args:
+            key (str): Call key, e.g. tile cache key
+            fn (callable): Call taking no arguments
+
+        Returns:
+            Result of fn, from this call or the one in flight
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.debug(f'Waiting on request in flight: {key}')
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def stats(self):
+        """Returns call counters
+
+        Returns:
+            dict: calls run, calls coalesced and calls in flight
+        """
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'in_flight': len(self)}
+
+
+# Tile downloads in flight across the process
+FLIGHTS = SingleFlight()
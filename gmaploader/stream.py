@@ -0,0 +1,104 @@
+import numpy as np
+from PIL import Image
+from .gmaploader import GMapLoader
+from .writers import strip_writer
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class GMapStreamLoader(GMapLoader):
+    """Loads images too large to hold in memory by streaming them to disk one row of tiles at a time.
+
+    Each row of tiles is downloaded, stitched into a strip of the image (618 pixel high with the
+    default grid) and written straight to filepath, then dropped from memory. Peak memory depends on
+    the image width, not its area, so the dimension threshold in config.py doesn't apply.
+
+    The output format is chosen by the extension of filepath (see writers.py):
+        .tif/.tiff: Uncompressed BigTIFF
+        .npy: NumPy array of shape (height, width, 3), open with numpy.load(filepath, mmap_mode='r')
+        .raw: Interleaved RGB bytes
+
+    Attributes
+        img_filepath (str): Output filepath.
+
+    Methods
+        load():
+            Downloads image row by row, writing it to img_filepath
+
+    Example usage
+        from gmaploader import GMapStreamLoader
+
+        gml = GMapStreamLoader(lat=51.563839178, lon=-0.164794922, width=20000, height=20000,
+                               filepath='output/london.tif')
+    """
+    def __init__(self, lat, lon, filepath, zoom=19, width=500, height=500, lazy=False, **kwargs):
+        """Plans tiles and, unless lazy, streams the image to filepath
+
+        Args:
+            lat (float): Latitude coordinate of top left of image.
+            lon (float): Longitude coordinate of top left of image.
+            filepath (str): Output filepath ending .tif, .tiff, .npy or .raw.
+            zoom (int, optional): Zoom level (max 19).
+            width (int, optional): Width of final image.
+            height (int, optional): Height of final image.
+            lazy (bool, optional): Only plan tiles, don't download anything until load() is called.
+            **kwargs: GMapLoader arguments, e.g. map_type, max_workers, cache, snap. Not save or
+                canvas, the image is always written straight to filepath.
+        """
+        for key in ('save', 'canvas'):
+            if kwargs.pop(key, None):
+                raise TypeError(f"GMapStreamLoader writes straight to filepath, {key} isn't supported")
+        super().__init__(lat=lat, lon=lon, zoom=zoom, width=width, height=height, filepath=filepath,
+                         canvas=None, lazy=True, save=False, **kwargs)
+        if not lazy:
+            self.load()
+
+    def _rows(self):
+        """Groups planned tiles by row
+
+        Returns:
+            list of (top, bottom, tiles) for each row, top and bottom being the rows of the image
+            the tiles cover
+        """
+        rows = {}
+        for tile in self.tiles:
+            rows.setdefault(tile.row, []).append(tile)
+
+        strips = []
+        for row in sorted(rows):
+            tiles = rows[row]
+            top = min(tile.offset[1] for tile in tiles)
+            bottom = max(tile.offset[1] + tile.box[3] - tile.box[1] for tile in tiles)
+            strips.append((top, bottom, tiles))
+        return strips
+
+    def load(self):
+        """Downloads image row by row, writing each strip to img_filepath once its tiles are pasted.
+        Does nothing if already loaded.
+
+        Returns:
+            None
+        """
+        if self.loaded:
+            return
+
+        with strip_writer(self.img_filepath, self.width, self.height) as writer:
+            for top, bottom, tiles in self._rows():
+                strip = Image.new(mode='RGB', size=(self.width, bottom - top))
+                for im_loader, tile in self._load_tiles(tiles):
+                    if im_loader.img is not None:
+                        img_cropped = im_loader.img.crop(tile.box)
+                        strip.paste(img_cropped, (tile.offset[0], tile.offset[1] - top))
+                        img_cropped.close()
+                        im_loader.img.close()
+                    if self.delete_temp:
+                        im_loader.delete()
+
+                writer.write(np.asarray(strip))
+                strip.close()
+                logger.debug(f'Strip {top}-{bottom} written')
+
+        self.loaded = True
+        self._complete_manifest()
+        logger.info(f'({self.lat}, {self.lon}), {self.width}x{self.height}, zoom:{self.zoom} streamed to {self.img_filepath}')
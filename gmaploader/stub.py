@@ -0,0 +1,209 @@
+import io
+import math
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from PIL import Image
+from .globalmaptiles import GlobalMercator
+from .config import logger
+
+logger = logger(name=__name__)
+
+GM = GlobalMercator()
+
+
+def synthetic_tile(lat, lon, zoom, width=640, height=640, scale=1, logo=22):
+    """Deterministic synthetic Static Maps image.
+
+    Each pixel's colour is a function of its global pixel coordinates at the zoom level, so tiles
+    stitched in the right place line up exactly: red is x % 256, green is y % 256 and blue is
+    (x // 256 + 7 * (y // 256)) % 256. The bottom logo rows are painted white, like the Google
+    logo strip that stitching has to crop out.
+
+    Args:
+        lat (float): Latitude of centre of image
+        lon (float): Longitude of centre of image
+        zoom (int): Zoom level
+        width (int, optional): Width requested
+        height (int, optional): Height requested
+        scale (int, optional): Pixel density, image is width*scale x height*scale pixels
+        logo (int, optional): Height of logo strip at scale 1
+
+    Returns:
+        PIL.Image
+    """
+    # A scale 2 image has the pixel density of the next zoom level
+    zoom = zoom + int(math.log2(scale))
+    width, height = width * scale, height * scale
+
+    mx, my = GM.LatLonToMeters(lat, lon)
+    px, py = GM.MetersToPixels(mx, my, zoom)
+    x0 = int(round(px - width / 2))
+    y0 = int(round(((256 << zoom) - py) - height / 2))
+
+    x = np.arange(x0, x0 + width)[None, :]
+    y = np.arange(y0, y0 + height)[:, None]
+    x, y = np.broadcast_arrays(x, y)
+    array = np.stack([x % 256, y % 256, (x // 256 + 7 * (y // 256)) % 256], axis=-1).astype(np.uint8)
+    if logo:
+        array[-logo * scale:] = 255
+    return Image.fromarray(array, 'RGB')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server.stub
+        query = {name: values[0] for name, values in parse_qs(urlsplit(self.path).query).items()}
+        status, content_type, body = server.respond(query)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        return
+
+
+class StubServer:
+    """Local stand-in for the Static Maps API for offline testing and benchmarking.
+
+    Serves deterministic synthetic images (see synthetic_tile) for the center, zoom, size, scale
+    and format query parameters of Static Maps requests, after a configurable latency with jitter,
+    and fails a configurable share of requests.
+
+    Attributes
+        latency (float): Seconds each response is delayed by.
+        jitter (float): Extra delay, uniformly random between 0 and jitter seconds.
+        error_rate (float): Share of requests answered with error_status.
+        error_status (int): HTTP status of failed requests.
+        image_format (str): Default image format, 'png' or 'jpeg', overridden by the format parameter.
+        requests (int): Number of requests received.
+        in_flight (int): Number of requests being answered.
+        peak_in_flight (int): Most requests answered at once.
+        url_template (str): url_template for config.py pointing at this server, no API key needed.
+
+    Methods
+        start():
+            Starts serving on a background thread
+        stop():
+            Stops serving
+
+    Example usage
+        from gmaploader import GMapLoader
+        from gmaploader.config import SYSTEM_CONFIG
+        from gmaploader.stub import StubServer
+
+        with StubServer(latency=0.05, jitter=0.02) as server:
+            SYSTEM_CONFIG.set(url_template=server.url_template)
+            gml = GMapLoader(lat=51.563839178, lon=-0.164794922, width=1200, height=1200)
+            img = gml.img
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_status=500, image_format='png',
+                 seed=0, host='127.0.0.1', port=0):
+        """
+
+        Args:
+            latency (float, optional): Seconds each response is delayed by.
+            jitter (float, optional): Extra delay, uniformly random between 0 and jitter seconds.
+            error_rate (float, optional): Share of requests answered with error_status.
+            error_status (int, optional): HTTP status of failed requests.
+            image_format (str, optional): Default image format, 'png' or 'jpeg'.
+            seed (int, optional): Seed for jitter and errors.
+            host (str, optional): Host to listen on.
+            port (int, optional): Port to listen on, 0 picks a free port.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.image_format = image_format
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url_template(self):
+        host, port = self._httpd.server_address[:2]
+        return (f'http://{host}:{port}/maps/api/staticmap?center={{lat}},{{lon}}&zoom={{zoom}}'
+                f'&size={{width}}x{{height}}&scale={{scale}}&maptype={{map_type}}')
+
+    def respond(self, query):
+        """Builds response to a request
+
+        Args:
+            query (dict): Query parameters
+
+        Returns:
+            (status, content type, body)
+        """
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        try:
+            return self._respond(query, delay, failed)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _respond(self, query, delay, failed):
+        """Builds response to a request once counted, see respond"""
+        if delay:
+            time.sleep(delay)
+        if failed:
+            return self.error_status, 'text/plain', b'Stub error'
+
+        try:
+            lat, lon = (float(value) for value in query['center'].split(','))
+            zoom = int(query.get('zoom', 19))
+            width, height = (int(value) for value in query.get('size', '640x640').split('x'))
+            scale = int(query.get('scale', 1))
+        except (KeyError, ValueError):
+            return 400, 'text/plain', b'Bad request'
+
+        image_format = query.get('format', self.image_format)
+        image_format = 'jpeg' if image_format.startswith('jp') else 'png'
+        img = synthetic_tile(lat, lon, zoom, width, height, scale)
+        buffer = io.BytesIO()
+        img.save(buffer, format=image_format)
+        return 200, f'image/{image_format}', buffer.getvalue()
+
+    def start(self):
+        """Starts serving on a background thread
+
+        Returns:
+            StubServer
+        """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.debug(f'Stub server on {self._httpd.server_address}')
+        return self
+
+    def stop(self):
+        """Stops serving
+
+        Returns:
+            None
+        """
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
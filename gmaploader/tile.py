@@ -0,0 +1,39 @@
+class Tile:
+    """A single Static Maps request and where it goes in the composite image
+
+    Attributes
+        row (int): Row of tile in the grid of tiles making up the image.
+        col (int): Column of tile in the grid of tiles making up the image.
+        lat (float): Latitude coordinate of centre of tile.
+        lon (float): Longitude coordinate of centre of tile.
+        width (int): Width of tile requested.
+        height (int): Height of tile requested.
+        box (tuple): (left, top, right, bottom) region of tile kept in the composite image.
+        offset (tuple): (x, y) pixel coordinates in composite image the kept region is pasted at.
+    """
+    __slots__ = ('row', 'col', 'lat', 'lon', 'width', 'height', 'box', 'offset')
+
+    def __init__(self, row, col, lat, lon, box, offset, width=640, height=640):
+        """
+
+        Args:
+            row (int): Row of tile in the grid of tiles making up the image.
+            col (int): Column of tile in the grid of tiles making up the image.
+            lat (float): Latitude coordinate of centre of tile.
+            lon (float): Longitude coordinate of centre of tile.
+            box (tuple): (left, top, right, bottom) region of tile kept in the composite image.
+            offset (tuple): (x, y) pixel coordinates in composite image the kept region is pasted at.
+            width (int, optional): Width of tile requested.
+            height (int, optional): Height of tile requested.
+        """
+        self.row = row
+        self.col = col
+        self.lat = lat
+        self.lon = lon
+        self.box = box
+        self.offset = offset
+        self.width = width
+        self.height = height
+
+    def __repr__(self):
+        return f'Tile(row={self.row}, col={self.col}, center=({self.lat},{self.lon}), box={self.box}, offset={self.offset})'
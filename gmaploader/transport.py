@@ -0,0 +1,261 @@
+import hashlib
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from .connection import POOL
+from .ratelimit import LIMITER
+from .retry import LatencyTracker, is_retryable, backoff
+from .exceptions import TileRequestFailed
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+def strip_api_key(url):
+    """Removes the key parameter from a url
+
+    Args:
+        url (str): Request url
+
+    Returns:
+        str: url without API key
+    """
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name != 'key']
+    return urlunsplit(parts._replace(query=urlencode(query, safe=',|:')))
+
+
+class Transport:
+    """Interface for fetching tile bytes from a url. Subclasses implement get().
+
+    Attributes
+        requires_key (bool): Whether requests need an API key to be set.
+
+    Methods
+        get(url):
+            Returns response body, raises TileRequestFailed on a failed request
+    """
+    requires_key = True
+
+    def get(self, url):
+        """Fetches url
+
+        Args:
+            url (str): Request url
+
+        Returns:
+            bytes: Response body
+
+        Raises:
+            TileRequestFailed: If the request fails.
+        """
+        raise NotImplementedError
+
+
+class HTTPTransport(Transport):
+    """Fetches tiles over HTTP(S) using a pool of keep-alive connections, within the rate and
+    concurrency limits of a RateLimiter.
+
+    Requests that time out, lose their connection or fail with HTTP 429 or 5xx are retried up to
+    retries times, with exponential backoff and full jitter between attempts. With hedging on, a
+    request still running after the hedge_percentile latency of recent requests gets a duplicate
+    sent alongside it and whichever finishes first is used. Mosaics wait for their slowest tile, so
+    this cuts tail latency for a few percent more API calls.
+
+    Attributes
+        pool (ConnectionPool): Connection pool, the process-wide pool by default.
+        limiter (RateLimiter): Rate limiter, the process-wide limiter by default.
+        retries (int): Retries of a failed request.
+        hedge_percentile (float): Latency percentile after which requests are hedged, None for no
+            hedging.
+        latency (LatencyTracker): Latencies of recent requests.
+        retried (int): Retries made so far.
+        hedged (int): Hedged requests sent so far.
+    """
+    def __init__(self, pool=None, limiter=None, retries=None, hedge_percentile=None):
+        """
+
+        Args:
+            pool (ConnectionPool, optional): Connection pool, defaults to the process-wide pool.
+            limiter (RateLimiter, optional): Rate limiter, defaults to the process-wide limiter.
+            retries (int, optional): Retries of a failed request, defaults to http_retries in
+                config.py.
+            hedge_percentile (float, optional): Latency percentile (0 to 100) after which requests
+                are hedged, defaults to hedge_percentile in config.py, 0 for no hedging.
+        """
+        self.pool = pool or POOL
+        self.limiter = limiter or LIMITER
+        self._retries = retries
+        self._hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker()
+        self.retried = 0
+        self.hedged = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def retries(self):
+        return self._retries if self._retries is not None else SYSTEM_CONFIG.get('http_retries')
+
+    @property
+    def hedge_percentile(self):
+        if self._hedge_percentile is not None:
+            return self._hedge_percentile or None
+        return SYSTEM_CONFIG.get('hedge_percentile')
+
+    def _timed_get(self, url):
+        """Sends request, recording its latency if it succeeds"""
+        start = time.perf_counter()
+        data = self.pool.get(url)
+        self.latency.add(time.perf_counter() - start)
+        return data
+
+    def _attempt(self, url):
+        """Sends request within the limiter's limits"""
+        return self.limiter.call(self._timed_get, url)
+
+    def _hedge_executor(self):
+        """Thread pool hedged requests run on, created on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2 * SYSTEM_CONFIG.get('max_concurrency'),
+                                                    thread_name_prefix='gmaploader-hedge')
+            return self._executor
+
+    def _hedged(self, url):
+        """Sends request, and a duplicate if it takes longer than the hedge percentile latency.
+        The first to succeed wins, the other is left to finish in the background.
+
+        Args:
+            url (str): Request url
+
+        Returns:
+            bytes: Response body
+        """
+        percentile = self.hedge_percentile
+        threshold = self.latency.percentile(percentile) if percentile else None
+        if threshold is None:
+            return self._attempt(url)
+
+        executor = self._hedge_executor()
+        primary = executor.submit(self._attempt, url)
+        try:
+            return primary.result(timeout=threshold)
+        except FuturesTimeoutError:
+            pass
+
+        logger.debug(f'Hedging request after {threshold:.3f}s: {strip_api_key(url)}')
+        self.hedged += 1
+        pending = {primary, executor.submit(self._attempt, url)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+        # Both failed
+        return future.result()
+
+    def get(self, url):
+        for attempt in itertools.count():
+            try:
+                return self._hedged(url)
+            except Exception as e:
+                if attempt >= self.retries or not is_retryable(e):
+                    raise
+                delay = backoff(attempt, SYSTEM_CONFIG.get('retry_backoff'), SYSTEM_CONFIG.get('retry_backoff_max'))
+                logger.debug(f'{e!r}, retry {attempt + 1} of {self.retries} in {delay:.2f}s: {strip_api_key(url)}')
+                self.retried += 1
+                time.sleep(delay)
+
+
+class RecordTransport(Transport):
+    """Fetches tiles with another transport and records every response in an archive folder that
+    ReplayTransport can serve them from later. Responses are stored under the url without its API
+    key.
+
+    Attributes
+        folder (str): Archive folder.
+        transport (Transport): Transport doing the fetching.
+    """
+    def __init__(self, folder, transport=None):
+        """
+
+        Args:
+            folder (str): Archive folder
+            transport (Transport, optional): Transport doing the fetching, defaults to HTTPTransport.
+        """
+        self.folder = folder
+        self.transport = transport or HTTPTransport()
+        self.requires_key = self.transport.requires_key
+
+    def get(self, url):
+        data = self.transport.get(url)
+        path = archive_path(self.folder, url)
+        os.makedirs(self.folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        logger.debug(f'Recorded {strip_api_key(url)}')
+        return data
+
+
+class ReplayTransport(Transport):
+    """Serves tiles from an archive folder written by RecordTransport, without any network access.
+    Urls missing from the archive fail with HTTP 404.
+
+    Attributes
+        folder (str): Archive folder.
+    """
+    requires_key = False
+
+    def __init__(self, folder):
+        """
+
+        Args:
+            folder (str): Archive folder
+        """
+        self.folder = folder
+
+    def get(self, url):
+        try:
+            with open(archive_path(self.folder, url), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise TileRequestFailed(status=404, reason=f'Not in archive: {strip_api_key(url)}')
+
+
+def archive_path(folder, url):
+    """Filepath a url's response is archived at
+
+    Args:
+        folder (str): Archive folder
+        url (str): Request url, with or without API key
+
+    Returns:
+        str: Filepath
+    """
+    digest = hashlib.sha256(strip_api_key(url).encode('utf-8')).hexdigest()
+    return os.path.join(folder, digest + '.bin')
+
+
+_default_transport = HTTPTransport()
+
+
+def resolve_transport(transport=None):
+    """Turns a transport argument into a Transport
+
+    Args:
+        transport (Transport, optional): None for transport in config.py, or the default
+            HTTPTransport if that isn't set either
+
+    Returns:
+        Transport
+    """
+    return transport or SYSTEM_CONFIG.get('transport') or _default_transport
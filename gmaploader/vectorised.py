@@ -0,0 +1,191 @@
+import numpy as np
+from .globalmaptiles import GlobalMercator
+from .config import SYSTEM_CONFIG
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class VectorMercator(GlobalMercator):
+    """GlobalMercator conversions that accept and return NumPy arrays.
+
+    Same methods and results as GlobalMercator in globalmaptiles.py, applied element-wise, so
+    millions of points can be converted without a Python loop. Scalars work too, and come back as
+    0-d arrays.
+
+    Methods
+        LatLonToMeters(lat, lon)
+        MetersToLatLon(mx, my)
+        PixelsToMeters(px, py, zoom)
+        MetersToPixels(mx, my, zoom)
+        PixelsToTile(px, py)
+        TileBounds(tx, ty, zoom)
+        TileLatLonBounds(tx, ty, zoom)
+    """
+
+    def LatLonToMeters(self, lat, lon):
+        "Converts given lat/lon in WGS84 Datum to XY in Spherical Mercator EPSG:900913"
+
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        mx = lon * self.originShift / 180.0
+        my = np.log(np.tan((90 + lat) * np.pi / 360.0)) / (np.pi / 180.0)
+
+        my = my * self.originShift / 180.0
+        return mx, my
+
+    def MetersToLatLon(self, mx, my):
+        "Converts XY point from Spherical Mercator EPSG:900913 to lat/lon in WGS84 Datum"
+
+        mx, my = np.asarray(mx, dtype=float), np.asarray(my, dtype=float)
+        lon = (mx / self.originShift) * 180.0
+        lat = (my / self.originShift) * 180.0
+
+        lat = 180 / np.pi * (2 * np.arctan(np.exp(lat * np.pi / 180.0)) - np.pi / 2.0)
+        return lat, lon
+
+    def PixelsToMeters(self, px, py, zoom):
+        "Converts pixel coordinates in given zoom level of pyramid to EPSG:900913"
+
+        res = self.Resolution(zoom)
+        mx = np.asarray(px, dtype=float) * res - self.originShift
+        my = np.asarray(py, dtype=float) * res - self.originShift
+        return mx, my
+
+    def MetersToPixels(self, mx, my, zoom):
+        "Converts EPSG:900913 to pyramid pixel coordinates in given zoom level"
+
+        res = self.Resolution(zoom)
+        px = (np.asarray(mx, dtype=float) + self.originShift) / res
+        py = (np.asarray(my, dtype=float) + self.originShift) / res
+        return px, py
+
+    def PixelsToTile(self, px, py):
+        "Returns a tile covering region in given pixel coordinates"
+
+        tx = (np.ceil(np.asarray(px, dtype=float) / float(self.tileSize)) - 1).astype(np.int64)
+        ty = (np.ceil(np.asarray(py, dtype=float) / float(self.tileSize)) - 1).astype(np.int64)
+        return tx, ty
+
+    def TileBounds(self, tx, ty, zoom):
+        "Returns bounds of the given tile in EPSG:900913 coordinates"
+
+        tx, ty = np.asarray(tx), np.asarray(ty)
+        minx, miny = self.PixelsToMeters(tx * self.tileSize, ty * self.tileSize, zoom)
+        maxx, maxy = self.PixelsToMeters((tx + 1) * self.tileSize, (ty + 1) * self.tileSize, zoom)
+        return minx, miny, maxx, maxy
+
+    def TileLatLonBounds(self, tx, ty, zoom):
+        "Returns bounds of the given tile in latutude/longitude using WGS84 datum"
+
+        bounds = self.TileBounds(tx, ty, zoom)
+        minLat, minLon = self.MetersToLatLon(bounds[0], bounds[1])
+        maxLat, maxLon = self.MetersToLatLon(bounds[2], bounds[3])
+
+        return -minLat, minLon, -maxLat, maxLon
+
+
+VM = VectorMercator()
+
+
+def _round(values):
+    """Rounds to latlon_round in config.py, as Request._round does for scalars"""
+    return np.round(values, SYSTEM_CONFIG.get('latlon_round'))
+
+
+def tile_xy(lat, lon, zoom):
+    """Google Map tile X-Y coordinates of arrays of lat-lons, as Coordinates._get_tile_xy
+
+    Args:
+        lat (array-like): Latitudes
+        lon (array-like): Longitudes
+        zoom (int): Zoom level
+
+    Returns:
+        (tile_x, tile_y) int64 arrays
+    """
+    lat, lon = _round(np.asarray(lat, dtype=float)), _round(np.asarray(lon, dtype=float))
+
+    # Add tiny amount to ensure in the right tile
+    lat = lat - (1/(10**SYSTEM_CONFIG.get('latlon_round')))
+    lon = lon + (1/(10**SYSTEM_CONFIG.get('latlon_round')))
+
+    tile_size = 256
+    num_tiles = 1 << zoom
+
+    point_x = (tile_size / 2 + lon * tile_size / 360.0) * num_tiles // tile_size
+    sin_y = np.sin(lat * (np.pi / 180.0))
+    point_y = ((tile_size / 2) + 0.5 * np.log((1 + sin_y) / (1 - sin_y)) * -(
+            tile_size / (2 * np.pi))) * num_tiles // tile_size
+
+    return point_x.astype(np.int64), point_y.astype(np.int64)
+
+
+def nearest_tile(lat, lon, zoom):
+    """(top, left, bottom, right) lat-lon bounds of the tile containing each lat-lon, as
+    Coordinates._nearest_tile
+
+    Args:
+        lat (array-like): Latitudes
+        lon (array-like): Longitudes
+        zoom (int): Zoom level
+
+    Returns:
+        (lat_tl, lon_tl, lat_br, lon_br) arrays
+    """
+    tile_x, tile_y = tile_xy(lat, lon, zoom)
+    return tuple(_round(bound) for bound in VM.TileLatLonBounds(tile_x, tile_y, zoom))
+
+
+def latlon_pixel(lat, lon, zoom):
+    """Degrees of lat and lon per pixel at each lat-lon, as Coordinates._latlon_pixel
+
+    Args:
+        lat (array-like): Latitudes
+        lon (array-like): Longitudes
+        zoom (int): Zoom level
+
+    Returns:
+        (lat_pxl, lon_pxl) arrays
+    """
+    lat_tl, lon_tl, lat_br, lon_br = nearest_tile(lat, lon, zoom)
+    return (lat_tl - lat_br) / 256, (lon_br - lon_tl) / 256
+
+
+def tile_centers(lat, lon, zoom, rows, columns):
+    """Lat-lon centres of the 640x618 tile grid of each image, as Coordinates.tile_center_latlon
+
+    Args:
+        lat (array-like): Latitudes of top left of each image
+        lon (array-like): Longitudes of top left of each image
+        zoom (int): Zoom level
+        rows (int): Rows of tiles in each image
+        columns (int): Columns of tiles in each image
+
+    Returns:
+        (lat_c, lon_c) arrays of shape (points, rows, columns)
+    """
+    lat, lon = _round(np.atleast_1d(np.asarray(lat, dtype=float))), _round(np.atleast_1d(np.asarray(lon, dtype=float)))
+    lat_pxl, lon_pxl = latlon_pixel(lat, lon, zoom)
+
+    row = np.arange(rows)[None, :, None]
+    col = np.arange(columns)[None, None, :]
+    lat_c = lat[:, None, None] - ((640 / 2) * lat_pxl[:, None, None]) - (row * 618 * lat_pxl[:, None, None])
+    lon_c = lon[:, None, None] + ((640 / 2) * lon_pxl[:, None, None]) + (col * 640 * lon_pxl[:, None, None])
+    lat_c, lon_c = np.broadcast_arrays(lat_c, lon_c)
+    return _round(lat_c), _round(lon_c)
+
+
+def global_pixels(lat, lon, zoom):
+    """Global pixel coordinates (origin top left of the world) of arrays of lat-lons
+
+    Args:
+        lat (array-like): Latitudes
+        lon (array-like): Longitudes
+        zoom (int): Zoom level
+
+    Returns:
+        (px, py) float arrays, py increasing southwards
+    """
+    mx, my = VM.LatLonToMeters(lat, lon)
+    px, py = VM.MetersToPixels(mx, my, zoom)
+    return px, (256 << zoom) - py
@@ -0,0 +1,176 @@
+import os
+import struct
+import numpy as np
+from numpy.lib import format as npy_format
+from .config import logger
+
+logger = logger(name=__name__)
+
+
+class StripWriter:
+    """Base class for writers that receive an RGB image as horizontal strips, top to bottom, and
+    write each straight to disk so only one strip is ever held in memory.
+
+    Attributes
+        filepath (str): Output filepath.
+        width (int): Width of image.
+        height (int): Height of image.
+        rows_written (int): Rows of image written so far.
+
+    Methods
+        write(strip):
+            Appends strip of rows (uint8 array of shape (rows, width, 3)) to image
+        close():
+            Finishes file
+    """
+    def __init__(self, filepath, width, height):
+        """Creates output file
+
+        Args:
+            filepath (str): Output filepath
+            width (int): Width of image
+            height (int): Height of image
+        """
+        self.filepath = filepath
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        folder = os.path.dirname(filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._file = open(filepath, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        return
+
+    def _write_footer(self):
+        return
+
+    def write(self, strip):
+        """Appends strip of rows to image
+
+        Args:
+            strip (numpy.ndarray): uint8 array of shape (rows, width, 3)
+
+        Returns:
+            None
+        """
+        strip = np.ascontiguousarray(strip, dtype=np.uint8)
+        if strip.shape[1:] != (self.width, 3):
+            raise ValueError(f'Strip shape {strip.shape} doesnt match image width {self.width}')
+        if self.rows_written + strip.shape[0] > self.height:
+            raise ValueError(f'Strip overflows image height {self.height}')
+
+        self._file.write(strip.tobytes())
+        self.rows_written += strip.shape[0]
+
+    def close(self):
+        """Finishes file
+
+        Returns:
+            None
+        """
+        if self.rows_written != self.height:
+            logger.warning(f'{self.filepath}: {self.rows_written} of {self.height} rows written')
+        self._write_footer()
+        self._file.close()
+        logger.info(f'File saved {self.filepath}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RawWriter(StripWriter):
+    """Writes raw interleaved RGB bytes, row by row, with no header"""
+
+
+class NpyWriter(StripWriter):
+    """Writes a .npy file of shape (height, width, 3), which numpy.load(filepath, mmap_mode='r')
+    opens without reading it into memory"""
+
+    def _write_header(self):
+        header = {'descr': '|u1', 'fortran_order': False, 'shape': (self.height, self.width, 3)}
+        npy_format.write_array_header_2_0(self._file, header)
+
+
+class TiffWriter(StripWriter):
+    """Writes an uncompressed RGB BigTIFF, one row per strip, so there's no 4GB size limit.
+
+    Image rows are written straight after the 16 byte header. The strip offset and byte count
+    tables and the image file directory are appended once every row is written.
+    """
+
+    def _write_header(self):
+        # Byte order, BigTIFF version 43, 8 byte offsets, first IFD offset patched on close
+        self._file.write(b'II' + struct.pack('<HHHQ', 43, 8, 0, 0))
+
+    def _write_footer(self):
+        row_bytes = self.width * 3
+        data_offset = 16
+
+        def align():
+            position = self._file.tell()
+            if position % 8:
+                self._file.write(b'\0' * (8 - position % 8))
+            return self._file.tell()
+
+        strip_offsets = align()
+        (np.arange(self.height, dtype='<u8') * row_bytes + data_offset).tofile(self._file)
+        strip_counts = align()
+        np.full(self.height, row_bytes, dtype='<u8').tofile(self._file)
+
+        # (tag, type, count, value), types: 3 SHORT, 4 LONG, 16 LONG8
+        entries = [
+            (256, 4, 1, struct.pack('<I', self.width)),  # ImageWidth
+            (257, 4, 1, struct.pack('<I', self.height)),  # ImageLength
+            (258, 3, 3, struct.pack('<HHH', 8, 8, 8)),  # BitsPerSample
+            (259, 3, 1, struct.pack('<H', 1)),  # Compression, none
+            (262, 3, 1, struct.pack('<H', 2)),  # PhotometricInterpretation, RGB
+            (273, 16, self.height, struct.pack('<Q', strip_offsets)),  # StripOffsets
+            (277, 3, 1, struct.pack('<H', 3)),  # SamplesPerPixel
+            (278, 4, 1, struct.pack('<I', 1)),  # RowsPerStrip
+            (279, 16, self.height, struct.pack('<Q', strip_counts)),  # StripByteCounts
+            (284, 3, 1, struct.pack('<H', 1)),  # PlanarConfiguration, chunky
+        ]
+        if self.height == 1:
+            # Single values are stored inline rather than at an offset
+            entries[5] = (273, 16, 1, struct.pack('<Q', data_offset))
+            entries[8] = (279, 16, 1, struct.pack('<Q', row_bytes))
+
+        ifd_offset = align()
+        self._file.write(struct.pack('<Q', len(entries)))
+        for tag, type_, count, value in entries:
+            self._file.write(struct.pack('<HHQ', tag, type_, count) + value.ljust(8, b'\0'))
+        self._file.write(struct.pack('<Q', 0))
+
+        self._file.seek(8)
+        self._file.write(struct.pack('<Q', ifd_offset))
+
+
+WRITERS = {
+    '.npy': NpyWriter,
+    '.tif': TiffWriter,
+    '.tiff': TiffWriter,
+    '.raw': RawWriter,
+}
+
+
+def strip_writer(filepath, width, height):
+    """Returns writer for filepath, chosen by file extension
+
+    Args:
+        filepath (str): Output filepath ending .npy, .tif, .tiff or .raw
+        width (int): Width of image
+        height (int): Height of image
+
+    Returns:
+        StripWriter
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f'No strip writer for {extension}, use one of {sorted(WRITERS)}')
+    return WRITERS[extension](filepath, width, height)
@@ -28,6 +28,7 @@ SETUP_ARGS = dict(
     packages=find_packages(include=['gmaploader', 'gmaploader.*']),
     install_requires=[
         'matplotlib>=3.3.4',
+        'numpy>=1.19.0',
         'Pillow>=9.0.0'
     ],
     # setup_requires=['pytest-runner'],
@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+from gmaploader.gmaploader import GMapLoader
+from gmaploader.transport import HTTPTransport
+from gmaploader.connection import ConnectionPool
+from gmaploader.stub import StubServer
+from gmaploader.config import SYSTEM_CONFIG
+
+# Static Maps url_template from config.py, before any test points it at a stub server
+URL_TEMPLATE = SYSTEM_CONFIG.get('url_template')
+
+
+class StubTestCase(unittest.TestCase):
+    """Test case running every test against its own StubServer, with url_template in config.py
+    pointing at it. Config changed with set_config is restored after each test.
+
+    Attributes
+        stub_options (dict): StubServer arguments, e.g. latency.
+        server (StubServer): Server of the running test.
+    """
+    stub_options = {}
+
+    def setUp(self):
+        self._config = {}
+        self.server = None
+        self.restart()
+
+    def tearDown(self):
+        self.server.stop()
+        SYSTEM_CONFIG.set(**self._config)
+
+    def set_config(self, **params):
+        """Sets config.py parameters for this test only"""
+        for key in params:
+            self._config.setdefault(key, SYSTEM_CONFIG.get(key))
+        SYSTEM_CONFIG.set(**params)
+
+    def restart(self, **options):
+        """Replaces the stub server with one taking options instead of stub_options"""
+        if self.server is not None:
+            self.server.stop()
+        self.server = StubServer(**(options or self.stub_options)).start()
+        self.set_config(url_template=self.server.url_template)
+        return self.server
+
+    @staticmethod
+    def transport(**kwargs):
+        """HTTPTransport with a pool of its own, as the stub server's port changes between tests"""
+        return HTTPTransport(ConnectionPool(), **kwargs)
+
+    def loader(self, cls=GMapLoader, **kwargs):
+        """Loader decoding tiles in memory without caches, fetching from the stub server"""
+        kwargs.setdefault('in_memory', True)
+        kwargs.setdefault('cache', False)
+        kwargs.setdefault('memory_cache', False)
+        kwargs.setdefault('transport', self.transport())
+        return cls(**kwargs)
+
+    def assertSeamless(self, array):
+        # Synthetic tiles colour every pixel by its global position, so a correctly stitched image
+        # steps by one in red along rows and in green down columns
+        array = np.asarray(array).astype(int)
+        self.assertTrue((np.diff(array[..., 0], axis=1) % 256 == 1).all())
+        self.assertTrue((np.diff(array[..., 1], axis=0) % 256 == 1).all())
+
+    def assertAligned(self, gml, array=None, inside=None):
+        # Red is global pixel x % 256 and green y % 256, at scale 2 those of the next zoom level
+        array = np.asarray(gml.img) if array is None else array
+        x0, y0 = (int(round(v * gml.scale)) for v in gml.pixel_origin)
+        red, green = np.broadcast_arrays((x0 + np.arange(gml.width))[None, :] % 256,
+                                         (y0 + np.arange(gml.height))[:, None] % 256)
+        inside = np.ones(array.shape[:2], dtype=bool) if inside is None else inside
+        self.assertTrue((array[..., 0][inside] == red[inside]).all())
+        self.assertTrue((array[..., 1][inside] == green[inside]).all())
+
+    def assertSameImage(self, first, second):
+        self.assertEqual(np.asarray(first).shape, np.asarray(second).shape)
+        self.assertTrue((np.asarray(first) == np.asarray(second)).all())
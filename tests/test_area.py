@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+from gmaploader.area import AreaLoader, polygon_bbox
+from gmaploader.pipeline import Pipeline
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+BBOX = (-0.1648, 51.5620, -0.1620, 51.5638)
+TRIANGLE = {'type': 'Polygon', 'coordinates': [[
+    (-0.1648, 51.5638), (-0.1620, 51.5638), (-0.1648, 51.5620), (-0.1648, 51.5638)
+]]}
+
+
+class TestSum(StubTestCase):
+
+    def area(self, **kwargs):
+        return self.loader(AreaLoader, zoom=19, **kwargs)
+
+    ###############
+    # AreaLoader tests
+    ###############
+
+    def test_polygon_bbox(self):
+        self.assertEqual(polygon_bbox(TRIANGLE), BBOX)
+
+    def test_bbox(self):
+        gml = self.area(bbox=BBOX)
+        self.assertEqual((gml.width, gml.height), (1045, 1081))
+        self.assertIsNone(gml.mask)
+        self.assertEqual(gml.skipped, 0)
+        array = np.asarray(gml.img)
+        self.assertAligned(gml, array)
+
+    def test_polygon_skips_tiles(self):
+        bbox = self.area(bbox=BBOX)
+        gml = self.area(polygon=TRIANGLE)
+        self.assertEqual((gml.width, gml.height), (bbox.width, bbox.height))
+        self.assertGreater(gml.skipped, 0)
+        self.assertEqual(len(gml.tiles) + gml.skipped, len(bbox.tiles))
+
+        gml.load()
+        self.assertEqual(self.server.requests, len(gml.tiles))
+
+        inside = np.asarray(gml.mask) > 0
+        array = np.asarray(gml.img)
+        self.assertFalse(array[~inside].any())
+        self.assertAligned(gml, array, inside)
+        self.assertEqual(gml.rgba().mode, 'RGBA')
+
+    def test_polygon_array_canvas(self):
+        gml = self.area(polygon=TRIANGLE, canvas='array')
+        inside = np.asarray(gml.mask) > 0
+        self.assertFalse(gml.array[~inside].any())
+        self.assertAligned(gml, gml.array, inside)
+
+    def test_polygon_batch_pipeline(self):
+        # Pixels outside the polygon are masked however the image is stitched
+        options = dict(zoom=19, in_memory=True, cache=False, memory_cache=False, transport=self.transport())
+        expected = self.area(polygon=TRIANGLE).img
+        self.assertSameImage(AreaLoader.batch([dict(polygon=TRIANGLE)], **options)[0].img, expected)
+        gml, = Pipeline(loader=AreaLoader).run([dict(polygon=TRIANGLE)], **options)
+        self.assertSameImage(gml.img, expected)
+
+    def test_no_geometry(self):
+        with self.assertRaises(ValueError):
+            AreaLoader(zoom=19)
+
+
+if __name__ == '__main__':
+    unittest.main()
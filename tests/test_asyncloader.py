@@ -0,0 +1,59 @@
+import asyncio
+import json
+import unittest
+from gmaploader import AsyncGMapLoader
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(StubTestCase):
+
+    def gml(self, **kwargs):
+        return self.loader(AsyncGMapLoader, **test_dct, **kwargs)
+
+    ###############
+    # AsyncGMapLoader tests
+    ###############
+
+    def test_matches_loader(self):
+        for canvas in ('pil', 'array'):
+            gml = self.gml(canvas=canvas, concurrency=2)
+            asyncio.run(gml.load())
+            self.assertTrue(gml.loaded)
+            self.assertSameImage(gml.img, self.loader(**test_dct).img)
+
+    def test_shared_semaphore(self):
+        self.restart(latency=0.05)
+
+        async def load():
+            semaphore = asyncio.Semaphore(3)
+            return await asyncio.gather(*(AsyncGMapLoader.create(
+                **test_dct, in_memory=True, cache=False, memory_cache=False, transport=self.transport(),
+                semaphore=semaphore) for _ in range(3)))
+
+        loaders = asyncio.run(load())
+        self.assertLessEqual(self.server.peak_in_flight, 3)
+        self.assertGreater(self.server.peak_in_flight, 1)
+        for gml in loaders:
+            self.assertSameImage(gml.img, self.loader(**test_dct).img)
+
+    def test_batch(self):
+        requests = [test_dct, dict(test_dct, lat=test_dct['lat'] + 0.001)]
+        loaders = AsyncGMapLoader.batch(requests, in_memory=True, cache=False, memory_cache=False)
+        for gml, request in zip(loaders, requests):
+            self.assertTrue(gml.loaded)
+            self.assertSameImage(gml.img, self.loader(**request).img)
+
+    def test_not_loaded(self):
+        gml = self.gml()
+        with self.assertRaises(RuntimeError):
+            gml.img
+        self.assertEqual(self.server.requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from gmaploader import GMapLoader
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+REQUESTS = [dict(lat=51.5638 + i * 0.0005, lon=-0.1647 - i * 0.0005) for i in range(4)]
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.options = dict(width=900, height=700, in_memory=True, cache=False, memory_cache=False,
+                            transport=self.transport())
+
+    ###############
+    # Batch tests
+    ###############
+
+    def test_dedup(self):
+        gmls = GMapLoader.batch(REQUESTS + REQUESTS, snap=True, **self.options)
+        unique = {im_loader.cache_key for gml in gmls for im_loader in gml.plan.loaders}
+        self.assertEqual(self.server.requests, len(unique))
+        self.assertLess(len(unique), sum(len(gml.tiles) for gml in gmls[:len(REQUESTS)]))
+
+    def test_matches_loader(self):
+        for snap in (False, True):
+            for canvas in ('pil', 'array'):
+                gmls = GMapLoader.batch(REQUESTS, snap=snap, canvas=canvas, **self.options)
+                for gml, request in zip(gmls, REQUESTS):
+                    self.assertTrue(gml.loaded)
+                    self.assertSameImage(gml.img, self.loader(**request, **self.options, snap=snap).img)
+
+    def test_request_options(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.set_config(output_folder=folder)
+            requests = [dict(REQUESTS[0], save=True, lazy=False), dict(REQUESTS[1], save=False)]
+            gmls = GMapLoader.batch(requests, **self.options)
+            self.assertEqual(os.listdir(folder), [os.path.basename(gmls[0].img_filepath)])
+        self.assertEqual(self.server.requests, sum(len(gml.tiles) for gml in gmls))
+
+
+if __name__ == '__main__':
+    unittest.main()
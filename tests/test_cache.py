@@ -0,0 +1,101 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from PIL import Image
+from gmaploader.cache import TileCache, MemoryCache
+from gmaploader.images import ImageLoader
+from gmaploader.config import logger
+
+logger = logger(name=__name__)
+
+
+class TestSum(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    ##################
+    # TileCache tests
+    ##################
+
+    def test_put_get(self):
+        cache = TileCache(folder=self.folder, max_bytes=None)
+        cache.put('a', b'123')
+        self.assertEqual(cache.get('a'), b'123')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        cache = TileCache(folder=self.folder, max_bytes=20)
+        cache.put('a', b'0' * 10)
+        cache.put('b', b'0' * 10)
+        cache.get('a')
+        cache.put('c', b'0' * 10)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.size, 20)
+        self.assertEqual(cache.evictions, 1)
+        self.assertFalse(os.path.exists(cache.path('b')))
+
+    def test_ttl(self):
+        cache = TileCache(folder=self.folder, max_bytes=None, ttl=60)
+        cache.put('a', b'123')
+        old = time.time() - 120
+        os.utime(cache.path('a'), (old, old))
+        self.assertIsNone(cache.get('a'))
+        self.assertNotIn('a', cache)
+
+    def test_rescan(self):
+        cache = TileCache(folder=self.folder, max_bytes=None)
+        cache.put('a', b'123')
+        cache = TileCache(folder=self.folder, max_bytes=None)
+        self.assertEqual(cache.get('a'), b'123')
+        self.assertEqual(cache.size, 3)
+
+    def test_key_includes_map_type(self):
+        kwargs = dict(lat=51.5, lon=-0.1, zoom=19, width=640, height=640)
+        satellite = ImageLoader(map_type='satellite', **kwargs)
+        roadmap = ImageLoader(map_type='roadmap', **kwargs)
+        self.assertNotEqual(satellite.cache_key, roadmap.cache_key)
+        self.assertNotEqual(satellite.img_filename, roadmap.img_filename)
+
+    def test_key_excludes_api_key(self):
+        os.environ['GMAP_KEY'] = 'secret'
+        try:
+            loader = ImageLoader(lat=51.5, lon=-0.1, zoom=19, width=640, height=640)
+            self.assertNotIn('secret', loader.cache_key)
+        finally:
+            del os.environ['GMAP_KEY']
+
+    ####################
+    # MemoryCache tests
+    ####################
+
+    def test_memory_get_returns_copy(self):
+        cache = MemoryCache(max_bytes=None)
+        cache.put('a', Image.new('RGB', (4, 4), (1, 2, 3)))
+        img = cache.get('a')
+        img.close()
+        self.assertEqual(cache.get('a').getpixel((0, 0)), (1, 2, 3))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_memory_lru_eviction(self):
+        cache = MemoryCache(max_bytes=4 * 4 * 3 * 2)
+        cache.put('a', Image.new('RGB', (4, 4)))
+        cache.put('b', Image.new('RGB', (4, 4)))
+        cache.get('a')
+        cache.put('c', Image.new('RGB', (4, 4)))
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.size, 96)
+
+
+if __name__ == '__main__':
+    unittest.main()
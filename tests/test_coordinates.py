@@ -69,6 +69,31 @@ class TestSum(unittest.TestCase):
         _, tile_lon_c = self.coord.tile_center_latlon(row=self.results['row'], col=self.results['col'])
         self.assertEqual(tile_lon_c, self.results['tile_lon_c'])
 
+    # pixel_latlon
+    def test_pixel_origin_latlon(self):
+        logger.info('Testing coord.pixel_latlon(), pixel_origin')
+        lat, lon = self.coord.pixel_latlon(*self.coord.pixel_origin)
+        self.assertEqual((lat, lon), (self.results['lat_tl'], self.results['lon_tl']))
+
+    # lattice_tiles
+    def test_lattice_tiles_cover_image(self):
+        logger.info('Testing coord.lattice_tiles(), coverage')
+        area = 0
+        for tile in self.coord.lattice_tiles():
+            left, top, right, bottom = tile.box
+            self.assertTrue(0 <= left < right <= 640 and 0 <= top < bottom <= 618)
+            self.assertTrue(tile.offset[0] + right - left <= test_dct['width'])
+            self.assertTrue(tile.offset[1] + bottom - top <= test_dct['height'])
+            area += (right - left) * (bottom - top)
+        self.assertEqual(area, test_dct['width'] * test_dct['height'])
+
+    def test_lattice_tiles_shared(self):
+        logger.info('Testing coord.lattice_tiles(), shared between overlapping requests')
+        shifted = Coordinates(**dict(test_dct, lat=self.results['lat_br'] - 1e-6, lon=self.results['lon_br'] + 1e-6))
+        centers = {(tile.lat, tile.lon) for tile in self.coord.lattice_tiles()}
+        shifted_centers = {(tile.lat, tile.lon) for tile in shifted.lattice_tiles()}
+        self.assertTrue(centers & shifted_centers)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+import time
+import unittest
+import numpy as np
+from gmaploader.cover import PointCover, greedy_cover
+from gmaploader.vectorised import global_pixels
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        rng = np.random.default_rng(0)
+        # Three clusters of points a few hundred pixels across at zoom 19
+        centres = np.array([[51.5638, -0.1648], [51.5600, -0.1600], [51.5700, -0.1700]])
+        self.lat = np.concatenate([c[0] + rng.normal(0, 0.0003, 100) for c in centres])
+        self.lon = np.concatenate([c[1] + rng.normal(0, 0.0004, 100) for c in centres])
+
+    ###############
+    # Greedy cover tests
+    ###############
+
+    def test_every_chip_fits(self):
+        px, py = global_pixels(self.lat, self.lon, 19)
+        left, top = np.floor(px).astype(int) - 50, np.floor(py).astype(int) - 50
+        windows, assignment = greedy_cover(left, top, 100)
+        self.assertTrue((assignment >= 0).all())
+        origin = np.array(windows)[assignment]
+        self.assertTrue((left >= origin[:, 0]).all() and (left + 100 <= origin[:, 0] + 640).all())
+        self.assertTrue((top >= origin[:, 1]).all() and (top + 100 <= origin[:, 1] + 618).all())
+
+    def test_fewer_requests(self):
+        cover = PointCover(self.lat, self.lon, radius=50, zoom=19)
+        self.assertLess(len(cover.tiles), len(cover) / 10)
+
+    def test_no_points(self):
+        cover = PointCover([], [], radius=50, zoom=19, transport=self.transport())
+        self.assertEqual(len(cover), 0)
+        self.assertEqual(cover.tiles, [])
+        self.assertEqual(cover.boxes.shape, (0, 4))
+        self.assertEqual(cover.load(), [])
+        self.assertEqual(self.server.requests, 0)
+
+    def test_radius_too_big(self):
+        with self.assertRaises(ValueError):
+            PointCover(self.lat, self.lon, radius=400)
+
+    def test_chips(self):
+        # Windows are planned in scale 1 pixels, so a scale 2 default in config.py mustn't apply
+        for scale in (1, 2):
+            self.set_config(scale=scale)
+            server = self.restart()
+            cover = PointCover(self.lat[:30], self.lon[:30], radius=32, zoom=19, cache=False, memory_cache=False,
+                               transport=self.transport())
+            chips = cover.load()
+            self.assertEqual(server.requests, len(cover.tiles))
+
+            # Stub tiles colour pixels by global position, so each chip is centred on its point
+            px, py = global_pixels(self.lat[:30], self.lon[:30], 19)
+            for i, chip in enumerate(chips):
+                self.assertEqual(chip.size, (64, 64))
+                array = np.asarray(chip)
+                self.assertEqual(array[32, 32, 0], int(np.floor(px[i])) % 256)
+                self.assertEqual(array[32, 32, 1], int(np.floor(py[i])) % 256)
+
+    def test_chips_bounded(self):
+        # Points far apart need a tile each, only twice max_workers of them are requested ahead
+        rng = np.random.default_rng(0)
+        lat, lon = 51.56 + rng.uniform(0, 0.02, 200), -0.17 + rng.uniform(0, 0.03, 200)
+        cover = PointCover(lat, lon, radius=32, zoom=19, max_workers=2, cache=False, memory_cache=False,
+                           transport=self.transport())
+        self.assertGreater(len(cover.tiles), 100)
+        chips = cover.chips()
+        next(chips)
+        # A slow consumer holds no more tiles than that
+        time.sleep(0.5)
+        chips.close()
+        self.assertLessEqual(self.server.requests, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
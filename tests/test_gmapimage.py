@@ -1,5 +1,7 @@
 import unittest
 import json
+import numpy as np
+from PIL import Image
 from gmaploader.images import GMapImage
 from gmaploader.config import SYSTEM_CONFIG
 from gmaploader.config import logger
@@ -31,6 +33,24 @@ class TestSum(unittest.TestCase):
         _, crop_y = self.gmi._crop_dims(row=1, col=1)
         self.assertEqual(crop_y, self.results['crop_y'])
 
+    # array canvas
+    def test_array_canvas_paste(self):
+        gmi = GMapImage(**test_dct, canvas='array')
+        tile = Image.new('RGB', (640, 640), (10, 20, 30))
+        gmi._add_image(tile, row=self.results['row'], col=self.results['col'])
+        region = gmi.array[618:, 640:]
+        self.assertEqual(region.shape, (self.results['crop_y'], self.results['crop_x'], 3))
+        self.assertTrue((region == (10, 20, 30)).all())
+        self.assertFalse(gmi.array[:618].any())
+        self.assertEqual(gmi.img.getpixel((999, 999)), (10, 20, 30))
+        np.testing.assert_array_equal(np.asarray(gmi.img), gmi.array)
+
+    def test_array_edit_after_img(self):
+        gmi = GMapImage(**test_dct, canvas='array')
+        self.assertEqual(gmi.img.getpixel((0, 0)), (0, 0, 0))
+        gmi.array[:] = 200
+        self.assertEqual(gmi.img.getpixel((0, 0)), (200, 200, 200))
+
 
 if __name__ == '__main__':
     unittest.main()
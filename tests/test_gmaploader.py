@@ -4,6 +4,7 @@ import os
 import shutil
 from gmaploader.gmaploader import GMapLoader
 from gmaploader.config import logger
+from tests.stub_case import StubTestCase
 
 logger = logger(name=__name__)
 
@@ -35,5 +36,20 @@ class TestSum(unittest.TestCase):
             shutil.rmtree('output')
 
 
+class TestStub(StubTestCase):
+
+    #####################
+    # Stub server tests
+    #####################
+
+    def test_workers(self):
+        # With jitter tiles finish in any order, the image mustn't depend on it
+        self.server.jitter = 0.05
+        request = dict(test_dct, width=2500, height=2000)
+        gml = self.loader(**request, max_workers=8)
+        self.assertSameImage(gml.img, self.loader(**request, max_workers=1).img)
+        self.assertSeamless(gml.img)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.mkdtemp()
+        self.set_config(temp_folder=self.folder)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.folder)
+
+    def gml(self, **kwargs):
+        return self.loader(**test_dct, **kwargs)
+
+    ###############
+    # ImageLoader tests
+    ###############
+
+    def test_in_memory(self):
+        # Decoding from memory gives the image written to and read back from temp_folder
+        on_disk = self.gml(in_memory=False)
+        self.assertSameImage(self.gml(in_memory=True).img, on_disk.img)
+        self.assertEqual(os.listdir(self.folder), ['.locks'])
+        self.assertEqual(self.server.requests, 2 * len(on_disk.tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
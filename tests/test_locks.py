@@ -0,0 +1,120 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import unittest
+import numpy as np
+from gmaploader import GMapLoader
+from gmaploader.cache import TileCache
+from gmaploader.images import ImageLoader
+from gmaploader.locks import FileLock, striped_lock, LOCK_STRIPE_DIGITS
+from gmaploader.transport import HTTPTransport
+from gmaploader.connection import ConnectionPool
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+TILE = dict(lat=51.5638, lon=-0.1647, zoom=19, width=640, height=640)
+
+
+def load_cached_tile(folder, results):
+    im_loader = ImageLoader(**TILE, cache=TileCache(folder), transport=HTTPTransport(ConnectionPool()))
+    results.put(im_loader.open().size)
+
+
+def load_temp_images(loads, results):
+    transport = HTTPTransport(ConnectionPool())
+    for _ in range(loads):
+        try:
+            gml = GMapLoader(**TILE, in_memory=False, cache=False, memory_cache=False, delete_temp=True,
+                             transport=transport)
+            results.put(hashlib.sha256(np.asarray(gml.img).tobytes()).hexdigest())
+        except Exception as e:
+            results.put(repr(e))
+
+
+class TestSum(StubTestCase):
+    stub_options = dict(latency=0.3)
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.TemporaryDirectory()
+        self.set_config(temp_folder=self.folder.name)
+
+    def tearDown(self):
+        super().tearDown()
+        self.folder.cleanup()
+
+    ###############
+    # Single-flight tests
+    ###############
+
+    @unittest.skipUnless(FileLock.enabled(), 'no fcntl')
+    def test_processes_share_cache(self):
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=load_cached_tile, args=(self.folder.name, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        sizes = [results.get(timeout=30) for _ in processes]
+        for process in processes:
+            process.join()
+
+        self.assertEqual(sizes, [(640, 640)] * 4)
+        self.assertEqual(self.server.requests, 1)
+
+    @unittest.skipUnless(FileLock.enabled(), 'no fcntl')
+    def test_threads_share_temp_folder(self):
+        transport = self.transport()
+        sizes = []
+
+        def load():
+            im_loader = ImageLoader(**TILE, transport=transport)
+            img = im_loader.open()
+            img.load()
+            sizes.append(img.size)
+
+        threads = [threading.Thread(target=load) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sizes, [(640, 640)] * 6)
+        self.assertEqual(self.server.requests, 1)
+        self.assertFalse([name for name in os.listdir(self.folder.name) if name.endswith('.tmp')])
+
+    @unittest.skipUnless(FileLock.enabled(), 'no fcntl')
+    def test_processes_delete_temp(self):
+        # Each process deletes tiles once pasted while others may be about to read them
+        self.restart(latency=0.05)
+        expected = hashlib.sha256(np.asarray(self.loader(**TILE).img).tobytes()).hexdigest()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=load_temp_images, args=(5, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        digests = [results.get(timeout=60) for _ in range(5 * len(processes))]
+        for process in processes:
+            process.join()
+
+        self.assertEqual(digests, [expected] * len(digests))
+        self.assertEqual(os.listdir(self.folder.name), ['.locks'])
+
+    def test_striped_lock(self):
+        paths = {striped_lock(self.folder.name, str(i)).path for i in range(10000)}
+        self.assertLessEqual(len(paths), 16 ** LOCK_STRIPE_DIGITS)
+        self.assertEqual(striped_lock(self.folder.name, 'a').path, striped_lock(self.folder.name, 'a').path)
+
+    def test_cache_sees_other_process(self):
+        writer, reader = TileCache(self.folder.name), TileCache(self.folder.name)
+        writer.put('key', b'tile')
+        self.assertIn('key', reader)
+        self.assertEqual(reader.get('key'), b'tile')
+        self.assertEqual(reader.stats()['tiles'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
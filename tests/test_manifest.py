@@ -0,0 +1,104 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from gmaploader.manifest import JobManifest
+from gmaploader.transport import Transport
+from gmaploader.exceptions import TileRequestFailed
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class CrashingTransport(Transport):
+    """Transport that dies after a number of tiles, as an interrupted job would"""
+    def __init__(self, transport, tiles):
+        self.transport = transport
+        self.tiles = tiles
+
+    def get(self, url):
+        if self.tiles == 0:
+            raise TileRequestFailed(status=503, reason='Crashed')
+        self.tiles -= 1
+        return self.transport.get(url)
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.folder)
+
+    def gml(self, **kwargs):
+        kwargs.setdefault('transport', self.transport(retries=0))
+        return self.loader(**test_dct, max_workers=1, manifest=self.folder, **kwargs)
+
+    ###############
+    # JobManifest tests
+    ###############
+
+    def test_plan_key(self):
+        self.assertEqual(self.gml().plan.key(), self.gml().plan.key())
+        self.assertNotEqual(self.gml().plan.key(), self.gml(map_type='roadmap').plan.key())
+
+    def test_resume(self):
+        crashing = CrashingTransport(self.transport(retries=0), tiles=2)
+        with self.assertRaises(TileRequestFailed):
+            self.gml(transport=crashing).load()
+        self.assertEqual(self.server.requests, 2)
+
+        gml = self.gml()
+        self.assertEqual(len(gml.manifest), 2)
+        self.assertEqual(gml.plan.cache_status().count('manifest'), 2)
+        self.assertEqual(gml.plan.billable(), 2)
+
+        gml.load()
+        self.assertEqual(self.server.requests, 4)
+        self.assertFalse(os.path.exists(gml.manifest.folder))
+
+        self.assertSameImage(gml.img, self.loader(**test_dct).img)
+
+    def test_resume_after_save(self):
+        # A file where the image's folder should be, so saving fails once every tile is downloaded
+        blocker = os.path.join(self.folder, 'blocker')
+        open(blocker, 'w').close()
+        with self.assertRaises(OSError):
+            self.gml(save=True, filepath=os.path.join(blocker, 'img.png'))
+        tiles = self.server.requests
+
+        gml = self.gml()
+        self.assertEqual(len(gml.manifest), tiles)
+        self.assertEqual(gml.plan.billable(), 0)
+        gml.load()
+        self.assertEqual(self.server.requests, tiles)
+        self.assertFalse(os.path.exists(gml.manifest.folder))
+
+    def test_truncated_journal(self):
+        manifest = JobManifest('job', folder=self.folder)
+        manifest.put('a', b'tile a')
+        manifest.put('b', b'tile b')
+        with open(manifest.journal_filepath, 'a') as f:
+            f.write('{"key": "c", "pa')
+
+        resumed = JobManifest('job', folder=self.folder)
+        self.assertEqual(len(resumed), 2)
+        self.assertEqual(resumed.get('b'), b'tile b')
+        self.assertIsNone(resumed.get('c'))
+
+    def test_missing_bytes(self):
+        manifest = JobManifest('job', folder=self.folder)
+        manifest.put('a', b'tile a')
+        os.remove(manifest.completed['a'])
+        self.assertNotIn('a', JobManifest('job', folder=self.folder))
+
+
+if __name__ == '__main__':
+    unittest.main()
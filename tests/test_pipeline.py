@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from gmaploader import GMapLoader, Pipeline
+from gmaploader.exceptions import TileRequestFailed
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+REQUESTS = [dict(lat=51.5638 + i * 0.001, lon=-0.1647 - i * 0.001) for i in range(6)]
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.options = dict(width=900, height=700, in_memory=True, cache=False, memory_cache=False,
+                            transport=self.transport(retries=0))
+
+    ###############
+    # Pipeline tests
+    ###############
+
+    def test_matches_loader(self):
+        pipeline = Pipeline(download_workers=4, decode_workers=2, queue_size=2)
+        gmls = list(pipeline.run(iter(REQUESTS), **self.options))
+        self.assertEqual(len(gmls), len(REQUESTS))
+        self.assertEqual(self.server.requests, sum(len(gml.tiles) for gml in gmls))
+
+        for gml in gmls:
+            self.assertTrue(gml.loaded)
+            self.assertSameImage(gml.img, GMapLoader(lat=gml.lat, lon=gml.lon, **self.options).img)
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as folder:
+            self.set_config(output_folder=folder)
+            requests = [dict(request, save=True) for request in REQUESTS[:3]]
+            for gml in Pipeline(encode_workers=2).run(requests, canvas='array', **self.options):
+                self.assertTrue(os.path.exists(gml.img_filepath))
+            self.assertEqual(len(os.listdir(folder)), 3)
+
+    def test_error(self):
+        self.restart(error_rate=1.0, error_status=403)
+        with self.assertRaises(TileRequestFailed):
+            list(Pipeline().run(REQUESTS, **self.options))
+
+    def test_stop_early(self):
+        for gml in Pipeline(queue_size=1).run(REQUESTS * 10, **self.options):
+            break
+        self.assertTrue(gml.loaded)
+        self.assertLess(self.server.requests, len(REQUESTS) * 10 * len(gml.tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import json
+import shutil
+import tempfile
+from gmaploader.gmaploader import GMapLoader
+from gmaploader.cache import TileCache
+from gmaploader.config import logger
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(unittest.TestCase):
+    results = test_dct['results']
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache = TileCache(folder=self.folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def gml(self, **kwargs):
+        return GMapLoader(**test_dct, lazy=True, cache=self.cache, **kwargs)
+
+    ###############
+    # TilePlan tests
+    ###############
+
+    def test_lazy(self):
+        gml = self.gml()
+        self.assertFalse(gml.loaded)
+        self.assertEqual(len(gml.plan), 4)
+
+    def test_tile_centers(self):
+        gml = self.gml()
+        tile = [tile for tile in gml.plan.tiles if (tile.row, tile.col) == (self.results['row'], self.results['col'])][0]
+        self.assertEqual((tile.lat, tile.lon), (self.results['tile_lat_c'], self.results['tile_lon_c']))
+        self.assertEqual(tile.box, (0, 0, self.results['crop_x'], self.results['crop_y']))
+
+    def test_billable(self):
+        gml = self.gml()
+        self.assertEqual(gml.plan.billable(), 4)
+        self.cache.put(gml.plan.cache_keys()[0], b'tile')
+        self.assertEqual(gml.plan.cache_status()[0], 'cache')
+        self.assertEqual(gml.plan.billable(), 3)
+
+    def test_records(self):
+        records = self.gml().plan.records()
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['offset'], (0, 0))
+        self.assertIsNone(records[0]['cache_status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
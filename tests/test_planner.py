@@ -0,0 +1,72 @@
+import unittest
+from gmaploader.coordinates import balanced_spans
+from gmaploader.images import ImageLoader
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase, URL_TEMPLATE
+
+logger = logger(name=__name__)
+
+LAT, LON = 51.563839178, -0.164794922
+
+
+class TestSum(StubTestCase):
+
+    def loader(self, **kwargs):
+        return super().loader(lat=LAT, lon=LON, **kwargs)
+
+    ###############
+    # balanced_spans tests
+    ###############
+
+    def test_spans(self):
+        self.assertEqual(balanced_spans(1300, 640), [(0, 434, 433), (433, 434, 433), (866, 434, 434)])
+        self.assertEqual(balanced_spans(1000, 618), [(0, 500, 500), (500, 500, 500)])
+        self.assertEqual(balanced_spans(1300, 640, scale=2), [(0, 652, 648), (648, 652, 652)])
+
+    def test_spans_cover(self):
+        for scale in (1, 2):
+            for pitch in (640, 618):
+                for length in range(1, 4000, 37):
+                    spans = balanced_spans(length, pitch, scale)
+                    self.assertEqual(len(spans), -(-length // (pitch * scale)))
+                    position = 0
+                    for offset, span, keep in spans:
+                        self.assertEqual(offset, position)
+                        self.assertLessEqual(keep, span)
+                        self.assertLessEqual(span, pitch * scale)
+                        self.assertEqual(span % (2 * scale), 0)
+                        position += keep
+                    self.assertEqual(position, length)
+
+    ###############
+    # Balanced planner tests
+    ###############
+
+    def test_same_count_fewer_pixels(self):
+        for width, height in ((1000, 1000), (1300, 700), (3000, 2000)):
+            grid = self.loader(width=width, height=height, planner='grid')
+            balanced = self.loader(width=width, height=height, planner='balanced')
+            self.assertEqual(len(balanced.tiles), len(grid.tiles))
+            fetched = sum(tile.width * tile.height for tile in balanced.tiles)
+            self.assertLess(fetched, 640 * 640 * len(grid.tiles))
+
+    def test_stitch(self):
+        for scale in (1, 2):
+            for canvas in ('pil', 'array'):
+                gml = self.loader(width=1300, height=700, planner='balanced', scale=scale, canvas=canvas)
+                self.assertEqual(gml.img.size, (1300, 700))
+                self.assertSeamless(gml.img)
+
+    def test_url_size(self):
+        # Balanced tiles are rarely square, Static Maps takes size as widthxheight
+        self.set_config(url_template=URL_TEMPLATE)
+        im_loader = ImageLoader(lat=LAT, lon=LON, zoom=19, width=434, height=522)
+        self.assertIn('&size=434x522&', im_loader.url)
+
+    def test_bad_planner(self):
+        with self.assertRaises(ValueError):
+            self.loader(planner='hexagonal')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+from gmaploader import GMapLoader, AreaLoader, ResolutionLoader, ProcessPool
+from gmaploader.processes import render_job
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+REQUESTS = [dict(lat=51.5638 + i * 0.001, lon=-0.1647 - i * 0.001) for i in range(4)]
+TRIANGLE = {'type': 'Polygon', 'coordinates': [[
+    (-0.1648, 51.5638), (-0.1620, 51.5638), (-0.1648, 51.5620), (-0.1648, 51.5638)
+]]}
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.TemporaryDirectory()
+        self.set_config(output_folder=self.folder.name)
+        self.options = dict(width=900, height=700, in_memory=True, cache=False, memory_cache=False)
+
+    def tearDown(self):
+        super().tearDown()
+        self.folder.cleanup()
+
+    def expected(self, loader=GMapLoader, **kwargs):
+        return np.asarray(loader(**kwargs, lazy=False).img)
+
+    ###############
+    # Worker tests
+    ###############
+
+    def test_render_job(self):
+        gml = GMapLoader(**REQUESTS[0], **self.options)
+        filepath = os.path.join(self.folder.name, 'job.png')
+        self.assertEqual(render_job(gml.job_spec(filepath)), filepath)
+        self.assertSameImage(Image.open(filepath), gml.img)
+
+    def test_render_area(self):
+        for canvas in ('pil', 'array'):
+            gml = AreaLoader(polygon=TRIANGLE, zoom=19, canvas=canvas, in_memory=True, cache=False,
+                             memory_cache=False)
+            filepath = os.path.join(self.folder.name, f'area_{canvas}.png')
+            render_job(gml.job_spec(filepath))
+            self.assertSameImage(Image.open(filepath), gml.img)
+
+    def test_render_resolution(self):
+        gml = ResolutionLoader(**REQUESTS[0], metres_per_pixel=0.5,
+                               **dict(self.options, width=400, height=300))
+        filepath = os.path.join(self.folder.name, 'resolution.png')
+        render_job(gml.job_spec(filepath))
+        self.assertEqual(Image.open(filepath).size, (400, 300))
+        self.assertSameImage(Image.open(filepath), gml.img)
+
+    ###############
+    # ProcessPool tests
+    ###############
+
+    def test_pool(self):
+        requests = [dict(request, filepath=os.path.join(self.folder.name, f'{i}.png'))
+                    for i, request in enumerate(REQUESTS)]
+        pool = ProcessPool(processes=2, max_pending=2, mp_context=multiprocessing.get_context('spawn'))
+        results = dict(pool.run(iter(requests), **self.options))
+
+        self.assertEqual(sorted(results), list(range(len(REQUESTS))))
+        for i, request in enumerate(REQUESTS):
+            self.assertEqual(results[i], requests[i]['filepath'])
+            self.assertSameImage(Image.open(results[i]), self.expected(**request, **self.options))
+
+
+if __name__ == '__main__':
+    unittest.main()
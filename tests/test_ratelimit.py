@@ -0,0 +1,88 @@
+import unittest
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gmaploader.ratelimit import RateLimiter, is_throttle
+from gmaploader.exceptions import TileRequestFailed
+from gmaploader.config import logger
+
+logger = logger(name=__name__)
+
+
+class TestSum(unittest.TestCase):
+
+    ###############
+    # RateLimiter tests
+    ###############
+
+    def test_is_throttle(self):
+        self.assertTrue(is_throttle(429))
+        self.assertTrue(is_throttle(503))
+        self.assertFalse(is_throttle(404))
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=50, burst=2, max_concurrency=4)
+        start = time.monotonic()
+        for _ in range(7):
+            limiter.call(lambda: None)
+        # 2 from the burst, 5 more at 50 per second
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_unlimited(self):
+        limiter = RateLimiter(rate=None, burst=1, max_concurrency=4)
+        start = time.monotonic()
+        for _ in range(100):
+            limiter.call(lambda: None)
+        self.assertLess(time.monotonic() - start, 0.05)
+
+    def test_decrease(self):
+        limiter = RateLimiter(max_concurrency=16, adaptive=True, cooldown=60)
+        for _ in range(3):
+            with self.assertRaises(TileRequestFailed):
+                limiter.call(self.fail_with, 429)
+        # Halved once per cooldown
+        self.assertEqual(limiter.limit, 8)
+        self.assertEqual(limiter.stats()['throttled'], 3)
+
+        with self.assertRaises(TileRequestFailed):
+            limiter.call(self.fail_with, 404)
+        self.assertEqual(limiter.limit, 8)
+
+    def test_increase(self):
+        limiter = RateLimiter(max_concurrency=16, adaptive=True, cooldown=0)
+        for _ in range(4):
+            with self.assertRaises(TileRequestFailed):
+                limiter.call(self.fail_with, 503)
+        self.assertEqual(limiter.limit, 1)
+        for _ in range(10):
+            limiter.call(lambda: None)
+        self.assertGreater(limiter.limit, 4)
+        for _ in range(1000):
+            limiter.call(lambda: None)
+        self.assertEqual(limiter.limit, 16)
+
+    def test_not_adaptive(self):
+        limiter = RateLimiter(max_concurrency=16, adaptive=False, cooldown=0)
+        with self.assertRaises(TileRequestFailed):
+            limiter.call(self.fail_with, 429)
+        self.assertEqual(limiter.limit, 16)
+
+    def test_concurrency(self):
+        limiter = RateLimiter(max_concurrency=3, adaptive=False)
+        peak = []
+
+        def request():
+            peak.append(limiter.in_flight)
+            time.sleep(0.01)
+
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda _: limiter.call(request), range(30)))
+        self.assertEqual(max(peak), 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    @staticmethod
+    def fail_with(status):
+        raise TileRequestFailed(status)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from gmaploader.resolution import ResolutionLoader, ground_resolution, zoom_for_resolution
+from gmaploader.pipeline import Pipeline
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+
+class TestSum(StubTestCase):
+
+    ###############
+    # Zoom selection tests
+    ###############
+
+    def test_ground_resolution(self):
+        self.assertAlmostEqual(ground_resolution(0, 19), 0.29858214, places=6)
+        self.assertAlmostEqual(ground_resolution(60, 19), 0.29858214 / 2, places=6)
+
+    def test_zoom_for_resolution(self):
+        self.assertEqual(zoom_for_resolution(0, 0.3), 19)
+        self.assertEqual(zoom_for_resolution(0, 0.6), 18)
+        # Pixels at 60 degrees cover half the ground they do at the equator
+        self.assertEqual(zoom_for_resolution(60, 0.3), 18)
+        self.assertEqual(zoom_for_resolution(51.5, 10), 14)
+
+    def test_zoom_meets_target(self):
+        for lat in (0, 30, 51.5, 70):
+            for target in (0.25, 1, 3.7, 50):
+                zoom = zoom_for_resolution(lat, target, max_zoom=21)
+                self.assertLessEqual(ground_resolution(lat, zoom), target)
+                self.assertGreater(ground_resolution(lat, zoom - 1), target)
+
+    def test_max_zoom(self):
+        self.assertEqual(zoom_for_resolution(0, 0.01, max_zoom=19), 19)
+
+    ###############
+    # ResolutionLoader tests
+    ###############
+
+    def test_loader(self):
+        for canvas in ('pil', 'array'):
+            gml = self.loader(ResolutionLoader, lat=51.563839178, lon=-0.164794922, metres_per_pixel=2.0,
+                              width=400, height=300, canvas=canvas)
+            self.assertEqual(gml.zoom, 16)
+            self.assertLess(len(gml.tiles), 4)
+            self.assertEqual(gml.img.size, (400, 300))
+            self.assertEqual(np.asarray(gml.img).shape, (300, 400, 3))
+
+    def test_batch_pipeline(self):
+        # Resampled to the output size however the image is stitched
+        request = dict(lat=51.563839178, lon=-0.164794922, metres_per_pixel=5, width=400, height=300)
+        options = dict(in_memory=True, cache=False, memory_cache=False, transport=self.transport())
+        expected = self.loader(ResolutionLoader, **request).img
+        for canvas in ('pil', 'array'):
+            gml, = ResolutionLoader.batch([request], canvas=canvas, **options)
+            self.assertEqual((gml.width, gml.height), (400, 300))
+            self.assertSameImage(gml.img, expected)
+            gml, = Pipeline(loader=ResolutionLoader).run([request], canvas=canvas, **options)
+            self.assertSameImage(gml.img, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import json
+import random
+import threading
+import time
+from gmaploader.transport import HTTPTransport
+from gmaploader.connection import ConnectionPool
+from gmaploader.ratelimit import RateLimiter
+from gmaploader.retry import is_retryable, backoff, LatencyTracker
+from gmaploader.exceptions import TileRequestFailed
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class SlowFirstPool:
+    """Pool whose first request stalls, as a stuck connection would"""
+    def __init__(self, stall):
+        self.stall = stall
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            time.sleep(self.stall)
+        return b'tile'
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.set_config(retry_backoff=0.01)
+
+    def transport(self, **kwargs):
+        return HTTPTransport(ConnectionPool(), limiter=RateLimiter(), **kwargs)
+
+    ###############
+    # Retry tests
+    ###############
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(TileRequestFailed(500)))
+        self.assertTrue(is_retryable(TileRequestFailed(429)))
+        self.assertTrue(is_retryable(TimeoutError()))
+        self.assertTrue(is_retryable(ConnectionResetError()))
+        self.assertFalse(is_retryable(TileRequestFailed(403)))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_backoff(self):
+        rng = random.Random(0)
+        delays = [backoff(attempt, 0.5, 4, rng) for attempt in range(10) for _ in range(20)]
+        self.assertTrue(all(0 <= delay <= 4 for delay in delays))
+        self.assertTrue(all(delay <= 0.5 for delay in delays[:20]))
+
+    def test_retries_recover(self):
+        self.restart(error_rate=0.3, seed=1)
+        transport = self.transport(retries=10)
+        gml = self.loader(**test_dct, transport=transport)
+        gml.load()
+        self.assertTrue(gml.loaded)
+        self.assertGreater(transport.retried, 0)
+
+    def test_not_retried(self):
+        server = self.restart(error_rate=1.0, error_status=403)
+        with self.assertRaises(TileRequestFailed):
+            self.transport(retries=3).get(server.url_template.format(
+                lat=0, lon=0, zoom=1, width=640, height=640, scale=1, map_type='satellite'))
+        self.assertEqual(server.requests, 1)
+
+    def test_read_timeout(self):
+        server = self.restart(latency=1.0)
+        transport = HTTPTransport(ConnectionPool(read_timeout=0.1), limiter=RateLimiter(), retries=0)
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            transport.get(server.url_template.format(
+                lat=0, lon=0, zoom=1, width=640, height=640, scale=1, map_type='satellite'))
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    ###############
+    # Hedging tests
+    ###############
+
+    def test_latency_tracker(self):
+        tracker = LatencyTracker(window=10, min_samples=5)
+        self.assertIsNone(tracker.percentile(50))
+        for seconds in range(20):
+            tracker.add(seconds)
+        self.assertEqual(len(tracker), 10)
+        self.assertEqual(tracker.percentile(50), 14.5)
+
+    def test_hedge(self):
+        pool = SlowFirstPool(stall=2.0)
+        transport = HTTPTransport(pool, limiter=RateLimiter(), hedge_percentile=90)
+        for _ in range(20):
+            transport.latency.add(0.01)
+
+        start = time.monotonic()
+        self.assertEqual(transport.get('http://stub/tile'), b'tile')
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(transport.hedged, 1)
+
+    def test_no_hedge_without_history(self):
+        pool = SlowFirstPool(stall=0.2)
+        transport = HTTPTransport(pool, limiter=RateLimiter(), hedge_percentile=90)
+        transport.get('http://stub/tile')
+        self.assertEqual(transport.hedged, 0)
+        self.assertEqual(pool.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from gmaploader.area import AreaLoader
+from gmaploader.images import ImageLoader
+from gmaploader.config import SYSTEM_CONFIG
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+LAT, LON = 51.563839178, -0.164794922
+BBOX = (-0.1648, 51.5620, -0.1620, 51.5638)
+
+
+class TestSum(StubTestCase):
+
+    ###############
+    # Scale tests
+    ###############
+
+    def test_pitch(self):
+        gml = self.loader(lat=LAT, lon=LON, width=1000, height=1000, scale=2, lazy=True)
+        self.assertEqual(gml.pitch, (1280, 1236))
+        self.assertEqual(gml._crop_dims(0, 0), (1000, 1000))
+
+    def test_url(self):
+        im_loader = ImageLoader(lat=LAT, lon=LON, zoom=19, width=640, height=640, scale=2)
+        self.assertIn('scale=2', im_loader.url)
+        self.assertIn('_2x', im_loader.img_filename)
+
+        self.set_config(url_template=SYSTEM_CONFIG.get('url_template').replace('&scale={scale}', ''))
+        with self.assertRaises(ValueError):
+            ImageLoader(lat=LAT, lon=LON, zoom=19, width=640, height=640, scale=2).url
+
+    def test_quarter_tiles(self):
+        size = dict(lat=LAT, lon=LON, width=2560, height=2472, lazy=True)
+        self.assertEqual(len(self.loader(**size, scale=1).tiles), 16)
+        self.assertEqual(len(self.loader(**size, scale=2).tiles), 4)
+
+    def test_snap_stitch(self):
+        for canvas in ('pil', 'array'):
+            gml = self.loader(lat=LAT, lon=LON, width=1500, height=1400, scale=2, snap=True, canvas=canvas)
+            self.assertEqual(gml.img.size, (1500, 1400))
+            self.assertAligned(gml)
+
+    def test_area(self):
+        gml = self.loader(AreaLoader, bbox=BBOX, zoom=19, scale=2)
+        self.assertEqual((gml.width, gml.height), (2090, 2162))
+        self.assertEqual(self.server.requests, 0)
+        self.assertAligned(gml)
+        self.assertEqual(self.server.requests, len(gml.tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from gmaploader.singleflight import SingleFlight
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = dict(lat=51.563839178, lon=-0.164794922, zoom=19, width=1000, height=1000)
+
+
+class TestSum(StubTestCase):
+    stub_options = dict(latency=0.3)
+
+    ###############
+    # SingleFlight tests
+    ###############
+
+    def test_coalesce(self):
+        flights = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fn():
+            calls.append(1)
+            release.wait()
+            return b'tile'
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(flights.do, 'key', fn) for _ in range(8)]
+            while flights.stats()['coalesced'] < 7:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [b'tile'] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flights.stats(), {'calls': 1, 'coalesced': 7, 'in_flight': 0})
+
+        # Nothing kept once the call is done
+        self.assertEqual(flights.do('key', lambda: b'new'), b'new')
+
+    def test_exception_shared(self):
+        flights = SingleFlight()
+        release = threading.Event()
+
+        def fn():
+            release.wait()
+            raise ConnectionResetError()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(flights.do, 'key', fn) for _ in range(4)]
+            while flights.stats()['coalesced'] < 3:
+                time.sleep(0.01)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ConnectionResetError):
+                    future.result()
+        self.assertEqual(len(flights), 0)
+
+    ###############
+    # Tile request tests
+    ###############
+
+    def load_concurrently(self, n):
+        transport = self.transport()
+
+        def load(_):
+            gml = self.loader(**test_dct, transport=transport)
+            gml.load()
+            return gml
+
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            return list(executor.map(load, range(n)))
+
+    def test_concurrent_loaders(self):
+        gmls = self.load_concurrently(3)
+        self.assertEqual(self.server.requests, len(gmls[0].tiles))
+
+        self.set_config(coalesce_requests=False)
+        gmls = self.load_concurrently(3)
+        self.assertEqual(self.server.requests, 4 * len(gmls[0].tiles))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from gmaploader import GMapStreamLoader
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(StubTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.folder, 'image.npy')
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.folder)
+
+    ###############
+    # GMapStreamLoader tests
+    ###############
+
+    def test_matches_loader(self):
+        self.loader(GMapStreamLoader, **test_dct, filepath=self.filepath, lazy=False)
+        np.testing.assert_array_equal(np.load(self.filepath), np.asarray(self.loader(**test_dct).img))
+
+    def test_save_rejected(self):
+        for kwargs in (dict(save=True), dict(canvas='array')):
+            with self.assertRaises(TypeError):
+                self.loader(GMapStreamLoader, **test_dct, filepath=self.filepath, **kwargs)
+        self.loader(GMapStreamLoader, **test_dct, filepath=self.filepath, save=False, lazy=True)
+        self.assertEqual(self.server.requests, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
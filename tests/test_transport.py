@@ -0,0 +1,79 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from gmaploader.transport import RecordTransport, ReplayTransport, strip_api_key
+from gmaploader.exceptions import TileRequestFailed
+from gmaploader.config import logger
+from tests.stub_case import StubTestCase
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(StubTestCase):
+    results = test_dct['results']
+
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.folder)
+
+    def gml(self, **kwargs):
+        return self.loader(**test_dct, **kwargs)
+
+    ###############
+    # Transport tests
+    ###############
+
+    def test_stub(self):
+        gml = self.gml()
+        self.assertEqual(gml.img.size, (test_dct['width'], test_dct['height']))
+        self.assertEqual(self.server.requests, 4)
+
+    def test_stub_snap_seamless(self):
+        self.assertSeamless(np.asarray(self.gml(snap=True).img))
+
+    def test_stub_snap_matches_grid(self):
+        # Off a tile corner, where the lattice once cropped from the corner of the slippy tile
+        point = dict(lat=51.5601, lon=-0.1702, zoom=19, width=1000, height=1000)
+        for scale in (1, 2):
+            self.assertSameImage(self.loader(**point, scale=scale, snap=True).img,
+                                 self.loader(**point, scale=scale).img)
+
+    def test_stub_error(self):
+        self.server.error_rate = 1.0
+        self.server.error_status = 503
+        with self.assertRaises(TileRequestFailed) as context:
+            self.gml(transport=self.transport(retries=0)).load()
+        self.assertEqual(context.exception.status, 503)
+
+    def test_record_replay(self):
+        archive = os.path.join(self.folder, 'archive')
+        recorded = self.gml(transport=RecordTransport(archive, self.transport()))
+        recorded.load()
+        self.assertEqual(len(os.listdir(archive)), 4)
+
+        self.server.stop()
+        replayed = self.gml(transport=ReplayTransport(archive))
+        self.assertSameImage(replayed.img, recorded.img)
+        self.restart()
+
+    def test_replay_missing(self):
+        with self.assertRaises(TileRequestFailed) as context:
+            self.gml(transport=ReplayTransport(self.folder)).load()
+        self.assertEqual(context.exception.status, 404)
+
+    def test_strip_api_key(self):
+        url = 'https://maps.googleapis.com/maps/api/staticmap?center=1.0,2.0&zoom=19&key=SECRET'
+        self.assertEqual(strip_api_key(url), 'https://maps.googleapis.com/maps/api/staticmap?center=1.0,2.0&zoom=19')
+
+
+if __name__ == '__main__':
+    unittest.main()
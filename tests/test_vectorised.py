@@ -0,0 +1,76 @@
+import unittest
+import json
+import numpy as np
+from gmaploader.coordinates import Coordinates
+from gmaploader.globalmaptiles import GlobalMercator
+from gmaploader import vectorised
+from gmaploader.config import logger
+
+logger = logger(name=__name__)
+
+test_dct = json.load(open('test_dct.json'))
+
+
+class TestSum(unittest.TestCase):
+    results = test_dct['results']
+    rng = np.random.default_rng(0)
+    lats = rng.uniform(-80, 80, 200)
+    lons = rng.uniform(-179, 179, 200)
+    zoom = test_dct['zoom']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.coords = [Coordinates(lat=lat, lon=lon, zoom=cls.zoom) for lat, lon in zip(cls.lats, cls.lons)]
+
+    ##########################
+    # VectorMercator tests
+    ##########################
+
+    def test_latlon_to_meters(self):
+        gm = GlobalMercator()
+        mx, my = vectorised.VM.LatLonToMeters(self.lats, self.lons)
+        expected = np.array([gm.LatLonToMeters(lat, lon) for lat, lon in zip(self.lats, self.lons)])
+        np.testing.assert_allclose(mx, expected[:, 0])
+        np.testing.assert_allclose(my, expected[:, 1])
+
+    def test_tile_latlon_bounds(self):
+        gm = GlobalMercator()
+        bounds = vectorised.VM.TileLatLonBounds(np.arange(100), np.arange(100), 10)
+        expected = np.array([gm.TileLatLonBounds(t, t, 10) for t in range(100)])
+        np.testing.assert_allclose(np.stack(bounds, axis=1), expected)
+
+    def test_pixels_to_tile(self):
+        gm = GlobalMercator()
+        px = self.rng.uniform(0, 1e6, 100)
+        tx, ty = vectorised.VM.PixelsToTile(px, px)
+        self.assertEqual(tx.tolist(), [gm.PixelsToTile(p, p)[0] for p in px])
+
+    ##########################
+    # Coordinates equivalents
+    ##########################
+
+    def test_tile_xy(self):
+        tile_x, tile_y = vectorised.tile_xy(test_dct['lat'], test_dct['lon'], self.zoom)
+        self.assertEqual((int(tile_x), int(tile_y)), (self.results['tile_x'], self.results['tile_y']))
+
+        tile_x, tile_y = vectorised.tile_xy(self.lats, self.lons, self.zoom)
+        self.assertEqual(list(zip(tile_x.tolist(), tile_y.tolist())), [(c.tile_x, c.tile_y) for c in self.coords])
+
+    def test_nearest_tile(self):
+        bounds = vectorised.nearest_tile(self.lats, self.lons, self.zoom)
+        np.testing.assert_allclose(np.stack(bounds, axis=1), [c.nearest_tile_latlon for c in self.coords], atol=1e-8)
+
+    def test_tile_centers(self):
+        lat_c, lon_c = vectorised.tile_centers(self.lats, self.lons, self.zoom, rows=2, columns=3)
+        self.assertEqual(lat_c.shape, (200, 2, 3))
+        expected = np.array([[[c.tile_center_latlon(row, col) for col in range(3)] for row in range(2)] for c in self.coords])
+        np.testing.assert_allclose(lat_c, expected[..., 0], atol=1e-8)
+        np.testing.assert_allclose(lon_c, expected[..., 1], atol=1e-8)
+
+    def test_global_pixels(self):
+        px, py = vectorised.global_pixels(self.results['lat_tl'], self.results['lon_tl'], self.zoom)
+        np.testing.assert_allclose((px, py), (self.results['tile_x'] * 256, self.results['tile_y'] * 256), atol=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image
+from gmaploader.writers import strip_writer
+from gmaploader.config import logger
+
+logger = logger(name=__name__)
+
+
+class TestSum(unittest.TestCase):
+    array = np.random.default_rng(0).integers(0, 256, size=(70, 50, 3), dtype=np.uint8)
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write(self, filename):
+        filepath = os.path.join(self.folder, filename)
+        with strip_writer(filepath, width=50, height=70) as writer:
+            writer.write(self.array[:30])
+            writer.write(self.array[30:])
+        return filepath
+
+    ###############
+    # Writer tests
+    ###############
+
+    def test_npy(self):
+        filepath = self.write('image.npy')
+        np.testing.assert_array_equal(np.load(filepath, mmap_mode='r'), self.array)
+
+    def test_tiff(self):
+        filepath = self.write('image.tif')
+        with Image.open(filepath) as img:
+            np.testing.assert_array_equal(np.asarray(img), self.array)
+
+    def test_raw(self):
+        filepath = self.write('image.raw')
+        np.testing.assert_array_equal(np.fromfile(filepath, dtype=np.uint8).reshape(70, 50, 3), self.array)
+
+    def test_overflow(self):
+        with strip_writer(os.path.join(self.folder, 'image.raw'), width=50, height=70) as writer:
+            with self.assertRaises(ValueError):
+                writer.write(np.zeros((71, 50, 3), dtype=np.uint8))
+
+    def test_unknown_extension(self):
+        with self.assertRaises(ValueError):
+            strip_writer(os.path.join(self.folder, 'image.png'), width=50, height=70)
+
+
+if __name__ == '__main__':
+    unittest.main()